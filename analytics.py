@@ -0,0 +1,289 @@
+"""Room utilization and teacher workload.
+
+The dashboards read the summary tables `auslastung` (lessons and students
+per room / teacher / whole school, weekday and timeblock) and
+`fach_belegung` (students per faecher row) instead of scanning
+`stundenplan`. The lesson and schedule write paths keep them up to date
+with small delta upserts in the same transaction; bulk writes (import,
+solver) rebuild them.
+"""
+import logging
+import threading
+from collections import defaultdict
+
+import click
+from flask.cli import with_appcontext
+
+from db import after_commit, db_read, db_write, db_many
+from conflicts import slot_mask, to_minutes, BLOCKS, DAY_INDEX
+from solver import WOCHENTAGE, TIMEBLOCKS
+
+logger = logging.getLogger(__name__)
+
+ARTEN = ("raum", "lehrer")
+N_SLOTS = len(WOCHENTAGE) * len(BLOCKS)
+
+_UPSERT = """
+    INSERT INTO auslastung (art, ref_id, tag, block, lektionen, schueler) VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE lektionen = lektionen + VALUES(lektionen), schueler = schueler + VALUES(schueler)
+"""
+
+_built = False
+_built_lock = threading.Lock()
+
+
+def _blocks(tag, startzeit, endzeit):
+    """Block numbers (0..5) of the weekday that the lesson touches."""
+    day = DAY_INDEX.get(tag)
+    if day is None or startzeit is None or endzeit is None:
+        return []
+    mask, _ = slot_mask(tag, to_minutes(startzeit), to_minutes(endzeit))
+    return [b for b in range(len(BLOCKS)) if mask >> (day * len(BLOCKS) + b) & 1]
+
+
+def _rows(lehrer_id, raum_id, tag, startzeit, endzeit, lektionen, schueler):
+    return [
+        (art, ref_id, tag, block, lektionen, schueler)
+        for block in _blocks(tag, startzeit, endzeit)
+        for art, ref_id in (("raum", raum_id), ("lehrer", lehrer_id), ("schule", 0))
+    ]
+
+
+# -----------------------------
+# Neuaufbau (Import, Solver, CLI)
+# -----------------------------
+def rebuild():
+    """Recompute both summary tables from faecher / stundenplan.
+
+    Part of the caller's transaction (request or CLI command), it doesn't
+    commit on its own.
+    """
+    faecher = db_read("SELECT id, lehrer_id, raum_id, tag, startzeit, endzeit FROM faecher") or []
+    counts = {r["fach_id"]: r["n"] for r in db_read(
+        "SELECT fach_id, COUNT(*) AS n FROM stundenplan GROUP BY fach_id") or []}
+
+    totals = defaultdict(lambda: [0, 0])
+    for f in faecher:
+        n = counts.get(f["id"], 0)
+        for art, ref_id, tag, block, lektionen, schueler in _rows(
+                f["lehrer_id"], f["raum_id"], f["tag"], f["startzeit"], f["endzeit"], 1, n):
+            total = totals[(art, ref_id, tag, block)]
+            total[0] += lektionen
+            total[1] += schueler
+
+    db_write("DELETE FROM auslastung")
+    db_write("DELETE FROM fach_belegung")
+    db_many("INSERT INTO auslastung (art, ref_id, tag, block, lektionen, schueler) VALUES (%s, %s, %s, %s, %s, %s)",
+            [(*key, l, s) for key, (l, s) in totals.items()])
+    db_many("INSERT INTO fach_belegung (fach_id, schueler) VALUES (%s, %s)",
+            [(f["id"], counts.get(f["id"], 0)) for f in faecher])
+    after_commit(_mark_built)
+    logger.info("Analytics rebuilt: %d lessons, %d cells", len(faecher), len(totals))
+
+
+def _mark_built():
+    global _built
+    _built = True
+
+
+def is_built():
+    """False while the tables were never filled (fresh migration) but faecher has rows."""
+    if _built:
+        return True
+    with _built_lock:
+        if _built:
+            return True
+        empty = db_read("SELECT fach_id FROM fach_belegung LIMIT 1", single=True) is None
+        if empty and db_read("SELECT id FROM faecher LIMIT 1", single=True):
+            return False
+        _mark_built()
+        return True
+
+
+def ensure_built():
+    """Fill the tables if they were never built; called by the readers only."""
+    if not is_built():
+        rebuild()
+
+
+# -----------------------------
+# Inkrementelle Updates (gleiche Transaktion wie der Schreibzugriff,
+# aufgerufen nach dem INSERT/UPDATE bzw. vor dem DELETE)
+# -----------------------------
+# Not built yet: the deltas are skipped, the first reader rebuilds from
+# scratch (a rebuild in the middle of a write would count the write twice).
+def _enrolled(fach_id):
+    row = db_read("SELECT schueler FROM fach_belegung WHERE fach_id=%s", (fach_id,), single=True)
+    return row["schueler"] if row else 0
+
+
+def lesson_added(fach_id, lehrer_id, raum_id, tag, startzeit, endzeit):
+    if not is_built():
+        return
+    db_many(_UPSERT, _rows(lehrer_id, raum_id, tag, startzeit, endzeit, 1, 0))
+    db_write("INSERT INTO fach_belegung (fach_id, schueler) VALUES (%s, 0) "
+             "ON DUPLICATE KEY UPDATE schueler = schueler", (fach_id,))
+
+
+def lesson_moved(fach_id, old, new):
+    """`old` / `new`: (lehrer_id, raum_id, tag, startzeit, endzeit)."""
+    if not is_built():
+        return
+    n = _enrolled(fach_id)
+    db_many(_UPSERT, _rows(*old, -1, -n) + _rows(*new, 1, n))
+
+
+def lesson_removed(fach_id, lehrer_id, raum_id, tag, startzeit, endzeit):
+    """Call before the stundenplan rows of the lesson are deleted."""
+    if not is_built():
+        return
+    n = _enrolled(fach_id)
+    db_many(_UPSERT, _rows(lehrer_id, raum_id, tag, startzeit, endzeit, -1, -n))
+    db_write("DELETE FROM fach_belegung WHERE fach_id=%s", (fach_id,))
+
+
+def enrollment_changed(fach_id, delta):
+    """A student joined (+1) or left (-1) faecher row `fach_id`."""
+    if not is_built():
+        return
+    lesson = db_read("SELECT lehrer_id, raum_id, tag, startzeit, endzeit FROM faecher WHERE id=%s",
+                     (fach_id,), single=True)
+    if not lesson:
+        return
+    db_write("INSERT INTO fach_belegung (fach_id, schueler) VALUES (%s, %s) "
+             "ON DUPLICATE KEY UPDATE schueler = schueler + VALUES(schueler)", (fach_id, delta))
+    db_many(_UPSERT, _rows(lesson["lehrer_id"], lesson["raum_id"], lesson["tag"],
+                           lesson["startzeit"], lesson["endzeit"], 0, delta))
+
+
+# -----------------------------
+# Abfragen (lesen nur die Summentabellen)
+# -----------------------------
+def grid(art, ref_id):
+    """{tag: [{block, startzeit, endzeit, lektionen, schueler}] * 6} for one room / teacher."""
+    ensure_built()
+    cells = {(r["tag"], r["block"]): r for r in db_read(
+        "SELECT tag, block, lektionen, schueler FROM auslastung WHERE art=%s AND ref_id=%s",
+        (art, ref_id)) or []}
+    result = {}
+    for tag in WOCHENTAGE:
+        result[tag] = []
+        for block, (start, end) in enumerate(TIMEBLOCKS):
+            cell = cells.get((tag, block))
+            result[tag].append({
+                "block": block,
+                "startzeit": start,
+                "endzeit": end,
+                "lektionen": cell["lektionen"] if cell else 0,
+                "schueler": cell["schueler"] if cell else 0,
+            })
+    return result
+
+
+def overview(art):
+    """Per room / teacher: occupied blocks, share of the week, student-blocks."""
+    ensure_built()
+    if art == "raum":
+        name_sql = "(SELECT raumnummer FROM raum WHERE raum.id = auslastung.ref_id)"
+    else:
+        name_sql = "(SELECT name FROM lehrer WHERE lehrer.id = auslastung.ref_id)"
+    rows = db_read(f"""
+        SELECT ref_id, {name_sql} AS name, COUNT(*) AS bloecke, SUM(schueler) AS schueler
+        FROM auslastung
+        WHERE art=%s AND lektionen > 0
+        GROUP BY ref_id
+        ORDER BY bloecke DESC, ref_id
+    """, (art,)) or []
+    return [{
+        "id": r["ref_id"],
+        "name": r["name"],
+        "bloecke": int(r["bloecke"]),
+        "auslastung": round(int(r["bloecke"]) / N_SLOTS, 3),
+        "schueler": int(r["schueler"] or 0),
+    } for r in rows]
+
+
+def peak_blocks(limit=5):
+    """Busiest weekday/blocks of the whole school by enrolled students."""
+    ensure_built()
+    rows = db_read("""
+        SELECT tag, block, lektionen, schueler
+        FROM auslastung
+        WHERE art='schule' AND ref_id=0 AND lektionen > 0
+        ORDER BY schueler DESC, lektionen DESC
+        LIMIT %s
+    """, (limit,)) or []
+    return [{
+        "tag": r["tag"],
+        "block": r["block"],
+        "startzeit": TIMEBLOCKS[r["block"]][0],
+        "endzeit": TIMEBLOCKS[r["block"]][1],
+        "lektionen": r["lektionen"],
+        "schueler": r["schueler"],
+    } for r in rows]
+
+
+def enrollment_counts(limit=20, fewest=False):
+    """faecher rows with the most (or fewest) enrolled students."""
+    ensure_built()
+    order = "ASC" if fewest else "DESC"
+    rows = db_read(f"""
+        SELECT faecher.id, faecher.fachname, lehrer.name AS lehrer, faecher.tag,
+               faecher.startzeit, fach_belegung.schueler
+        FROM fach_belegung
+        JOIN faecher ON faecher.id = fach_belegung.fach_id
+        JOIN lehrer ON faecher.lehrer_id = lehrer.id
+        ORDER BY fach_belegung.schueler {order}, fach_belegung.fach_id {order}
+        LIMIT %s
+    """, (limit,)) or []
+    return [{
+        "id": r["id"],
+        "fachname": r["fachname"],
+        "lehrer": r["lehrer"],
+        "tag": r["tag"],
+        "startzeit": str(r["startzeit"])[:5],
+        "schueler": r["schueler"],
+    } for r in rows]
+
+
+def report(limit=5):
+    return {
+        "raeume": overview("raum"),
+        "lehrer": overview("lehrer"),
+        "spitzen": peak_blocks(limit),
+        "faecher": enrollment_counts(limit),
+    }
+
+
+# -----------------------------
+# CLI: flask --app flask_app analytics report|rebuild
+# -----------------------------
+@click.group("analytics")
+def analytics_command():
+    """Room utilization and teacher workload."""
+
+
+@analytics_command.command("rebuild")
+@with_appcontext
+def rebuild_command():
+    """Recompute the summary tables."""
+    rebuild()
+    click.echo("Analytics rebuilt.")
+
+
+@analytics_command.command("report")
+@click.option("--limit", default=5, show_default=True, help="Rows per top list.")
+@with_appcontext
+def report_command(limit):
+    """Print occupancy per room / teacher and the busiest timeblocks."""
+    data = report(limit)
+    for title, key in (("Räume", "raeume"), ("Lehrer", "lehrer")):
+        click.echo(f"{title} (belegte Blöcke von {N_SLOTS}):")
+        for r in data[key]:
+            click.echo(f"  {str(r['name']):<20} {r['bloecke']:>3}  {r['auslastung']:>6.1%}  {r['schueler']:>6} Schüler-Blöcke")
+    click.echo("Spitzenzeiten:")
+    for r in data["spitzen"]:
+        click.echo(f"  {r['tag']:<10} {r['startzeit']}-{r['endzeit']}  {r['lektionen']:>3} Lektionen  {r['schueler']:>5} Schüler")
+    click.echo("Meistbelegte Fächer:")
+    for r in data["faecher"]:
+        click.echo(f"  {r['fachname']:<20} {str(r['lehrer']):<15} {r['tag']:<10} {r['startzeit']}  {r['schueler']:>4}")
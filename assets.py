@@ -0,0 +1,143 @@
+"""Fingerprinted static bundles and response compression.
+
+Bundles are concatenations of files under static/ (see BUNDLES). They are
+built once per process and served from memory under
+/assets/<name>.<hash>.<ext>, pre-compressed, with a one-year immutable
+Cache-Control: a changed file gets a new hash and therefore a new URL.
+Templates link them with {{ asset("base.css") }}.
+
+HTML / JSON responses are compressed on the fly (brotli if the optional
+`brotli` package is installed and the client accepts it, else gzip).
+"""
+import gzip
+import hashlib
+import os
+import re
+import threading
+
+from flask import Response, abort, request, url_for
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+BUNDLES = {
+    "base.css": ["css/base.css"],
+    "base.js": ["js/theme.js"],
+    "auth.css": ["css/auth.css"],
+    "catalog.css": ["css/catalog.css"],
+    "noten.css": ["css/noten.css"],
+    "pluspunkte.css": ["css/pluspunkte.css"],
+    "pluspunkte.js": ["js/pluspunkte.js"],
+    "todos.css": ["css/todos.css"],
+    "todos.js": ["js/todos.js"],
+    "week.css": ["css/week.css"],
+}
+MIMETYPES = {"css": "text/css; charset=utf-8", "js": "text/javascript; charset=utf-8"}
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Compression of dynamic responses
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "500"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+# Not text/calendar: the feed keeps its strong ETag (same bytes per schedule
+# version, see ical.py), compressing would turn it into a weak one
+COMPRESS_MIMETYPES = {"text/html", "application/json", "text/plain"}
+
+_FINGERPRINTED = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{10})\.(?P<ext>css|js)$")
+
+
+class Bundle:
+    def __init__(self, name, files):
+        parts = []
+        for filename in files:
+            with open(os.path.join(STATIC_DIR, filename), "rb") as f:
+                parts.append(f.read())
+        self.body = b"\n".join(parts)
+        self.hash = hashlib.sha256(self.body).hexdigest()[:10]
+        stem, ext = name.rsplit(".", 1)
+        self.filename = f"{stem}.{self.hash}.{ext}"
+        self.mimetype = MIMETYPES[ext]
+        self.encoded = {"gzip": gzip.compress(self.body, 9, mtime=0)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(self.body)
+
+
+_lock = threading.Lock()
+_bundles = None
+
+
+def bundles():
+    """name -> Bundle, built on first use (once per process)."""
+    global _bundles
+    if _bundles is None:
+        with _lock:
+            if _bundles is None:
+                # Published complete: other threads never see a half-built dict
+                _bundles = {name: Bundle(name, files) for name, files in BUNDLES.items()}
+    return _bundles
+
+
+def asset(name):
+    """URL of a bundle, e.g. asset("base.css") -> /assets/base.1a2b3c4d5e.css"""
+    return url_for("asset_file", filename=bundles()[name].filename)
+
+
+def _encoding(available):
+    accepted = request.accept_encodings
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted[encoding]:
+            return encoding
+    return None
+
+
+def asset_file(filename):
+    match = _FINGERPRINTED.match(filename)
+    bundle = bundles().get(f"{match['stem']}.{match['ext']}") if match else None
+    if bundle is None or bundle.hash != match["hash"]:
+        abort(404)
+
+    encoding = _encoding(bundle.encoded)
+    response = Response(bundle.encoded[encoding] if encoding else bundle.body, mimetype=bundle.mimetype)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = f"public, max-age={ASSET_MAX_AGE}, immutable"
+    response.set_etag(f"{bundle.hash}-{encoding or 'identity'}")
+    return response.make_conditional(request)
+
+
+# -----------------------------
+# Komprimierung (after_request)
+# -----------------------------
+def compress(response):
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _encoding(("br", "gzip") if brotli is not None else ("gzip",))
+    if encoding is None:
+        return response
+    if encoding == "br":
+        response.set_data(brotli.compress(body, quality=min(COMPRESS_LEVEL, 11)))
+    else:
+        response.set_data(gzip.compress(body, COMPRESS_LEVEL, mtime=0))
+    response.headers["Content-Encoding"] = encoding
+    # Other bytes than the uncompressed variant: strong ETags become weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    app.add_url_rule("/assets/<path:filename>", "asset_file", asset_file)
+    app.add_template_global(asset)
+    app.after_request(compress)
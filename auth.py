@@ -1,13 +1,24 @@
 import logging
+import os
+import click
+from flask.cli import with_appcontext
 from flask_login import LoginManager, UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-from db import db_read, db_write
+from passwords import hash_password, verify_password
+from db import after_commit, db_read, db_write
+from cache import TTLCache
+from refdata import lehrer_id_for, lehrer_ids
+from sessions import account_changed, cached_user, remember_user
+from pool import PoolTimeout
 
 # Logger für dieses Modul
 logger = logging.getLogger(__name__)
 
 login_manager = LoginManager()
 
+# User-Cache (per process): avoids a SELECT on users for every request
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "512"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
 
 class User(UserMixin):
     def __init__(self, id, username, password, role):
@@ -24,6 +35,9 @@ class User(UserMixin):
                 (user_id,),
                 single=True
             )
+        except PoolTimeout:
+            # Busy, not unknown: let it become a 503 instead of "wrong password"
+            raise
         except Exception:
             logger.exception("Error fetching user by id=%s", user_id)
             return None
@@ -40,6 +54,9 @@ class User(UserMixin):
                 (username,),
                 single=True
             )
+        except PoolTimeout:
+            # Busy, not unknown: let it become a 503 instead of "wrong password"
+            raise
         except Exception:
             logger.exception("Error fetching user by username=%s", username)
             return None
@@ -49,15 +66,56 @@ class User(UserMixin):
         return None
 
 
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+
+def invalidate_user(user_id=None):
+    """Drop a cached user (or all users) once the row change is committed.
+
+    Dropped any earlier, a concurrent request could cache the old row again.
+    """
+    def drop():
+        user_cache.invalidate(user_id)
+        account_changed(user_id)
+    after_commit(drop)
+
+
+def user_cache_stats():
+    return user_cache.stats()
+
+
 # Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
     try:
-        return User.get_by_id(int(user_id))
+        user_id = int(user_id)
     except ValueError:
         logger.error("Invalid user_id format: %r", user_id)
         return None
 
+    # Server-side session (if enabled): no query at all
+    ctx = cached_user(user_id)
+    if ctx is not None:
+        user = User(ctx["id"], ctx["username"], None, ctx["role"])
+        if ctx["lehrer_id"] is not None:
+            # lehrer_id_for() in the teacher routes then needs no query either
+            lehrer_ids.put(user_id, ctx["lehrer_id"])
+        elif user.role == "teacher":
+            # No lehrer row when cached - may have been imported since
+            lehrer_id = lehrer_id_for(user_id)
+            if lehrer_id is not None:
+                remember_user(user, lehrer_id)
+        return user
+
+    user = user_cache.get(user_id)
+    if user is None:
+        user = User.get_by_id(user_id)
+        if user:
+            user_cache.put(user_id, user)
+    if user:
+        remember_user(user, lehrer_id_for(user.id) if user.role == "teacher" else None)
+    return user
+
 
 # Helpers
 def register_user(username, password, role):
@@ -65,7 +123,7 @@ def register_user(username, password, role):
     if existing:
         return False
 
-    hashed = generate_password_hash(password)
+    hashed = hash_password(password)
     try:
         user_id = db_write(
             "INSERT INTO users (username, password, role) VALUES (%s, %s, %s)",
@@ -77,17 +135,76 @@ def register_user(username, password, role):
         logger.exception("Error registering user: %s", username)
         return False
 
+    invalidate_user(user_id)
     return user_id
 
 
+def change_password(user_id, password):
+    hashed = hash_password(password)
+    db_write("UPDATE users SET password = %s WHERE id = %s", (hashed, user_id))
+    invalidate_user(user_id)
+
+
+def change_role(user_id, role):
+    db_write("UPDATE users SET role = %s WHERE id = %s", (role, user_id))
+    invalidate_user(user_id)
+
+
 def authenticate(username, password):
     user = User.get_by_username(username)
 
     if not user:
         return None
 
-    if check_password_hash(user.password, password):
+    ok, rehash = verify_password(user.password, password)
+    if ok:
         logger.info("User logged in: %s", username)
+        if rehash:
+            # Stored with an older method / cost: upgrade while we have the password
+            try:
+                change_password(user.id, password)
+            except PoolTimeout:
+                raise
+            except Exception:
+                logger.exception("Error rehashing password of user id=%s", user.id)
         return user
 
-    return None
\ No newline at end of file
+    return None
+
+
+# -----------------------------
+# CLI: Benutzer verwalten
+# -----------------------------
+ROLES = ("student", "teacher", "admin")
+
+
+@click.group("users")
+def users_command():
+    """Change passwords and roles of existing users."""
+
+
+def _user_or_fail(username):
+    user = User.get_by_username(username)
+    if user is None:
+        raise click.ClickException(f"Unknown user: {username}")
+    return user
+
+
+@users_command.command("set-password")
+@click.argument("username")
+@click.password_option()
+@with_appcontext
+def set_password_command(username, password):
+    """Set a new password (prompted)."""
+    change_password(_user_or_fail(username).id, password)
+    click.echo(f"Password of {username} changed.")
+
+
+@users_command.command("set-role")
+@click.argument("username")
+@click.argument("role", type=click.Choice(ROLES))
+@with_appcontext
+def set_role_command(username, role):
+    """Make a user a student, teacher or admin."""
+    change_role(_user_or_fail(username).id, role)
+    click.echo(f"{username} is now {role}.")
@@ -0,0 +1,98 @@
+"""Login latency against password hashing cost.
+
+For every method, users are stored with a hash of that method and logged
+in through POST /login by concurrent client threads (Flask test client,
+SQLite in memory). With --rehash-from the stored hashes use that method
+instead, so every login also pays for the upgrade to the new one.
+
+    python benchmarks/bench_login.py
+    python benchmarks/bench_login.py --methods scrypt:16384:8:1 pbkdf2:sha256:600000 --workers 1 2 4
+    python benchmarks/bench_login.py --rehash-from pbkdf2:sha256:600000 --methods scrypt
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench_routes import summarize  # noqa: E402
+
+PASSWORD = "bench"
+DEFAULT_METHODS = ["pbkdf2:sha256:100000", "pbkdf2:sha256:600000", "scrypt:16384:8:1", "scrypt:32768:8:1"]
+
+
+def run(app, db, passwords, method, workers, args):
+    from werkzeug.security import generate_password_hash
+
+    passwords.configure(method=method, workers=workers)
+    stored = generate_password_hash(PASSWORD, args.rehash_from or method)
+    t0 = time.perf_counter()
+    generate_password_hash(PASSWORD, method)
+    hash_ms = (time.perf_counter() - t0) * 1000
+
+    with app.app_context():
+        db.db_write("DELETE FROM users")
+        db.db_many("INSERT INTO users (username, password, role) VALUES (%s, %s, 'student')",
+                   [(f"login{i}", stored) for i in range(args.users)])
+
+    samples, lock = [], threading.Lock()
+    per_thread = args.logins // args.concurrency
+
+    def worker(n):
+        client = app.test_client()
+        local = []
+        for i in range(per_thread):
+            username = f"login{(n * per_thread + i) % args.users}"
+            t = time.perf_counter()
+            response = client.post("/login", data={"username": username, "password": PASSWORD})
+            local.append(time.perf_counter() - t)
+            if response.status_code != 302:
+                raise RuntimeError(f"login failed: HTTP {response.status_code}")
+            client.get("/logout")
+        with lock:
+            samples.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = summarize(samples, elapsed=time.perf_counter() - started)
+    result["hash_ms"] = round(hash_ms, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--methods", nargs="+", default=DEFAULT_METHODS)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2], help="Hashing pool sizes to try.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client threads logging in at once.")
+    parser.add_argument("--logins", type=int, default=64, help="Logins per method (all threads).")
+    parser.add_argument("--users", type=int, default=1000,
+                        help="Distinct users (>= --logins, so each rehash is measured once).")
+    parser.add_argument("--rehash-from", help="Method of the stored hashes (measures rehash-on-login).")
+    args = parser.parse_args()
+
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ.setdefault("DB_SQLITE_PATH", ":memory:")
+
+    import logging
+    logging.disable(logging.INFO)
+    import db
+    import passwords
+    from flask_app import app
+
+    app.config["DEBUG"] = False
+    print(f"{'method':<24} {'workers':>7} {'hash_ms':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'logins/s':>9}")
+    for method in args.methods:
+        for workers in args.workers:
+            r = run(app, db, passwords, method, workers, args)
+            print(f"{method:<24} {workers:>7} {r['hash_ms']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+                  f"{r['p99_ms']:>8} {r['throughput_rps']:>9}")
+
+
+if __name__ == "__main__":
+    main()
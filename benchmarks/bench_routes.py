@@ -0,0 +1,617 @@
+"""Latency / throughput benchmark for every route of flask_app.py.
+
+Seeds a synthetic school (teachers, rooms, students with enrollments,
+exams and todos) and drives the routes either through the Flask test
+client (also counts queries per request) or through a real threaded
+WSGI server with concurrent clients. Routes no request reached are
+listed at the end ("Not benchmarked"), so new routes don't go unmeasured.
+
+    python benchmarks/bench_routes.py                       # SQLite in memory, test client
+    python benchmarks/bench_routes.py --mode wsgi --concurrency 8
+    python benchmarks/bench_routes.py --save benchmarks/baselines/sqlite.json
+    python benchmarks/bench_routes.py --compare benchmarks/baselines/sqlite.json
+
+Without --backend mysql the app runs on an in-memory SQLite database
+(a temporary file in wsgi mode), so no MySQL server is needed. --compare exits with 1 if a route got
+slower than --tolerance (p95) or issues more queries than the baseline.
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from solver import TIMEBLOCKS  # noqa: E402
+
+PASSWORD = "bench"
+
+
+# -----------------------------
+# Query-Zähler um das DB-Backend
+# -----------------------------
+class _CountingCursor:
+    def __init__(self, cursor, counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def execute(self, *args, **kwargs):
+        self._counter.add()
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._counter.add()
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _CountingConnection:
+    def __init__(self, conn, counter):
+        self._conn = conn
+        self._counter = counter
+
+    def cursor(self, *args, **kwargs):
+        return _CountingCursor(self._conn.cursor(*args, **kwargs), self._counter)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class CountingBackend:
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = inner.name
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self):
+        with self._lock:
+            self.count += 1
+
+    def connect(self):
+        return _CountingConnection(self.inner.connect(), self)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+# -----------------------------
+# Synthetische Schule
+# -----------------------------
+def seed(db, args, rnd):
+    from werkzeug.security import generate_password_hash
+    import grade_stats
+    from solver import solve
+
+    # One hash for everyone - hashing thousands of passwords would dominate the seed time
+    hashed = generate_password_hash(PASSWORD)
+
+    users = [(f"lehrer{i}", hashed, "teacher") for i in range(args.teachers)]
+    users += [(f"schueler{i}", hashed, "student") for i in range(args.students)]
+    users.append(("admin0", hashed, "admin"))
+    db.db_many("INSERT INTO users (username, password, role) VALUES (%s, %s, %s)", users)
+    ids = {r["username"]: r["id"] for r in db.db_read("SELECT id, username FROM users")}
+    teacher_users = [ids[f"lehrer{i}"] for i in range(args.teachers)]
+    student_users = [ids[f"schueler{i}"] for i in range(args.students)]
+
+    db.db_many("INSERT INTO lehrer (name, user_id) VALUES (%s, %s)",
+               [(f"lehrer{i}", uid) for i, uid in enumerate(teacher_users)])
+    lehrer_ids = [r["id"] for r in db.db_read("SELECT id FROM lehrer ORDER BY id")]
+    db.db_many("INSERT INTO raum (raumnummer) VALUES (%s)", [(f"R{i:03d}",) for i in range(args.rooms)])
+    raum_ids = [r["id"] for r in db.db_read("SELECT id FROM raum ORDER BY id")]
+
+    subjects = ["Mathematik", "Deutsch", "Englisch", "Französisch", "Geschichte", "Biologie",
+                "Chemie", "Physik", "Informatik", "Musik", "Sport", "Geografie"]
+    lessons = [
+        {"id": n, "lehrer_id": lehrer_ids[n % len(lehrer_ids)], "raum_id": None}
+        for n in range(args.teachers * args.lessons_per_teacher)
+    ]
+    result = solve(lessons, raum_ids, {}, time_budget=10)
+    rows = [
+        (rnd.choice(subjects), lessons[n]["lehrer_id"], a["raum_id"], a["tag"], a["startzeit"], a["endzeit"])
+        for n, a in sorted(result["assignments"].items())
+    ]
+    db.db_many("INSERT INTO faecher (fachname, lehrer_id, raum_id, tag, startzeit, endzeit) "
+               "VALUES (%s, %s, %s, %s, %s, %s)", rows)
+    faecher = db.db_read("SELECT id, fachname, tag, startzeit FROM faecher")
+
+    # Enrollments without clashes
+    enrollments, exams, weights, todos = [], [], [], []
+    for uid in student_users:
+        taken, fachnamen = set(), set()
+        for f in rnd.sample(faecher, len(faecher)):
+            slot = (f["tag"], str(f["startzeit"]))
+            if slot in taken:
+                continue
+            taken.add(slot)
+            fachnamen.add(f["fachname"])
+            enrollments.append((uid, f["id"]))
+            if len(taken) >= args.enrollments:
+                break
+        for fachname in fachnamen:
+            weights.append((uid, fachname, rnd.choice([1.0, 1.0, 2.0])))
+            for _ in range(args.exams):
+                exams.append((uid, fachname, rnd.choice([3.5, 4.0, 4.5, 5.0, 5.5, 6.0]), 1.0))
+        for t in range(args.todos):
+            due = date.today() + timedelta(days=rnd.randint(-5, 20))
+            todos.append((uid, f"Aufgabe {t}", due.isoformat(), rnd.random() < 0.3))
+    db.db_many("INSERT INTO stundenplan (user_id, fach_id) VALUES (%s, %s)", enrollments)
+    db.db_many("INSERT INTO fach_gewichtungen (user_id, fachname, gewichtung) VALUES (%s, %s, %s)", weights)
+    db.db_many("INSERT INTO pruefungen (user_id, fachname, note, gewichtung) VALUES (%s, %s, %s, %s)", exams)
+    db.db_many("INSERT INTO todos (user_id, title, due_date, completed) VALUES (%s, %s, %s, %s)", todos)
+    # Nightly batch job (teacher / admin grade statistics); it streams on its own connection
+    db.commit()
+    grade_stats.rebuild()
+
+    return {
+        "teachers": [f"lehrer{i}" for i in range(args.teachers)],
+        "students": [f"schueler{i}" for i in range(args.students)],
+        "admins": ["admin0"],
+        "rows": {"faecher": len(rows), "stundenplan": len(enrollments),
+                 "pruefungen": len(exams), "todos": len(todos)},
+    }
+
+
+def user_context(db, username):
+    """Ids a user's requests need (own entries, lessons, todos, feed URL)."""
+    from ical import calendar_token
+
+    user = db.db_read("SELECT id, role FROM users WHERE username=%s", (username,), single=True)
+    ctx = {"username": username, "id": user["id"], "role": user["role"], "todos": []}
+    ctx["calendar"] = calendar_token(user["id"], user["role"])
+    if user["role"] == "student":
+        ctx["stundenplan"] = db.db_read("SELECT id, fach_id FROM stundenplan WHERE user_id=%s", (user["id"],))
+        ctx["todos"] = [r["id"] for r in db.db_read("SELECT id FROM todos WHERE user_id=%s", (user["id"],))]
+        ctx["faecher"] = [r["id"] for r in db.db_read("SELECT id FROM faecher")]
+    elif user["role"] == "teacher":
+        ctx["lehrer_id"] = db.db_read("SELECT id FROM lehrer WHERE user_id=%s", (user["id"],), single=True)["id"]
+        ctx["lessons"] = db.db_read("""
+            SELECT faecher.id, faecher.fachname, raum.raumnummer, faecher.tag, faecher.startzeit, faecher.endzeit
+            FROM faecher JOIN lehrer ON faecher.lehrer_id = lehrer.id JOIN raum ON faecher.raum_id = raum.id
+            WHERE lehrer.user_id=%s
+        """, (user["id"],))
+    return ctx
+
+
+# -----------------------------
+# Routen: (name, role, method, path(ctx, rnd), form/json(ctx, rnd))
+# -----------------------------
+TAG_NUMBER = {"Montag": "1", "Dienstag": "2", "Mittwoch": "3", "Donnerstag": "4", "Freitag": "5"}
+
+
+def _hhmm(value):
+    hours, minutes = str(value).split(":")[:2]
+    return f"{int(hours):02d}:{int(minutes):02d}"
+
+
+def _lesson_form(ctx, rnd):
+    lesson = rnd.choice(ctx["lessons"])
+    return {
+        "subject": lesson["fachname"], "room": lesson["raumnummer"],
+        "weekday": TAG_NUMBER[lesson["tag"]],
+        "timeblock": f"{_hhmm(lesson['startzeit'])}-{_hhmm(lesson['endzeit'])}",
+    }
+
+
+def _pluspunkte_payload(ctx, rnd):
+    return {"subjects": [{"fachname": "Mathematik", "fach_gewichtung": 1.0,
+                          "pruefungen": [{"note": rnd.choice([4.0, 4.5, 5.0]), "gewichtung": 1.0}]}]}
+
+
+def _new_lesson_form(ctx, rnd):
+    # Random slot: some requests insert, the others hit the conflict check
+    start, end = rnd.choice(TIMEBLOCKS)
+    return {"subject": "Bench", "room": f"B{rnd.randrange(100):02d}",
+            "weekday": rnd.choice(list(TAG_NUMBER.values())), "timeblock": f"{start}-{end}"}
+
+
+def _import_file(ctx, rnd):
+    lines = ["fachname,lehrer,raum,tag,startzeit,endzeit"]
+    for _ in range(20):
+        start, end = rnd.choice(TIMEBLOCKS)
+        lines.append(f"Bench,lehrer{rnd.randrange(3)},B{rnd.randrange(100):02d},"
+                     f"{rnd.choice(list(TAG_NUMBER))},{start},{end}")
+    return {"file": ("lessons.csv", "\n".join(lines) + "\n"), "dry_run": "1"}
+
+
+# Rows the deleting routes remove, created right before each (untimed) request
+def _fresh_todo(ctx):
+    import db
+    return db.db_write("INSERT INTO todos (user_id, title, due_date, completed) VALUES (%s, 'Bench', %s, 0)",
+                       (ctx["id"], date.today().isoformat()), return_id=True)
+
+
+def _fresh_enrollment(ctx):
+    import db
+    fach = db.db_read("SELECT id FROM faecher WHERE id NOT IN (SELECT fach_id FROM stundenplan WHERE user_id=%s) "
+                      "ORDER BY id LIMIT 1", (ctx["id"],), single=True)
+    return db.db_write("INSERT INTO stundenplan (user_id, fach_id) VALUES (%s, %s)",
+                       (ctx["id"], fach["id"]), return_id=True)
+
+
+def _fresh_lesson(ctx):
+    # No slot, so deleting it leaves the analytics summaries untouched
+    import db
+    return db.db_write("INSERT INTO faecher (fachname, lehrer_id) VALUES ('Bench', %s)",
+                       (ctx["lehrer_id"],), return_id=True)
+
+
+ROUTES = [
+    ("GET /login", None, "GET", lambda c, r: "/login", None),
+    ("GET /register", None, "GET", lambda c, r: "/register", None),
+    ("POST /register", None, "POST", lambda c, r: "/register",
+     lambda c, r: {"username": f"neu{r.getrandbits(48):x}", "password": PASSWORD, "role": "student"}),
+    ("POST /login", None, "POST", lambda c, r: "/login",
+     lambda c, r: {"username": f"schueler{r.randrange(10)}", "password": PASSWORD}),
+    ("GET /calendar.ics", "student", "GET", lambda c, r: f"/calendar/{c['calendar']}.ics", None),
+    ("GET /assets", None, "GET", lambda c, r: _asset_path("base.css"), None),
+    ("GET /metrics", None, "GET", lambda c, r: "/metrics", None),
+    ("GET /", "student", "GET", lambda c, r: "/", None),
+    ("GET /week", "student", "GET", lambda c, r: "/week", None),
+    ("GET /schedule/add", "student", "GET", lambda c, r: "/schedule/add", None),
+    ("GET /api/faecher", "student", "GET", lambda c, r: "/api/faecher?free_only=1", None),
+    ("GET /api/faecher?q", "student", "GET",
+     lambda c, r: f"/api/faecher?q={r.choice(['Ma', 'De', 'lehrer1'])}&tag={r.choice(list(TAG_NUMBER))}", None),
+    ("GET /api/free_slots", "student", "GET", lambda c, r: "/api/free_slots", None),
+    ("GET /api/suggestions", "student", "GET", lambda c, r: f"/api/suggestions?fach_id={r.choice(c['faecher'])}", None),
+    ("POST /schedule/add", "student", "POST", lambda c, r: "/schedule/add",
+     lambda c, r: {"fach_id": r.choice(c["faecher"])}),
+    ("GET /schedule/edit", "student", "GET",
+     lambda c, r: f"/schedule/edit/{r.choice(c['stundenplan'])['id']}", None),
+    ("POST /schedule/edit", "student", "POST",
+     lambda c, r: f"/schedule/edit/{c['stundenplan'][0]['id']}",
+     lambda c, r: {"fach": c["stundenplan"][0]["fach_id"]}),
+    ("POST /schedule/delete", "student", "POST", lambda c, r: f"/schedule/delete/{_fresh_enrollment(c)}", None),
+    ("GET /export/schedule", "student", "GET", lambda c, r: "/export/schedule", None),
+    ("GET /pluspunkte", "student", "GET", lambda c, r: "/pluspunkte", None),
+    ("POST /pluspunkte/save", "student", "JSON", lambda c, r: "/pluspunkte/save",
+     lambda c, r: _pluspunkte_payload(c, r)["subjects"][0]),
+    ("POST /pluspunkte/save_all", "student", "JSON", lambda c, r: "/pluspunkte/save_all", _pluspunkte_payload),
+    ("GET /api/pluspunkte/projection", "student", "GET",
+     lambda c, r: f"/api/pluspunkte/projection?goal={r.choice([0, 1, 2])}", None),
+    ("GET /todos", "student", "GET", lambda c, r: "/todos", None),
+    ("POST /todos/add", "student", "POST", lambda c, r: "/todos/add",
+     lambda c, r: {"title": "Bench", "due_date": date.today().isoformat()}),
+    ("POST /todos/toggle", "student", "POST", lambda c, r: f"/todos/toggle/{r.choice(c['todos'])}", None),
+    ("POST /todos/delete", "student", "POST", lambda c, r: f"/todos/delete/{_fresh_todo(c)}", None),
+    ("GET /api/todos", "student", "GET", lambda c, r: "/api/todos", None),
+    ("POST /api/todos", "student", "JSON", lambda c, r: "/api/todos",
+     lambda c, r: {"title": "Bench", "due_date": date.today().isoformat()}),
+    ("POST /api/todos/toggle", "student", "POST", lambda c, r: f"/api/todos/{r.choice(c['todos'])}/toggle", None),
+    ("DELETE /api/todos", "student", "DELETE", lambda c, r: f"/api/todos/{_fresh_todo(c)}", None),
+    ("GET /teacher/week", "teacher", "GET", lambda c, r: "/teacher/week", None),
+    ("GET /teacher/noten", "teacher", "GET", lambda c, r: "/teacher/noten", None),
+    ("GET /lesson/add", "teacher", "GET", lambda c, r: "/lesson/add", None),
+    ("POST /lesson/add", "teacher", "POST", lambda c, r: "/lesson/add", _new_lesson_form),
+    ("GET /lesson/edit", "teacher", "GET", lambda c, r: f"/lesson/edit/{r.choice(c['lessons'])['id']}", None),
+    ("POST /lesson/edit", "teacher", "POST",
+     lambda c, r: f"/lesson/edit/{c['lessons'][0]['id']}",
+     lambda c, r: _lesson_form({"lessons": c["lessons"][:1]}, r)),
+    ("POST /lesson/delete", "teacher", "POST", lambda c, r: f"/lesson/delete/{_fresh_lesson(c)}", None),
+    ("GET /admin/analytics", "admin", "GET", lambda c, r: "/admin/analytics", None),
+    ("GET /admin/analytics/raum", "admin", "GET", lambda c, r: f"/admin/analytics/raum/{r.randrange(1, 10)}", None),
+    ("GET /admin/noten", "admin", "GET", lambda c, r: "/admin/noten", None),
+    ("GET /admin/export", "admin", "GET", lambda c, r: "/admin/export/lessons?format=jsonl", None),
+    ("POST /admin/import", "admin", "POST", lambda c, r: "/admin/import/lessons", _import_file),
+    ("POST /admin/timetable/solve", "admin", "JSON", lambda c, r: "/admin/timetable/solve",
+     lambda c, r: {"budget": 1, "dry_run": True}),
+    ("GET /logout", "student", "GET", lambda c, r: "/logout", None),
+]
+
+# Routes that end the session: the client logs in again (untimed) before each request
+RELOGIN = {"GET /logout"}
+
+
+def _asset_path(name):
+    import assets
+    return f"/assets/{assets.bundles()[name].filename}"
+
+
+def usable_routes(contexts):
+    """ROUTES without those the seeded data can't serve (e.g. --todos 0)."""
+    needs = {"POST /todos/toggle": "todos", "POST /api/todos/toggle": "todos",
+             "GET /schedule/edit": "stundenplan", "POST /schedule/edit": "stundenplan",
+             "GET /lesson/edit": "lessons", "POST /lesson/edit": "lessons"}
+    usable = []
+    for route in ROUTES:
+        name, role = route[0], route[1]
+        candidates = [c for c in contexts if c["role"] == role] if role else [None]
+        if role and not candidates:
+            continue
+        if name in needs and not all(c.get(needs[name]) for c in candidates):
+            continue
+        usable.append(route)
+    return usable
+
+
+def _covered(app):
+    """Collect (rule, method) of every request served, for uncovered_rules()."""
+    from flask import request, request_finished
+
+    seen = set()
+
+    def record(sender, response, **extra):
+        if request.url_rule is not None:
+            seen.add((request.url_rule.rule, request.method))
+
+    request_finished.connect(record, app, weak=False)
+    return seen
+
+
+def uncovered_rules(app, seen):
+    """'METHOD /rule' of the app's routes no benchmarked request reached."""
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == "static":
+            continue
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            if (rule.rule, method) not in seen:
+                missing.append(f"{method} {rule.rule}")
+    return sorted(missing)
+
+
+# -----------------------------
+# Messung
+# -----------------------------
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+
+def summarize(samples, queries=None, elapsed=None):
+    ms = sorted(s * 1000 for s in samples)
+    out = {
+        "requests": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+    }
+    if queries is not None:
+        out["queries_per_request"] = round(queries / max(len(ms), 1), 2)
+    if elapsed:
+        out["throughput_rps"] = round(len(ms) / elapsed, 1)
+    return out
+
+
+def run_test_client(app, counter, contexts, args, rnd):
+    clients = {}
+    for ctx in contexts:
+        client = app.test_client()
+        client.post("/login", data={"username": ctx["username"], "password": PASSWORD})
+        clients[ctx["username"]] = client
+    anonymous = app.test_client()
+
+    results = {}
+    for name, role, method, path, payload in usable_routes(contexts):
+        candidates = [c for c in contexts if c["role"] == role] if role else [None]
+        samples, queries = [], 0
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            ctx = rnd.choice(candidates)
+            client = clients[ctx["username"]] if ctx else anonymous
+            if name in RELOGIN:
+                client.post("/login", data={"username": ctx["username"], "password": PASSWORD})
+            url = path(ctx, rnd)
+            data = payload(ctx, rnd) if payload else None
+            if data and "file" in data:
+                data = {**data, "file": (io.BytesIO(data["file"][1].encode()), data["file"][0])}
+            before = counter.count
+            t0 = time.perf_counter()
+            if method == "JSON":
+                response = client.post(url, json=data)
+            elif method == "POST":
+                response = client.post(url, data=data)
+            else:
+                response = client.open(url, method=method)
+            response.get_data()  # streamed bodies (exports) are produced here
+            response.close()
+            samples.append(time.perf_counter() - t0)
+            queries += counter.count - before
+            if response.status_code >= 500:
+                raise RuntimeError(f"{name}: HTTP {response.status_code}")
+        results[name] = summarize(samples, queries, time.perf_counter() - started)
+    return results
+
+
+def _http_login(host, port, username):
+    conn = http.client.HTTPConnection(host, port)
+    body = urlencode({"username": username, "password": PASSWORD})
+    conn.request("POST", "/login", body, {"Content-Type": "application/x-www-form-urlencoded"})
+    response = conn.getresponse()
+    response.read()
+    cookie = response.getheader("Set-Cookie", "").split(";", 1)[0]
+    return conn, cookie
+
+
+def _multipart(data):
+    """(body, content type) of a form with one ("file": (filename, text)) upload."""
+    boundary = "bench-boundary"
+    parts = []
+    for key, value in data.items():
+        if isinstance(value, tuple):
+            head = f'Content-Disposition: form-data; name="{key}"; filename="{value[0]}"\r\nContent-Type: text/csv'
+            value = value[1]
+        else:
+            head = f'Content-Disposition: form-data; name="{key}"'
+        parts.append(f"--{boundary}\r\n{head}\r\n\r\n{value}\r\n")
+    body = "".join(parts) + f"--{boundary}--\r\n"
+    return body.encode(), f"multipart/form-data; boundary={boundary}"
+
+
+def run_wsgi(app, contexts, args, rnd):
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    host, port = server.server_address[:2]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = {}
+    try:
+        for name, role, method, path, payload in usable_routes(contexts):
+            candidates = [c for c in contexts if c["role"] == role] if role else [None]
+            samples, lock = [], threading.Lock()
+            per_worker = max(1, args.requests // args.concurrency)
+
+            def worker(seed):
+                wrnd = random.Random(seed)
+                ctx = wrnd.choice(candidates)
+                if ctx:
+                    conn, cookie = _http_login(host, port, ctx["username"])
+                else:
+                    conn, cookie = http.client.HTTPConnection(host, port), ""
+                for _ in range(per_worker):
+                    if name in RELOGIN:
+                        conn.close()
+                        conn, cookie = _http_login(host, port, ctx["username"])
+                    headers = {"Cookie": cookie} if cookie else {}
+                    body = None
+                    url = path(ctx, wrnd)
+                    data = payload(ctx, wrnd) if payload else None
+                    if method == "JSON":
+                        body = json.dumps(data)
+                        headers["Content-Type"] = "application/json"
+                    elif data and "file" in data:
+                        body, headers["Content-Type"] = _multipart(data)
+                    elif data is not None:
+                        body = urlencode(data)
+                        headers["Content-Type"] = "application/x-www-form-urlencoded"
+                    t0 = time.perf_counter()
+                    conn.request("POST" if method == "JSON" else method, url, body, headers)
+                    response = conn.getresponse()
+                    response.read()
+                    elapsed = time.perf_counter() - t0
+                    if response.status >= 500:
+                        raise RuntimeError(f"{name}: HTTP {response.status}")
+                    with lock:
+                        samples.append(elapsed)
+                conn.close()
+
+            threads = [threading.Thread(target=worker, args=(rnd.random(),)) for _ in range(args.concurrency)]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            results[name] = summarize(samples, elapsed=time.perf_counter() - started)
+    finally:
+        server.shutdown()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Routes whose p95 or query count regressed against the baseline."""
+    regressions = []
+    for name, now in results.items():
+        before = baseline.get("routes", {}).get(name)
+        if not before:
+            continue
+        if now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+        if now.get("queries_per_request", 0) > before.get("queries_per_request", float("inf")):
+            regressions.append(f"{name}: queries/request {before['queries_per_request']} -> {now['queries_per_request']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--mode", choices=["test", "wsgi"], default="test")
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--rooms", type=int, default=25)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--lessons-per-teacher", type=int, default=15)
+    parser.add_argument("--enrollments", type=int, default=12)
+    parser.add_argument("--exams", type=int, default=3)
+    parser.add_argument("--todos", type=int, default=8)
+    parser.add_argument("--users", type=int, default=20, help="Logged-in users driving the requests.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Client threads (wsgi mode).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write results as JSON baseline to this file.")
+    parser.add_argument("--compare", help="Baseline JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 slowdown (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    os.environ["DB_BACKEND"] = args.backend
+    if args.backend == "sqlite":
+        # In-memory SQLite locks whole tables without waiting: concurrent
+        # writers (wsgi mode) need a file database (WAL, busy timeout)
+        if args.mode == "wsgi" and "DB_SQLITE_PATH" not in os.environ:
+            os.environ["DB_SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench-routes-"), "school.db")
+        os.environ.setdefault("DB_SQLITE_PATH", ":memory:")
+
+    import logging
+    logging.disable(logging.INFO)
+    import db
+    from flask_app import app
+
+    app.config["DEBUG"] = False
+    counter = CountingBackend(db.backend)
+    db.backend = counter
+    rnd = random.Random(args.seed)
+
+    t0 = time.perf_counter()
+    with app.app_context():
+        school = seed(db, args, rnd)
+    seed_seconds = time.perf_counter() - t0
+    with app.app_context():
+        users = rnd.sample(school["students"], min(args.users, len(school["students"])))
+        users += school["teachers"][:max(1, args.users // 4)] + school["admins"]
+        contexts = [user_context(db, u) for u in users]
+
+    seen = _covered(app)
+    if args.mode == "test":
+        results = run_test_client(app, counter, contexts, args, rnd)
+    else:
+        results = run_wsgi(app, contexts, args, rnd)
+
+    report = {
+        "meta": {
+            "backend": args.backend, "mode": args.mode, "requests_per_route": args.requests,
+            "concurrency": args.concurrency if args.mode == "wsgi" else 1,
+            "python": platform.python_version(), "seed_seconds": round(seed_seconds, 2),
+            "school": school["rows"],
+        },
+        "routes": results,
+    }
+
+    print(f"{'route':<28} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6} {'req/s':>8}")
+    for name, r in results.items():
+        print(f"{name:<28} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r.get('queries_per_request', '-'):>6} {r.get('throughput_rps', '-'):>8}")
+
+    missing = uncovered_rules(app, seen)
+    if missing:
+        print("Not benchmarked: " + ", ".join(missing), file=sys.stderr)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION " + line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
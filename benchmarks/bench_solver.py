@@ -0,0 +1,74 @@
+"""Benchmark the timetable solver on synthetic schools.
+
+    python benchmarks/bench_solver.py [--sizes 50 500 5000] [--budget 10]
+
+A school is built from classes of 20 students; every class attends 25
+lessons per week (of 30 slots), each teacher gives up to 22 lessons and
+there are 25% more rooms than strictly needed.
+"""
+import argparse
+import os
+import random
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from solver import solve, SLOTS  # noqa: E402
+
+LESSONS_PER_CLASS = 25
+STUDENTS_PER_CLASS = 20
+LESSONS_PER_TEACHER = 22
+
+
+def synthetic_school(n_lessons, seed=0):
+    rnd = random.Random(seed)
+    n_classes = max(1, n_lessons // LESSONS_PER_CLASS)
+    n_teachers = max(1, -(-n_lessons // LESSONS_PER_TEACHER))
+    n_rooms = max(1, int(n_lessons / len(SLOTS) * 1.25) + 1)
+
+    teacher_load = defaultdict(int)
+    lessons, students_of = [], {}
+    for fach_id in range(1, n_lessons + 1):
+        klasse = (fach_id - 1) % n_classes
+        free = [t for t in range(n_teachers) if teacher_load[t] < LESSONS_PER_TEACHER]
+        teacher = rnd.choice(free)
+        teacher_load[teacher] += 1
+        lessons.append({"id": fach_id, "lehrer_id": teacher, "raum_id": None})
+        first = klasse * STUDENTS_PER_CLASS
+        students_of[fach_id] = set(range(first, first + STUDENTS_PER_CLASS))
+    return lessons, list(range(n_rooms)), students_of
+
+
+def check(result, lessons, students_of):
+    """Count clashes of teachers, rooms and students in a result."""
+    seen, clashes = set(), 0
+    teacher_of = {l["id"]: l["lehrer_id"] for l in lessons}
+    for fach_id, a in result["assignments"].items():
+        slot = (a["tag"], a["startzeit"])
+        keys = [("t", teacher_of[fach_id]), ("r", a["raum_id"])]
+        keys += [("s", s) for s in students_of.get(fach_id, ())]
+        for key in keys:
+            if (key, slot) in seen:
+                clashes += 1
+            seen.add((key, slot))
+    return clashes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--budget", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'lessons':>8} {'placed':>8} {'unplaced':>9} {'clashes':>8} {'steps':>8} {'seconds':>8}")
+    for n in args.sizes:
+        lessons, rooms, students_of = synthetic_school(n, args.seed)
+        result = solve(lessons, rooms, students_of, args.budget, args.seed)
+        print(f"{n:>8} {len(result['assignments']):>8} {len(result['unplaced']):>9} "
+              f"{check(result, lessons, students_of):>8} {result['repair_steps']:>8} {result['seconds']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+"""Bulk import / export of teachers, rooms, lessons and enrollments.
+
+Formats: CSV with a header line, JSON Lines (one object per line) or a
+JSON array. Columns per kind (export writes the same, so an export can
+be imported again):
+
+    teachers     username, name, password
+    rooms        raumnummer
+    lessons      fachname, lehrer, raum, tag, startzeit, endzeit
+    enrollments  student, lehrer, tag, startzeit   (+ fachname, ignored)
+
+`lehrer`/`student` are usernames, missing rooms of lessons are created;
+a lesson is identified by its teacher, weekday and start time (a
+teacher can't teach two lessons at once).
+Rows are read lazily, checked against the same conflict rules as the
+forms and written in chunks of multi-row INSERTs, one transaction per
+chunk. Invalid rows are skipped and reported with their line number.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import time
+
+import click
+from flask.cli import with_appcontext
+
+from db import db_read, db_many, transaction, rollback
+from passwords import hash_passwords
+from conflicts import IntervalIndex, index as conflict_index, to_minutes
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+MAX_REPORTED_ERRORS = 100
+
+WOCHENTAGE = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]
+TAGE = {str(i): tag for i, tag in enumerate(WOCHENTAGE, start=1)}
+
+FIELDS = {
+    "teachers": ["username", "name", "password"],
+    "rooms": ["raumnummer"],
+    "lessons": ["fachname", "lehrer", "raum", "tag", "startzeit", "endzeit"],
+    "enrollments": ["student", "lehrer", "tag", "startzeit", "fachname"],
+}
+KINDS = list(FIELDS)
+
+
+class RowError(ValueError):
+    """A single input row is invalid (reported, the import goes on)."""
+
+
+# -----------------------------
+# Einlesen
+# -----------------------------
+def read_rows(stream, fmt):
+    """Yield (line_number, dict) from a text stream, lazily where possible."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, start=1):
+            if line.strip():
+                yield line_no, json.loads(line)
+    elif fmt == "json":
+        for i, row in enumerate(json.load(stream), start=1):
+            yield i, row
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+def guess_format(filename, default="csv"):
+    ext = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    return {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl", "json": "json"}.get(ext, default)
+
+
+def _text(row, key, required=True):
+    value = row.get(key)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f"'{key}' fehlt")
+    return value
+
+
+def _tag(row):
+    tag = _text(row, "tag")
+    tag = TAGE.get(tag, tag)
+    if tag not in WOCHENTAGE:
+        raise RowError(f"Unbekannter Wochentag: {tag}")
+    return tag
+
+
+def _time(row, key):
+    value = _text(row, key)
+    try:
+        minutes = to_minutes(value)
+    except ValueError:
+        raise RowError(f"Ungültige Zeit in '{key}': {value}")
+    if not 0 <= minutes < 24 * 60:
+        raise RowError(f"Ungültige Zeit in '{key}': {value}")
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _chunks(rows, size):
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _in(values):
+    return ", ".join(["%s"] * len(values))
+
+
+# -----------------------------
+# Import
+# -----------------------------
+class Importer:
+    def __init__(self, kind, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+        if kind not in FIELDS:
+            raise ValueError(f"Unknown kind: {kind}")
+        self.kind = kind
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.result = {"kind": kind, "rows": 0, "inserted": 0, "skipped": 0, "errors": [], "dry_run": dry_run}
+        # Private copy of the conflict rules, also sees the rows of this import
+        self.index = IntervalIndex(ttl=float("inf"))
+        self._temp_id = 0
+        self._lesson_keys = None
+
+    def error(self, line, message):
+        self.result["skipped"] += 1
+        if len(self.result["errors"]) < MAX_REPORTED_ERRORS:
+            self.result["errors"].append({"line": line, "error": message})
+
+    def run(self, rows):
+        started = time.perf_counter()
+        if self.kind in ("lessons", "enrollments"):
+            self.index.load()
+        handler = getattr(self, f"_import_{self.kind}")
+        for chunk in _chunks(rows, self.chunk_size):
+            self.result["rows"] += len(chunk)
+            with transaction():
+                self.result["inserted"] += handler(chunk)
+                if self.dry_run:
+                    rollback()
+        if not self.dry_run and self.result["inserted"]:
+            _changed()
+        self.result["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info("Import %s: %d rows, %d inserted, %d skipped in %.2fs", self.kind,
+                    self.result["rows"], self.result["inserted"], self.result["skipped"], self.result["seconds"])
+        return self.result
+
+    # --- Lehrer ---
+    def _import_teachers(self, chunk):
+        parsed = {}
+        for line, row in chunk:
+            try:
+                username = _text(row, "username")
+                if username in parsed:
+                    raise RowError(f"Benutzer doppelt (schon in Zeile {parsed[username][0]}): {username}")
+                parsed[username] = (line, _text(row, "name", required=False) or username,
+                                    _text(row, "password", required=False))
+            except RowError as e:
+                self.error(line, str(e))
+        if not parsed:
+            return 0
+
+        names = list(parsed)
+        existing = {r["username"]: r for r in db_read(f"""
+            SELECT users.id, users.username, users.role, lehrer.id AS lehrer_id
+            FROM users LEFT JOIN lehrer ON lehrer.user_id = users.id
+            WHERE users.username IN ({_in(names)})
+        """, names) or []}
+
+        new_users = []
+        for username, (line, name, password) in parsed.items():
+            user = existing.get(username)
+            if user and (user["role"] != "teacher" or user["lehrer_id"]):
+                self.error(line, f"Benutzer existiert bereits: {username}")
+            elif not user and not password:
+                self.error(line, f"'password' fehlt für neuen Lehrer {username}")
+            elif not user:
+                new_users.append((username, password))
+        # All hashing workers at once instead of one password after the other
+        hashed = hash_passwords([password for _, password in new_users])
+        db_many("INSERT INTO users (username, password, role) VALUES (%s, %s, %s)",
+                [(username, h, "teacher") for (username, _), h in zip(new_users, hashed)])
+
+        # lehrer rows for the new teachers and teacher accounts without one
+        wanted = [u for u in names if u not in existing or (existing[u]["role"] == "teacher" and not existing[u]["lehrer_id"])]
+        if not wanted:
+            return 0
+        ids = db_read(f"SELECT id, username FROM users WHERE username IN ({_in(wanted)})", wanted) or []
+        return db_many("INSERT INTO lehrer (name, user_id) VALUES (%s, %s)",
+                       [(parsed[r["username"]][1], r["id"]) for r in ids])
+
+    # --- Räume ---
+    def _room_ids(self, numbers):
+        """raumnummer -> id, inserting the missing rooms (one INSERT per chunk)."""
+        numbers = list(numbers)
+        if not numbers:
+            return {}
+        found = {r["raumnummer"]: r["id"] for r in db_read(
+            f"SELECT id, raumnummer FROM raum WHERE raumnummer IN ({_in(numbers)})", numbers) or []}
+        missing = [(n,) for n in numbers if n not in found]
+        if missing:
+            db_many("INSERT INTO raum (raumnummer) VALUES (%s)", missing)
+            found.update({r["raumnummer"]: r["id"] for r in db_read(
+                f"SELECT id, raumnummer FROM raum WHERE raumnummer IN ({_in([m[0] for m in missing])})",
+                [m[0] for m in missing]) or []})
+        return found
+
+    def _import_rooms(self, chunk):
+        numbers = {}
+        for line, row in chunk:
+            try:
+                number = _text(row, "raumnummer")
+                if number in numbers:
+                    raise RowError(f"Raum doppelt (schon in Zeile {numbers[number]}): {number}")
+                numbers[number] = line
+            except RowError as e:
+                self.error(line, str(e))
+        before = len(numbers)
+        found = {r["raumnummer"] for r in db_read(
+            f"SELECT raumnummer FROM raum WHERE raumnummer IN ({_in(list(numbers))})", list(numbers)) or []
+        } if numbers else set()
+        for number in found:
+            self.error(numbers.pop(number), f"Raum existiert bereits: {number}")
+        self._room_ids(numbers)
+        return before - len(found)
+
+    # --- Fächer ---
+    def _teacher_ids(self, usernames):
+        """username -> lehrer.id"""
+        usernames = list(usernames)
+        if not usernames:
+            return {}
+        return {r["username"]: r["id"] for r in db_read(f"""
+            SELECT lehrer.id, users.username
+            FROM lehrer JOIN users ON lehrer.user_id = users.id
+            WHERE users.username IN ({_in(usernames)})
+        """, usernames) or []}
+
+    def _import_lessons(self, chunk):
+        parsed = []
+        for line, row in chunk:
+            try:
+                lesson = (_text(row, "fachname"), _text(row, "lehrer"), _text(row, "raum"),
+                          _tag(row), _time(row, "startzeit"), _time(row, "endzeit"))
+                if to_minutes(lesson[4]) >= to_minutes(lesson[5]):
+                    raise RowError("startzeit muss vor endzeit liegen")
+                parsed.append((line, lesson))
+            except RowError as e:
+                self.error(line, str(e))
+
+        teachers = self._teacher_ids({p[1][1] for p in parsed})
+        rooms = self._room_ids({p[1][2] for p in parsed if p[1][1] in teachers})
+
+        values = []
+        for line, (fachname, lehrer, raum, tag, start, end) in parsed:
+            lehrer_id = teachers.get(lehrer)
+            if lehrer_id is None:
+                self.error(line, f"Unbekannter Lehrer: {lehrer}")
+                continue
+            raum_id = rooms[raum]
+            if self.index.teacher_conflicts(lehrer_id, tag, start, end):
+                self.error(line, f"{lehrer} hat {tag} {start} bereits ein Fach")
+                continue
+            if self.index.room_conflicts(raum_id, tag, start, end):
+                self.error(line, f"Raum {raum} ist {tag} {start} bereits belegt")
+                continue
+            self._temp_id -= 1
+            self.index.lesson_saved(self._temp_id, lehrer_id, raum_id, tag, start, end)
+            values.append((fachname, lehrer_id, raum_id, tag, start, end))
+
+        return db_many(
+            "INSERT INTO faecher (fachname, lehrer_id, raum_id, tag, startzeit, endzeit) VALUES (%s, %s, %s, %s, %s, %s)",
+            values
+        )
+
+    # --- Einschreibungen ---
+    def _lesson_id(self, lehrer, tag, start):
+        if self._lesson_keys is None:
+            # (teacher username, tag, HH:MM) -> fach_id, once per import
+            self._lesson_keys = {}
+            for r in db_read("""
+                SELECT faecher.id, users.username, faecher.tag, faecher.startzeit
+                FROM faecher
+                JOIN lehrer ON faecher.lehrer_id = lehrer.id
+                JOIN users ON lehrer.user_id = users.id
+            """) or []:
+                if r["startzeit"] is not None:
+                    minutes = to_minutes(r["startzeit"])
+                    self._lesson_keys[(r["username"], r["tag"], f"{minutes // 60:02d}:{minutes % 60:02d}")] = r["id"]
+        return self._lesson_keys.get((lehrer, tag, start))
+
+    def _import_enrollments(self, chunk):
+        parsed = []
+        for line, row in chunk:
+            try:
+                parsed.append((line, _text(row, "student"), _text(row, "lehrer"), _tag(row), _time(row, "startzeit")))
+            except RowError as e:
+                self.error(line, str(e))
+
+        usernames = list({p[1] for p in parsed})
+        students = {r["username"]: r["id"] for r in db_read(
+            f"SELECT id, username FROM users WHERE role = 'student' AND username IN ({_in(usernames)})",
+            usernames) or []} if usernames else {}
+
+        values = []
+        for line, student, lehrer, tag, start in parsed:
+            user_id = students.get(student)
+            fach_id = self._lesson_id(lehrer, tag, start)
+            if user_id is None:
+                self.error(line, f"Unbekannter Schüler: {student}")
+            elif fach_id is None:
+                self.error(line, f"Kein Fach von {lehrer} am {tag} um {start}")
+            elif user_id in self.index.students_of.get(fach_id, ()):
+                self.error(line, f"{student} ist bereits eingetragen")
+            elif self.index.student_conflicts(user_id, fach_id):
+                self.error(line, f"{student} hat {tag} {start} bereits ein Fach")
+            else:
+                self.index.enrolled(user_id, fach_id)
+                values.append((user_id, fach_id))
+
+        return db_many("INSERT INTO stundenplan (user_id, fach_id) VALUES (%s, %s)", values)
+
+
+def import_rows(kind, rows, dry_run=False):
+    return Importer(kind, dry_run).run(rows)
+
+
+def _changed():
+    from schedule_cache import all_changed
+    from analytics import rebuild
+
+    conflict_index.invalidate()
+    rebuild()
+    all_changed()
+
+
+# -----------------------------
+# Export
+# -----------------------------
+_EXPORT_SQL = {
+    "teachers": ("lehrer.id", """
+        SELECT lehrer.id, COALESCE(users.username, lehrer.name) AS username, lehrer.name
+        FROM lehrer LEFT JOIN users ON lehrer.user_id = users.id
+    """),
+    "rooms": ("raum.id", "SELECT raum.id, raum.raumnummer FROM raum"),
+    "lessons": ("faecher.id", """
+        SELECT faecher.id, faecher.fachname, COALESCE(users.username, lehrer.name) AS lehrer,
+               raum.raumnummer AS raum, faecher.tag, faecher.startzeit, faecher.endzeit
+        FROM faecher
+        JOIN lehrer ON faecher.lehrer_id = lehrer.id
+        LEFT JOIN users ON lehrer.user_id = users.id
+        LEFT JOIN raum ON faecher.raum_id = raum.id
+    """),
+    "enrollments": ("stundenplan.id", """
+        SELECT stundenplan.id, student.username AS student, COALESCE(users.username, lehrer.name) AS lehrer,
+               faecher.tag, faecher.startzeit, faecher.fachname
+        FROM stundenplan
+        JOIN users student ON stundenplan.user_id = student.id
+        JOIN faecher ON stundenplan.fach_id = faecher.id
+        JOIN lehrer ON faecher.lehrer_id = lehrer.id
+        LEFT JOIN users ON lehrer.user_id = users.id
+    """),
+}
+
+
+def _hhmm(value):
+    if value is None:
+        return ""
+    minutes = to_minutes(value)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def export_rows(kind, user_id=None, role=None):
+    """Yield export dicts in batches (keyset on id, bounded memory).
+
+    With user_id only that user's lessons: the student's plan or the
+    teacher's own lessons (kind "lessons" or "enrollments").
+    """
+    key, sql = _EXPORT_SQL[kind]
+    where, params = [], []
+    if user_id is not None:
+        if kind == "enrollments":
+            where.append("stundenplan.user_id = %s")
+        elif kind == "lessons" and role == "teacher":
+            where.append("lehrer.user_id = %s")
+        elif kind == "lessons":
+            where.append("faecher.id IN (SELECT fach_id FROM stundenplan WHERE user_id = %s)")
+        else:
+            raise ValueError(f"{kind} can only be exported for the whole school")
+        params.append(user_id)
+
+    last_id = 0
+    while True:
+        batch = db_read(
+            f"{sql} WHERE {' AND '.join(where + [f'{key} > %s'])} ORDER BY {key} LIMIT %s",
+            (*params, last_id, EXPORT_BATCH_SIZE)
+        ) or []
+        for row in batch:
+            row = {field: row.get(field) for field in FIELDS[kind] if field != "password"}
+            for field in ("startzeit", "endzeit"):
+                if field in row:
+                    row[field] = _hhmm(row[field])
+            yield row
+        if len(batch) < EXPORT_BATCH_SIZE:
+            return
+        last_id = batch[-1]["id"]
+
+
+def render_rows(rows, kind, fmt):
+    """Turn export dicts into text chunks (CSV with header or JSON Lines)."""
+    fields = [f for f in FIELDS[kind] if f != "password"]
+    if fmt == "jsonl":
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+        return
+    if fmt != "csv":
+        raise ValueError(f"Unknown format: {fmt}")
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, lineterminator="\n")
+    writer.writeheader()
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if i % 500 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# -----------------------------
+# CLI: flask --app flask_app import-timetable / export-timetable
+# -----------------------------
+@click.command("import-timetable")
+@click.argument("kind", type=click.Choice(KINDS))
+@click.argument("file", type=click.File("r", encoding="utf-8-sig"))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl", "json"]), help="Default: from the file name.")
+@click.option("--dry-run", is_flag=True, help="Validate only, write nothing.")
+@with_appcontext
+def import_command(kind, file, fmt, dry_run):
+    """Import teachers, rooms, lessons or enrollments from CSV/JSON."""
+    result = import_rows(kind, read_rows(file, fmt or guess_format(file.name)), dry_run)
+    click.echo(f"{result['rows']} rows, {result['inserted']} inserted, {result['skipped']} skipped "
+               f"in {result['seconds']}s{' (dry run)' if dry_run else ''}")
+    for e in result["errors"]:
+        click.echo(f"  line {e['line']}: {e['error']}")
+    if result["skipped"] > len(result["errors"]):
+        click.echo(f"  ... and {result['skipped'] - len(result['errors'])} more")
+
+
+@click.command("export-timetable")
+@click.argument("kind", type=click.Choice(KINDS))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default="csv", show_default=True)
+@click.option("--output", type=click.File("w", encoding="utf-8"), default="-", help="Default: stdout.")
+@with_appcontext
+def export_command(kind, fmt, output):
+    """Export the whole school's teachers, rooms, lessons or enrollments."""
+    for text in render_rows(export_rows(kind), kind, fmt):
+        output.write(text)
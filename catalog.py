@@ -0,0 +1,130 @@
+import base64
+import json
+from db import db_read
+
+WOCHENTAGE = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]
+CATALOG_PAGE_SIZE = 30
+CATALOG_MAX_PAGE_SIZE = 100
+
+
+# -----------------------------
+# Cursor (Keyset-Pagination über fachname, id)
+# -----------------------------
+def encode_cursor(fachname, fach_id):
+    raw = json.dumps([fachname, fach_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(fachname, id) from a cursor; ValueError if it was tampered with."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fachname, fach_id = json.loads(raw)
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(fachname, str) or not isinstance(fach_id, int):
+        raise ValueError("invalid cursor")
+    return fachname, fach_id
+
+
+def _like_prefix(text):
+    # Escape LIKE wildcards with "!" (same ESCAPE syntax in MySQL and SQLite)
+    return text.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%"
+
+
+def _hhmm(value):
+    if value is None:  # lesson without a slot (unplaced by the solver)
+        return None
+    hours, minutes = str(value).split(":")[:2]
+    return f"{int(hours):02d}:{int(minutes):02d}"
+
+
+def is_scheduled(fach_id):
+    """True if the lesson exists and has a slot (a forced solve can leave it without one)."""
+    row = db_read("SELECT tag, startzeit, endzeit FROM faecher WHERE id=%s", (fach_id,), single=True)
+    return bool(row and row["tag"] and row["startzeit"] is not None and row["endzeit"] is not None)
+
+
+def catalog_item(row):
+    """JSON shape of one lesson (row with id, fachname, lehrer, raum, tag, startzeit, endzeit)."""
+    return {
+        "id": row["id"],
+        "fachname": row["fachname"],
+        "lehrer": row["lehrer"],
+        "raum": row["raum"],
+        "tag": row["tag"],
+        "startzeit": _hhmm(row["startzeit"]),
+        "endzeit": _hhmm(row["endzeit"]),
+    }
+
+
+# -----------------------------
+# Katalog-Seite
+# -----------------------------
+def catalog_page(user_id, tag=None, q=None, lehrer_id=None, free_only=False,
+                 ignore_fach_id=None, cursor=None, limit=CATALOG_PAGE_SIZE):
+    """One page of lessons a student can enroll in, ordered by (fachname, id).
+
+    - tag: only this weekday
+    - q: prefix of the subject or the teacher name
+    - lehrer_id: only this teacher
+    - free_only: only lessons that don't overlap the student's schedule
+    - ignore_fach_id: enrollment to disregard (editing that entry)
+
+    Lessons the student already has and lessons without a slot are left
+    out. Returns
+    {"items": [...], "next_cursor": str or None}.
+    """
+    limit = max(1, min(int(limit), CATALOG_MAX_PAGE_SIZE))
+    ignore = ignore_fach_id or 0
+    where = ["faecher.tag IS NOT NULL AND faecher.startzeit IS NOT NULL", """NOT EXISTS (
+        SELECT 1 FROM stundenplan own
+        WHERE own.user_id = %s AND own.fach_id = faecher.id AND own.fach_id <> %s
+    )"""]
+    params = [user_id, ignore]
+
+    if tag:
+        where.append("faecher.tag = %s")
+        params.append(tag)
+    if q:
+        where.append("(faecher.fachname LIKE %s ESCAPE '!' OR lehrer.name LIKE %s ESCAPE '!')")
+        params += [_like_prefix(q), _like_prefix(q)]
+    if lehrer_id:
+        where.append("faecher.lehrer_id = %s")
+        params.append(lehrer_id)
+    if free_only:
+        where.append("""NOT EXISTS (
+            SELECT 1 FROM stundenplan s
+            JOIN faecher belegt ON belegt.id = s.fach_id
+            WHERE s.user_id = %s AND s.fach_id <> %s
+              AND belegt.tag = faecher.tag
+              AND belegt.startzeit < faecher.endzeit AND faecher.startzeit < belegt.endzeit
+        )""")
+        params += [user_id, ignore]
+    if cursor:
+        after_name, after_id = decode_cursor(cursor)
+        where.append("(faecher.fachname > %s OR (faecher.fachname = %s AND faecher.id > %s))")
+        params += [after_name, after_name, after_id]
+
+    rows = db_read(f"""
+        SELECT
+            faecher.id,
+            faecher.fachname,
+            lehrer.name AS lehrer,
+            raum.raumnummer AS raum,
+            faecher.tag,
+            faecher.startzeit,
+            faecher.endzeit
+        FROM faecher
+        JOIN lehrer ON faecher.lehrer_id = lehrer.id
+        JOIN raum ON faecher.raum_id = raum.id
+        WHERE {" AND ".join(where)}
+        ORDER BY faecher.fachname, faecher.id
+        LIMIT %s
+    """, (*params, limit + 1)) or []
+
+    items = [catalog_item(r) for r in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(items[-1]["fachname"], items[-1]["id"])
+    return {"items": items, "next_cursor": next_cursor}
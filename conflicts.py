@@ -0,0 +1,274 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import timedelta
+from db import db_read
+from solver import WOCHENTAGE, TIMEBLOCKS
+
+logger = logging.getLogger(__name__)
+
+# Reload from the DB after this many seconds, so writes of other worker
+# processes are picked up as well.
+CONFLICT_INDEX_TTL = float(os.getenv("CONFLICT_INDEX_TTL", "60"))
+
+
+def to_minutes(value):
+    """TIME column (timedelta), datetime.time or 'HH:MM[:SS]' -> minutes."""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    if hasattr(value, "hour"):
+        return value.hour * 60 + value.minute
+    hours, minutes = str(value).split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+# Raster der Stundenplan-Blöcke (gleiche Bit-Reihenfolge wie solver.SLOTS)
+BLOCKS = [(to_minutes(start), to_minutes(end)) for start, end in TIMEBLOCKS]
+DAY_INDEX = {tag: i for i, tag in enumerate(WOCHENTAGE)}
+_BLOCK_STARTS = {start for start, _ in BLOCKS}
+_BLOCK_ENDS = {end for _, end in BLOCKS}
+
+
+def slot_mask(tag, start, end):
+    """(bitmask of the blocks [start, end) touches, regular).
+
+    `regular` means start and end lie on block boundaries - for two
+    regular lessons "masks intersect" is exactly "times overlap".
+    """
+    day = DAY_INDEX.get(tag)
+    if day is None:
+        return 0, False
+    mask = 0
+    for i, (block_start, block_end) in enumerate(BLOCKS):
+        if block_start < end and start < block_end:
+            mask |= 1 << (day * len(BLOCKS) + i)
+    regular = start in _BLOCK_STARTS and end in _BLOCK_ENDS and start < end
+    return mask, regular
+
+
+def _overlapping(intervals, start, end, ignore=None, longest=24 * 60):
+    """Ids of the intervals overlapping [start, end).
+
+    `intervals` is sorted by start but may overlap itself (seed data,
+    imports, older rows). No interval is longer than `longest` minutes, so
+    the backward scan stops at the first one starting that far before
+    `start` - it can't reach into [start, end).
+    """
+    found = []
+    i = bisect_left(intervals, (end,)) - 1
+    while i >= 0 and intervals[i][0] > start - longest:
+        if intervals[i][1] > start and intervals[i][2] != ignore:
+            found.append(intervals[i][2])
+        i -= 1
+    return found
+
+
+class IntervalIndex:
+    """Sorted per-weekday intervals of every teacher, room and student."""
+
+    def __init__(self, ttl=None):
+        self.ttl = CONFLICT_INDEX_TTL if ttl is None else ttl
+        self._lock = threading.RLock()
+        self.loaded_at = None
+        self._reset()
+
+    def _reset(self):
+        self.lessons = {}                     # fach_id -> (lehrer_id, raum_id, tag, start, end)
+        self.students_of = defaultdict(set)   # fach_id -> {user_id}
+        self._teacher = defaultdict(list)     # (lehrer_id, tag) -> [(start, end, fach_id)]
+        self._room = defaultdict(list)        # (raum_id, tag) -> [(start, end, fach_id)]
+        self._student = defaultdict(list)     # (user_id, tag) -> [(start, end, fach_id)]
+        self._masks = {}                      # fach_id -> (slot bitmask, regular)
+        self._occupancy = {}                  # user_id -> (slot bitmask, irregular lessons)
+        self._longest = 0                     # longest lesson in minutes (bounds the scans)
+
+    # -----------------------------
+    # Laden
+    # -----------------------------
+    def ensure_loaded(self):
+        with self._lock:
+            if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+                self.load()
+
+    def load(self):
+        faecher = db_read("SELECT id, lehrer_id, raum_id, tag, startzeit, endzeit FROM faecher") or []
+        eintraege = db_read("SELECT user_id, fach_id FROM stundenplan") or []
+        with self._lock:
+            self._reset()
+            for f in faecher:
+                if f["tag"] and f["startzeit"] is not None and f["endzeit"] is not None:
+                    self._add_lesson(f["id"], f["lehrer_id"], f["raum_id"], f["tag"],
+                                     to_minutes(f["startzeit"]), to_minutes(f["endzeit"]))
+            for e in eintraege:
+                self._enroll(e["user_id"], e["fach_id"])
+            self.loaded_at = time.monotonic()
+        logger.info("Conflict index loaded: %d lessons, %d enrollments", len(faecher), len(eintraege))
+
+    def invalidate(self):
+        with self._lock:
+            self.loaded_at = None
+
+    # -----------------------------
+    # Interne Mutationen
+    # -----------------------------
+    def _add_lesson(self, fach_id, lehrer_id, raum_id, tag, start, end):
+        self.lessons[fach_id] = (lehrer_id, raum_id, tag, start, end)
+        self._longest = max(self._longest, end - start)
+        self._masks[fach_id] = slot_mask(tag, start, end)
+        insort(self._teacher[(lehrer_id, tag)], (start, end, fach_id))
+        insort(self._room[(raum_id, tag)], (start, end, fach_id))
+        for user_id in self.students_of.get(fach_id, ()):
+            insort(self._student[(user_id, tag)], (start, end, fach_id))
+            self._occupancy.pop(user_id, None)
+
+    def _remove_lesson(self, fach_id):
+        lesson = self.lessons.pop(fach_id, None)
+        if lesson is None:
+            return
+        lehrer_id, raum_id, tag, start, end = lesson
+        entry = (start, end, fach_id)
+        self._masks.pop(fach_id, None)
+        self._teacher[(lehrer_id, tag)].remove(entry)
+        self._room[(raum_id, tag)].remove(entry)
+        for user_id in self.students_of.get(fach_id, ()):
+            self._student[(user_id, tag)].remove(entry)
+            self._occupancy.pop(user_id, None)
+
+    def _enroll(self, user_id, fach_id):
+        if user_id in self.students_of[fach_id]:
+            return
+        self.students_of[fach_id].add(user_id)
+        self._occupancy.pop(user_id, None)
+        lesson = self.lessons.get(fach_id)
+        if lesson:
+            insort(self._student[(user_id, lesson[2])], (lesson[3], lesson[4], fach_id))
+
+    def _unenroll(self, user_id, fach_id):
+        if user_id not in self.students_of.get(fach_id, ()):
+            return
+        self.students_of[fach_id].discard(user_id)
+        self._occupancy.pop(user_id, None)
+        lesson = self.lessons.get(fach_id)
+        if lesson:
+            self._student[(user_id, lesson[2])].remove((lesson[3], lesson[4], fach_id))
+
+    # -----------------------------
+    # Sync nach Schreibzugriffen (no-op solange nicht geladen)
+    # -----------------------------
+    # Routes call these via db.after_commit, so a rolled back write never
+    # reaches the shared index.
+    def lesson_saved(self, fach_id, lehrer_id, raum_id, tag, startzeit, endzeit):
+        with self._lock:
+            if self.loaded_at is None:
+                return
+            self._remove_lesson(fach_id)
+            self._add_lesson(fach_id, lehrer_id, raum_id, tag, to_minutes(startzeit), to_minutes(endzeit))
+
+    def lesson_deleted(self, fach_id):
+        with self._lock:
+            if self.loaded_at is None:
+                return
+            self._remove_lesson(fach_id)
+            self.students_of.pop(fach_id, None)
+
+    def enrolled(self, user_id, fach_id):
+        with self._lock:
+            if self.loaded_at is not None:
+                self._enroll(user_id, fach_id)
+
+    def unenrolled(self, user_id, fach_id):
+        with self._lock:
+            if self.loaded_at is not None:
+                self._unenroll(user_id, fach_id)
+
+    # -----------------------------
+    # Abfragen
+    # -----------------------------
+    def teacher_conflicts(self, lehrer_id, tag, startzeit, endzeit, ignore=None):
+        """fach_ids of the teacher's lessons overlapping the given time."""
+        self.ensure_loaded()
+        with self._lock:
+            return _overlapping(self._teacher.get((lehrer_id, tag), []),
+                                to_minutes(startzeit), to_minutes(endzeit), ignore, self._longest)
+
+    def room_conflicts(self, raum_id, tag, startzeit, endzeit, ignore=None):
+        """fach_ids of lessons in the room overlapping the given time."""
+        self.ensure_loaded()
+        with self._lock:
+            return _overlapping(self._room.get((raum_id, tag), []),
+                                to_minutes(startzeit), to_minutes(endzeit), ignore, self._longest)
+
+    def _lesson(self, fach_id):
+        # Missing here: maybe created by another worker since the last load,
+        # so ask the DB. Lessons without a slot (or unknown ids) stay None.
+        lesson = self.lessons.get(fach_id)
+        if lesson is not None:
+            return lesson
+        row = db_read("SELECT lehrer_id, raum_id, tag, startzeit, endzeit FROM faecher WHERE id=%s",
+                      (fach_id,), single=True)
+        if not row or not row["tag"] or row["startzeit"] is None or row["endzeit"] is None:
+            return None
+        self._add_lesson(fach_id, row["lehrer_id"], row["raum_id"], row["tag"],
+                         to_minutes(row["startzeit"]), to_minutes(row["endzeit"]))
+        return self.lessons[fach_id]
+
+    def student_conflicts(self, user_id, fach_id, ignore=None):
+        """fach_ids in the student's plan overlapping lesson `fach_id`."""
+        self.ensure_loaded()
+        with self._lock:
+            lesson = self._lesson(fach_id)
+            if lesson is None:
+                return []
+            _, _, tag, start, end = lesson
+            return [
+                other for other in _overlapping(self._student.get((user_id, tag), []), start, end, ignore,
+                                              self._longest)
+                if other != fach_id
+            ]
+
+    # -----------------------------
+    # Belegung als Bitmap (Wochentag x Block)
+    # -----------------------------
+    def _student_occupancy(self, user_id, ignore=None):
+        # (mask, irregular) over the student's lessons; cached unless `ignore`
+        if ignore is None and user_id in self._occupancy:
+            return self._occupancy[user_id]
+        mask, irregular = 0, 0
+        for tag in WOCHENTAGE:
+            for _, _, fach_id in self._student.get((user_id, tag), ()):
+                if fach_id == ignore:
+                    continue
+                lesson_mask, regular = self._masks[fach_id]
+                mask |= lesson_mask
+                irregular += not regular
+        if ignore is None:
+            self._occupancy[user_id] = (mask, irregular)
+        return mask, irregular
+
+    def occupancy(self, user_id, ignore=None):
+        """Bitmask of the blocks the student is busy in (bit = day * blocks + block)."""
+        self.ensure_loaded()
+        with self._lock:
+            return self._student_occupancy(user_id, ignore)[0]
+
+    def fits(self, user_id, fach_id, ignore=None):
+        """True if lesson `fach_id` overlaps nothing in the student's plan.
+
+        A single AND on the bitmaps when all involved lessons sit on the
+        block grid, the interval lists otherwise.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            if fach_id not in self._masks:
+                return False
+            mask, regular = self._masks[fach_id]
+            busy, irregular = self._student_occupancy(user_id, ignore)
+            if regular and not irregular:
+                return not mask & busy
+        return not self.student_conflicts(user_id, fach_id, ignore)
+
+
+index = IntervalIndex()
@@ -1,6 +1,12 @@
 from dotenv import load_dotenv
+import logging
 import os
-from mysql.connector import pooling
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context
+
+logger = logging.getLogger(__name__)
 
 # Load .env variables
 load_dotenv()
@@ -11,17 +17,227 @@ DB_CONFIG = {
     "database": os.getenv("DB_DATABASE")
 }
 
-# Init db - reduced pool_size for PythonAnywhere free tier (max 6 connections)
-pool = pooling.MySQLConnectionPool(pool_name="pool", pool_size=2, **DB_CONFIG)
+# Pool sizing - PythonAnywhere free tier allows max 6 connections per account
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "2"))
+DB_POOL_OVERFLOW = int(os.getenv("DB_POOL_OVERFLOW", "0"))
+# Seconds a request waits for a free connection before failing with 503
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Idle seconds after which a connection is pinged before reuse
+DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "30"))
+
+# "mysql" (default) or "sqlite" (local load tests / fast test runs)
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+# SQLite file, ":memory:" for a throw-away in-memory database
+DB_SQLITE_PATH = os.getenv("DB_SQLITE_PATH", ":memory:")
+
+
+class MySQLBackend:
+    name = "mysql"
+
+    def __init__(self, config):
+        import mysql.connector
+        from pool import ConnectionPool
+
+        # Waits for a free connection instead of raising PoolError when busy
+        self.pool = ConnectionPool(
+            lambda: mysql.connector.connect(**config),
+            min_size=DB_POOL_MIN, max_size=DB_POOL_MAX, overflow=DB_POOL_OVERFLOW,
+            timeout=DB_POOL_TIMEOUT, recycle=DB_POOL_RECYCLE,
+        )
+
+    def connect(self):
+        return self.pool.get_connection()
+
+    def bootstrap(self):
+        # Schema is managed via db/TODOS.sql + "flask migrate"
+        return False
+
+
+def create_backend(name=None):
+    name = name or DB_BACKEND
+    if name == "sqlite":
+        from db_sqlite import SQLiteBackend
+        return SQLiteBackend(DB_SQLITE_PATH)
+    if name == "mysql":
+        return MySQLBackend(DB_CONFIG)
+    raise ValueError(f"Unknown DB_BACKEND: {name}")
+
+
+# Init db
+backend = create_backend()
+
+# Instrumentation hooks (see profiling.py)
+# query_hooks: fn(sql, seconds), connect_hooks: fn(wait_seconds)
+query_hooks = []
+connect_hooks = []
+
+
+def try_get_conn():
+    """A connection if one is free right now, else None (never waits)."""
+    _ensure_setup()
+    pool = getattr(backend, "pool", None)
+    if pool is None:
+        return get_conn()
+    return pool.get_connection(block=False)
+
+
 def get_conn():
-    return pool.get_connection()
+    _ensure_setup()
+    if not connect_hooks:
+        return backend.connect()
+    started = time.perf_counter()
+    conn = backend.connect()
+    waited = time.perf_counter() - started
+    for hook in connect_hooks:
+        hook(waited)
+    return conn
+
+
+def _execute(cur, sql, params, many=False):
+    if not query_hooks:
+        return cur.executemany(sql, params) if many else cur.execute(sql, params)
+    started = time.perf_counter()
+    try:
+        return cur.executemany(sql, params) if many else cur.execute(sql, params)
+    finally:
+        elapsed = time.perf_counter() - started
+        for hook in query_hooks:
+            hook(sql, elapsed)
+
+
+# -----------------------------
+# Request-scoped connection (unit of work)
+# -----------------------------
+# Inside a Flask app context all helpers share one connection and one
+# transaction (stored on `g`). It is committed in after_request, before the
+# response (e.g. a redirect) leaves the server, and released in teardown.
+# Outside an app context every call uses its own connection and commits
+# immediately, like before.
+
+def _scoped_conn():
+    if not has_app_context():
+        return None
+    if "db_conn" not in g:
+        g.db_conn = get_conn()
+        g.db_dirty = False
+    return g.db_conn
+
+
+@contextmanager
+def _connection(write=False):
+    conn = _scoped_conn()
+    if conn is not None:
+        yield conn
+        if write:
+            g.db_dirty = True
+        return
+
+    conn = get_conn()
+    try:
+        yield conn
+        if write:
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def commit():
+    """Commit the pending writes of the current request, if any."""
+    if has_app_context() and g.get("db_dirty"):
+        g.db_conn.commit()
+        g.db_dirty = False
+        _run_after_commit()
+
+
+def after_commit(fn):
+    """Call fn() once the pending writes are committed (now if there are none).
+
+    For side effects outside the DB (caches, sessions) that must not be
+    seen before the change itself. Dropped on rollback.
+    """
+    if has_app_context() and g.get("db_dirty"):
+        g.setdefault("db_after_commit", []).append(fn)
+    else:
+        fn()
+
+
+def _run_after_commit():
+    for fn in g.pop("db_after_commit", []):
+        fn()
+
+
+def rollback():
+    """Discard the pending writes of the current request, if any."""
+    if has_app_context() and g.get("db_dirty"):
+        g.db_conn.rollback()
+        g.db_dirty = False
+        g.pop("db_after_commit", None)
+
+
+@contextmanager
+def transaction():
+    """Group writes: commit on success, roll back and re-raise on error."""
+    try:
+        yield
+    except Exception:
+        rollback()
+        raise
+    commit()
+
+
+def _after_request(response):
+    commit()
+    return response
+
+
+def _teardown(exc):
+    conn = g.pop("db_conn", None)
+    if conn is None:
+        return
+    try:
+        if g.pop("db_dirty", False):
+            # No request (CLI/app context) or an unhandled error
+            if exc is None:
+                conn.commit()
+                _run_after_commit()
+            else:
+                conn.rollback()
+    finally:
+        g.pop("db_after_commit", None)
+        conn.close()
+
+
+def _pool_timeout(error):
+    logger.warning("DB pool exhausted: %s", error)
+    return "Server ist gerade ausgelastet, bitte gleich nochmal versuchen.", 503, {"Retry-After": "2"}
+
+
+def init_app(app):
+    from pool import PoolTimeout
+
+    app.after_request(_after_request)
+    app.teardown_appcontext(_teardown)
+    app.register_error_handler(PoolTimeout, _pool_timeout)
+
+
+def pool_stats():
+    """Stats of the connection pool, None for unpooled backends (SQLite)."""
+    pool = getattr(backend, "pool", None)
+    return pool.stats() if pool is not None else None
+
 
 # DB-Helper
 def db_read(sql, params=None, single=False):
-    conn = get_conn()
+    with _connection() as conn:
+        return read_on(conn, sql, params, single)
+
+
+def read_on(conn, sql, params=None, single=False):
+    """db_read on an explicit connection (see db_async.read_parallel)."""
+    cur = conn.cursor(dictionary=True)
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute(sql, params or ())
+        _execute(cur, sql, params or ())
 
         if single:
             return cur.fetchone()
@@ -33,20 +249,98 @@ def db_read(sql, params=None, single=False):
             cur.close()
         except:
             pass
-        conn.close()
 
 
 def db_write(sql, params=None, return_id=False):
+    """Run one write; returns the new id with return_id, else the affected rows."""
+    with _connection(write=True) as conn:
+        cur = conn.cursor()
+        try:
+            _execute(cur, sql, params or ())
+            if return_id:
+                return cur.lastrowid
+            return cur.rowcount
+        finally:
+            try:
+                cur.close()
+            except:
+                pass
+
+
+def db_many(sql, seq_params):
+    """Run one statement for many parameter tuples (executemany).
+
+    For simple INSERT ... VALUES statements mysql.connector rewrites this
+    into a single multi-row INSERT. Returns the number of affected rows.
+    """
+    seq_params = list(seq_params)
+    if not seq_params:
+        return 0
+    with _connection(write=True) as conn:
+        cur = conn.cursor()
+        try:
+            _execute(cur, sql, seq_params, many=True)
+            return cur.rowcount
+        finally:
+            try:
+                cur.close()
+            except:
+                pass
+
+
+def db_stream(sql, params=None, size=1000):
+    """Yield the rows of a large SELECT in lists of up to `size` tuples.
+
+    Uses its own connection with an unbuffered (server-side) cursor, so
+    only one chunk is held in memory and the request connection stays
+    usable meanwhile. For batch jobs, not for request handlers.
+    """
     conn = get_conn()
+    cur = conn.cursor()
+    done = False
     try:
-        cur = conn.cursor()
-        cur.execute(sql, params or ())
-        conn.commit()
-        if return_id:
-            return cur.lastrowid
+        _execute(cur, sql, params or ())
+        while True:
+            rows = cur.fetchmany(size)
+            if not rows:
+                done = True
+                return
+            yield rows
     finally:
+        if not done and hasattr(conn, "consume_results"):
+            # Stopped early: the server is still sending rows (mysql.connector)
+            try:
+                conn.consume_results()
+            except Exception:
+                pass
         try:
             cur.close()
         except:
             pass
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+
+def use_backend(new_backend):
+    """Switch the storage backend, e.g. a fresh in-memory SQLite per test."""
+    global backend, _needs_setup
+    backend = new_backend
+    # Local databases get schema + migrations automatically, on first use
+    # (not here: migrations imports this module)
+    _needs_setup = backend.name == "sqlite"
+
+
+def _ensure_setup():
+    global _needs_setup
+    if not _needs_setup:
+        return
+    with _setup_lock:
+        if _needs_setup:
+            _needs_setup = False
+            from migrations import migrate
+
+            backend.bootstrap()
+            migrate()
+
+
+_setup_lock = threading.Lock()
+use_backend(backend)
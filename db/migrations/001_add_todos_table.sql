@@ -1,7 +1,7 @@
 -- Migration: Add todos table
--- Run this if you already have an existing database
+-- (replaces the former db/add_todos_table.sql, no-op on new databases)
 
-CREATE TABLE todos (
+CREATE TABLE IF NOT EXISTS todos (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
     title VARCHAR(250) NOT NULL,
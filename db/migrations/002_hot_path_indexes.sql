@@ -0,0 +1,25 @@
+-- Migration: Indexes for the lookups every route does
+
+-- Lehrer-Stundenplan und Konfliktprüfung
+CREATE INDEX idx_faecher_lehrer_tag_start ON faecher (lehrer_id, tag, startzeit);
+
+-- Stundenplan pro Schüler; (user_id, fach_id) darf nur einmal vorkommen
+DELETE s1 FROM stundenplan s1
+JOIN stundenplan s2 ON s1.user_id = s2.user_id AND s1.fach_id = s2.fach_id AND s1.id > s2.id;
+ALTER TABLE stundenplan ADD UNIQUE KEY unique_user_fach (user_id, fach_id);
+
+-- Raumnummer eindeutig (doppelte Räume zusammenführen)
+UPDATE faecher
+JOIN raum ON faecher.raum_id = raum.id
+JOIN (SELECT raumnummer, MIN(id) AS keep_id FROM raum GROUP BY raumnummer) k ON k.raumnummer = raum.raumnummer
+SET faecher.raum_id = k.keep_id
+WHERE faecher.raum_id <> k.keep_id;
+DELETE r1 FROM raum r1
+JOIN raum r2 ON r1.raumnummer = r2.raumnummer AND r1.id > r2.id;
+ALTER TABLE raum ADD UNIQUE KEY unique_raumnummer (raumnummer);
+
+-- Pluspunkte pro Schüler und Fach
+CREATE INDEX idx_pruefungen_user_fach ON pruefungen (user_id, fachname);
+
+-- To-Do Liste: offene zuerst, nach Fälligkeit
+CREATE INDEX idx_todos_user_completed_due ON todos (user_id, completed, due_date);
@@ -0,0 +1,10 @@
+-- Migration: Indexes for the paginated course catalog (/api/faecher)
+
+-- Keyset-Pagination ORDER BY fachname, id und Präfixsuche nach Fach
+CREATE INDEX idx_faecher_fachname ON faecher (fachname, id);
+
+-- Filter nach Wochentag, gleiche Sortierung
+CREATE INDEX idx_faecher_tag_fachname ON faecher (tag, fachname, id);
+
+-- Präfixsuche nach Lehrer
+CREATE INDEX idx_lehrer_name ON lehrer (name);
@@ -0,0 +1,22 @@
+-- Migration: Summary tables for room / teacher analytics
+-- Maintained incrementally by analytics.py on every lesson and schedule
+-- write; fill or repair with: flask --app flask_app analytics rebuild
+
+-- Belegung pro Raum, Lehrer und Schule ('schule', ref_id 0) je Wochentag und Block
+CREATE TABLE auslastung (
+    art VARCHAR(10) NOT NULL,
+    ref_id INT NOT NULL,
+    tag VARCHAR(20) NOT NULL,
+    block INT NOT NULL,
+    lektionen INT NOT NULL DEFAULT 0,
+    schueler INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (art, ref_id, tag, block)
+);
+
+-- Anzahl Schüler pro Fach (faecher-Zeile)
+CREATE TABLE fach_belegung (
+    fach_id INT PRIMARY KEY,
+    schueler INT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX idx_fach_belegung_schueler ON fach_belegung (schueler, fach_id);
@@ -0,0 +1,27 @@
+-- Migration: Summary tables for the grade statistics of all students
+-- Filled by the batch job (run outside school hours):
+--   flask --app flask_app grade-stats rebuild
+
+-- Pro Fach (fachname '' = ganze Schule, Pluspunkte = Total pro Schüler,
+-- ungenuegend = Schüler mit negativem Total)
+CREATE TABLE noten_statistik (
+    fachname VARCHAR(100) PRIMARY KEY,
+    schueler INT NOT NULL DEFAULT 0,
+    pruefungen INT NOT NULL DEFAULT 0,
+    durchschnitt DECIMAL(4,2),
+    streuung DECIMAL(4,2),
+    min_note DECIMAL(3,2),
+    max_note DECIMAL(3,2),
+    ungenuegend INT NOT NULL DEFAULT 0,
+    pluspunkte_schnitt DECIMAL(6,2),
+    berechnet_am TIMESTAMP NOT NULL
+);
+
+-- Verteilung der Fachnoten (art 'note', 0.25-Schritte) und Pluspunkte (art 'pluspunkte')
+CREATE TABLE noten_verteilung (
+    fachname VARCHAR(100) NOT NULL,
+    art VARCHAR(10) NOT NULL,
+    wert DECIMAL(6,2) NOT NULL,
+    anzahl INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (fachname, art, wert)
+);
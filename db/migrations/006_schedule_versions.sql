@@ -0,0 +1,12 @@
+-- Migration: Persistent schedule versions (ETags of the week views and the calendar feed)
+-- Bumped by schedule_cache.py in the same transaction as the change, so all
+-- workers agree and a version lives as long as the schedule does.
+
+-- Pro Benutzer; user_id 0 = ganze Schule (Solver, Import)
+CREATE TABLE schedule_version (
+    user_id INT PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0,
+    geaendert_am TIMESTAMP NOT NULL
+);
+
+INSERT INTO schedule_version (user_id, version, geaendert_am) VALUES (0, 1, CURRENT_TIMESTAMP);
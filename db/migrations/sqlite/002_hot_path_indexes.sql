@@ -0,0 +1,31 @@
+-- Migration: Indexes for the lookups every route does
+-- SQLite variant of ../002_hot_path_indexes.sql (no multi-table DELETE / UPDATE)
+
+-- Lehrer-Stundenplan und Konfliktprüfung
+CREATE INDEX idx_faecher_lehrer_tag_start ON faecher (lehrer_id, tag, startzeit);
+
+-- Stundenplan pro Schüler; (user_id, fach_id) darf nur einmal vorkommen
+DELETE FROM stundenplan
+WHERE id NOT IN (
+    SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM stundenplan GROUP BY user_id, fach_id) AS k
+);
+CREATE UNIQUE INDEX unique_user_fach ON stundenplan (user_id, fach_id);
+
+-- Raumnummer eindeutig (doppelte Räume zusammenführen)
+UPDATE faecher
+SET raum_id = (
+    SELECT MIN(r2.id) FROM raum r1 JOIN raum r2 ON r2.raumnummer = r1.raumnummer
+    WHERE r1.id = faecher.raum_id
+)
+WHERE raum_id IS NOT NULL;
+DELETE FROM raum
+WHERE id NOT IN (
+    SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM raum GROUP BY raumnummer) AS k
+);
+CREATE UNIQUE INDEX unique_raumnummer ON raum (raumnummer);
+
+-- Pluspunkte pro Schüler und Fach
+CREATE INDEX idx_pruefungen_user_fach ON pruefungen (user_id, fachname);
+
+-- To-Do Liste: offene zuerst, nach Fälligkeit
+CREATE INDEX idx_todos_user_completed_due ON todos (user_id, completed, due_date);
@@ -0,0 +1,46 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+from db import db_read
+from profiling import for_route
+
+# Threads that run the extra queries of read_parallel
+DB_PARALLEL_WORKERS = int(os.getenv("DB_PARALLEL_WORKERS", "4"))
+
+executor = ThreadPoolExecutor(max_workers=DB_PARALLEL_WORKERS, thread_name_prefix="db-read")
+
+
+def _read_and_release(conn, sql, params=None, single=False):
+    try:
+        return db.read_on(conn, sql, params, single)
+    finally:
+        conn.close()
+
+
+# -----------------------------
+# Unabhängige Queries gleichzeitig (für die normalen WSGI-Routen)
+# -----------------------------
+def read_parallel(*queries):
+    """Run independent SELECTs at the same time; results in query order.
+
+    Each query is a tuple of db_read arguments: (sql, params[, single]).
+    The first one runs on the request connection, the others on extra
+    connections in worker threads - but only if the pool has one free right
+    now, otherwise they simply run one after another. A request that holds a
+    connection therefore never waits for a second one.
+
+    The extra connections don't see uncommitted writes of the request, so
+    use this only for reads that come before any write. Used by
+    pluspunkte_calc.load_pluspunkte (subjects and exams).
+    """
+    futures = []
+    for query in queries[1:]:
+        conn = db.try_get_conn()
+        futures.append(executor.submit(for_route(_read_and_release), conn, *query) if conn is not None else None)
+
+    results = [db_read(*queries[0])]
+    for query, future in zip(queries[1:], futures):
+        results.append(future.result() if future is not None else db_read(*query))
+    return results
+
@@ -0,0 +1,176 @@
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_FILE = os.path.join(BASE_DIR, "db", "TODOS.sql")
+
+
+# -----------------------------
+# MySQL -> SQLite Übersetzung
+# -----------------------------
+def _time_to_timedelta(value):
+    # Like mysql.connector, TIME columns come back as timedelta
+    parts = value.decode().split(":")
+    hours, minutes = int(parts[0]), int(parts[1])
+    seconds = float(parts[2]) if len(parts) > 2 else 0
+    return timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+
+sqlite3.register_converter("TIME", _time_to_timedelta)
+sqlite3.register_converter("DATE", lambda v: date.fromisoformat(v.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda v: datetime.fromisoformat(v.decode()))
+sqlite3.register_adapter(timedelta, lambda td: "%02d:%02d:%02d" % (
+    td.seconds // 3600 + td.days * 24, td.seconds // 60 % 60, td.seconds % 60))
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(" "))
+
+
+def _field(value, *options):
+    # MySQL FIELD(): 1-based position of value in options, 0 if missing
+    try:
+        return options.index(value) + 1
+    except ValueError:
+        return 0
+
+
+_DDL_RULES = [
+    (re.compile(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bUNIQUE\s+KEY\s+\w+\s*\(", re.I), "UNIQUE ("),
+    (re.compile(r"\)\s*ENGINE\s*=\s*\w+[^;]*", re.I), ")"),
+]
+_ON_DUPLICATE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_VALUES_REF = re.compile(r"\bVALUES\s*\(\s*(\w+)\s*\)", re.I)
+# id=LAST_INSERT_ID(id) -> id=id ... RETURNING id: SQLite only sets lastrowid
+# on real inserts, on a conflict it would still hold the previous insert's id
+_LAST_INSERT_ID = re.compile(r"\bLAST_INSERT_ID\s*\(\s*(\w+)\s*\)", re.I)
+_RETURNING = re.compile(r"\bRETURNING\s+\w+\s*$", re.I)
+
+
+def translate(sql):
+    """Rewrite the MySQL dialect used by the app into SQLite."""
+    sql = sql.replace("%s", "?")
+    for pattern, replacement in _DDL_RULES:
+        sql = pattern.sub(replacement, sql)
+    match = _ON_DUPLICATE.search(sql)
+    if match:
+        head, tail = sql[:match.start()], sql[match.end():]
+        returning = _LAST_INSERT_ID.search(tail)
+        tail = _LAST_INSERT_ID.sub(r"\1", _VALUES_REF.sub(r"excluded.\1", tail))
+        sql = head + "ON CONFLICT DO UPDATE SET" + tail
+        if returning:
+            sql = sql.rstrip().rstrip(";") + f" RETURNING {returning.group(1)}"
+    return sql
+
+
+# -----------------------------
+# DB-API Wrapper mit mysql.connector-Interface
+# -----------------------------
+class SQLiteCursor:
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+        self._returned_id = None
+
+    def execute(self, sql, params=()):
+        sql = translate(sql)
+        self._cursor.execute(sql, tuple(params))
+        self._returned_id = None
+        if _RETURNING.search(sql):
+            # Upsert with LAST_INSERT_ID(): the id of the inserted or existing row
+            rows = self._cursor.fetchall()
+            self._returned_id = rows[0][0] if rows else None
+
+    def executemany(self, sql, seq_params):
+        self._cursor.executemany(translate(sql), [tuple(p) for p in seq_params])
+
+    @property
+    def lastrowid(self):
+        if self._returned_id is not None:
+            return self._returned_id
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {col[0]: value for col, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self._conn.cursor(), dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLiteBackend:
+    """SQLite stand-in for MySQL: a file or (path ":memory:") a shared in-memory DB."""
+
+    name = "sqlite"
+
+    def __init__(self, path=":memory:"):
+        if path == ":memory:":
+            # Shared cache, so all connections see the same in-memory DB
+            # (uuid, not id(self): a new backend could reuse the id of a freed one
+            # whose DB is still kept alive by a leftover connection)
+            self.uri = f"file:stundenplan-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        else:
+            self.uri = f"file:{os.path.abspath(path)}"
+        self._lock = threading.Lock()
+        # Keeps an in-memory DB alive as long as the backend exists
+        self._keeper = self._connect()
+        if path != ":memory:":
+            self._keeper.execute("PRAGMA journal_mode=WAL")
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.uri, uri=True, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES, timeout=30
+        )
+        conn.create_function("FIELD", -1, _field, deterministic=True)
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def connect(self):
+        return SQLiteConnection(self._connect())
+
+    def bootstrap(self):
+        """Create the schema from db/TODOS.sql if the DB is empty."""
+        with self._lock:
+            exists = self._keeper.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='users'"
+            ).fetchone()
+            if exists:
+                return False
+            with open(SCHEMA_FILE, encoding="utf-8") as f:
+                self._keeper.executescript(translate(f.read()))
+            return True
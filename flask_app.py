@@ -1,8 +1,29 @@
-from flask import Flask, redirect, render_template, request, url_for
+from flask import Flask, Response, redirect, render_template, request, stream_with_context, url_for
 from dotenv import load_dotenv
+from jinja2 import FileSystemBytecodeCache
+import csv
+import io
 import os
-from db import db_read, db_write
-from auth import login_manager, authenticate, register_user
+from functools import partial
+from db import after_commit, db_read, db_write, init_app as init_db
+from refdata import lehrer_id_for, raum_id_for, get_or_create_raum
+from catalog import catalog_page, is_scheduled, CATALOG_PAGE_SIZE, WOCHENTAGE
+from suggestions import free_slots, suggest_sections
+from bulk import KINDS as IMPORT_KINDS, import_rows, read_rows, guess_format, export_rows, render_rows, import_command, export_command
+from auth import login_manager, authenticate, register_user, users_command
+from conflicts import index as conflict_index
+from pluspunkte_calc import load_pluspunkte, compute_pluspunkte, save_subjects
+from pluspunkte_engine import project, DEFAULT_TARGETS, MAX_EXAMS
+from solver import solve_school, solve_command
+from migrations import migrate_command, check_indexes_command
+from schedule_cache import cached_page, schedule_changed, lesson_changed, versions as schedule_versions
+from ical import calendar_token, read_token, render_calendar
+import analytics
+import grade_stats
+import todo_list
+import profiling
+import assets
+import sessions
 from flask_login import login_user, logout_user, login_required, current_user
 import logging
 
@@ -19,10 +40,38 @@ app = Flask(__name__)
 app.config["DEBUG"] = True
 app.secret_key = "supersecret"
 
+# Compiled templates are kept on disk, so a restarted worker doesn't parse them again
+JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR", os.path.join(app.instance_path, "jinja_cache"))
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
+
+# Init db (one connection + transaction per request)
+init_db(app)
+
+# Query profiling: Server-Timing header, /metrics, slow-query log
+profiling.init_app(app)
+
+# Fingerprinted CSS/JS bundles (/assets) and gzip/brotli for HTML and JSON
+assets.init_app(app)
+
 # Init auth
 login_manager.init_app(app)
 login_manager.login_view = "login"
 
+# Optional server-side sessions (SESSION_STORE), caching the user context
+sessions.init_app(app)
+
+# CLI commands (flask --app flask_app <command>)
+app.cli.add_command(solve_command)
+app.cli.add_command(migrate_command)
+app.cli.add_command(check_indexes_command)
+app.cli.add_command(import_command)
+app.cli.add_command(export_command)
+app.cli.add_command(analytics.analytics_command)
+app.cli.add_command(grade_stats.grade_stats_command)
+app.cli.add_command(users_command)
+app.cli.add_command(sessions.sessions_command)
+
 
 # -----------------------------
 # STARTSEITE
@@ -125,13 +174,14 @@ def add_lesson():
 
 
         if current_user.role == 'teacher':
-            lehrer = db_read("SELECT id FROM lehrer WHERE user_id=%s", (current_user.id,), single=True)
-            if not lehrer:
+            lehrer_id = lehrer_id_for(current_user.id)
+            if lehrer_id is None:
                 # Error, but for now redirect
                 return redirect(url_for("teacher_week"))
-            lehrer_id = lehrer["id"]
         else:
-            lehrer_id = request.form["teacher"]
+            lehrer_id = request.form.get("teacher", type=int)
+            if lehrer_id is None:
+                return "Ungültige Lehrkraft", 400
         room_number = request.form.get("room", "unbekannt")
         weekday = request.form["weekday"]
         start, end = request.form["timeblock"].split("-")
@@ -147,46 +197,29 @@ def add_lesson():
         }
         tag = tage[weekday]
 
-        # Check for time conflicts - teacher can't have multiple classes at the same time
-        conflict = db_read("""
-            SELECT id FROM faecher 
-            WHERE lehrer_id=%s AND tag=%s AND startzeit=%s AND endzeit=%s
-        """, (lehrer_id, tag, start, end), single=True)
-        
-        if conflict:
+        # Check for time conflicts - teacher can't have overlapping classes
+        if conflict_index.teacher_conflicts(lehrer_id, tag, start, end):
             # Teacher already has a class at this time
             return render_template("lesson.html", error="Du hast bereits ein Fach zu dieser Zeit!")
 
-        # Raum speichern oder finden
-        raum = db_read(
-            "SELECT id FROM raum WHERE raumnummer=%s",
-            (room_number,),
-            single=True
+        # Raum finden (cached)
+        raum_id = raum_id_for(room_number)
+        if raum_id is not None and conflict_index.room_conflicts(raum_id, tag, start, end):
+            # Room is already booked at this time
+            return render_template("lesson.html", error="Der Raum ist zu dieser Zeit bereits belegt!")
+        if raum_id is None:
+            raum_id = get_or_create_raum(room_number)
+
+        # Fach speichern (an identical row would have been a conflict above)
+        fach_id = db_write(
+            "INSERT INTO faecher (fachname, lehrer_id, raum_id, tag, startzeit, endzeit) VALUES (%s,%s,%s,%s,%s,%s)",
+            (subject, lehrer_id, raum_id, tag, start, end),
+            return_id=True
         )
-        if not raum:
-            db_write("INSERT INTO raum (raumnummer) VALUES (%s)", (room_number,))
-            raum = db_read(
-                "SELECT id FROM raum WHERE raumnummer=%s",
-                (room_number,),
-                single=True
-            )
-
-        # Fach speichern oder finden
-        fach = db_read(
-            "SELECT id FROM faecher WHERE fachname=%s AND lehrer_id=%s AND raum_id=%s AND tag=%s AND startzeit=%s AND endzeit=%s",
-            (subject, lehrer_id, raum["id"], tag, start, end),
-            single=True
-        )
-        if not fach:
-            db_write(
-                "INSERT INTO faecher (fachname, lehrer_id, raum_id, tag, startzeit, endzeit) VALUES (%s,%s,%s,%s,%s,%s)",
-                (subject, lehrer_id, raum["id"], tag, start, end)
-            )
-            fach = db_read(
-                "SELECT id FROM faecher WHERE fachname=%s AND lehrer_id=%s AND raum_id=%s AND tag=%s AND startzeit=%s AND endzeit=%s",
-                (subject, lehrer_id, raum["id"], tag, start, end),
-                single=True
-            )
+        after_commit(partial(conflict_index.lesson_saved, fach_id, lehrer_id, raum_id, tag, start, end))
+        analytics.lesson_added(fach_id, lehrer_id, raum_id, tag, start, end)
+        # Admins add lessons for the teacher chosen in the form
+        lesson_changed(fach_id, current_user.id if current_user.role == 'teacher' else None)
 
         return redirect(url_for("teacher_week"))
 
@@ -199,7 +232,10 @@ def add_lesson():
 @login_required
 def add_schedule():
     if request.method == "POST":
-        fach_id = request.form["fach_id"]
+        fach_id = request.form.get("fach_id", type=int)
+        # Unknown or without a slot (left unplaced by the solver)
+        if fach_id is None or not is_scheduled(fach_id):
+            return "Ungültiges Fach", 400
 
         # Check if already added
         existing = db_read(
@@ -211,64 +247,78 @@ def add_schedule():
             # Already added, perhaps flash message, but for now redirect
             return redirect(url_for("week_view"))
         
-        # Check for time conflicts - student can't enroll in multiple classes at the same time
-        conflict = db_read("""
-            SELECT stundenplan.id FROM stundenplan
-            JOIN faecher f1 ON stundenplan.fach_id = f1.id
-            JOIN faecher f2 ON f2.id = %s
-            WHERE stundenplan.user_id = %s 
-            AND f1.tag = f2.tag 
-            AND f1.startzeit = f2.startzeit 
-            AND f1.endzeit = f2.endzeit
-        """, (fach_id, current_user.id), single=True)
-        
-        if conflict:
-            # Student already has a class at this time
-            available_faecher = db_read("""
-                SELECT 
-                    faecher.id,
-                    faecher.fachname,
-                    lehrer.name AS lehrer,
-                    raum.raumnummer AS raum,
-                    faecher.tag,
-                    faecher.startzeit,
-                    faecher.endzeit
-                FROM faecher
-                JOIN lehrer ON faecher.lehrer_id = lehrer.id
-                JOIN raum ON faecher.raum_id = raum.id
-                LEFT JOIN stundenplan ON faecher.id = stundenplan.fach_id AND stundenplan.user_id = %s
-                WHERE stundenplan.id IS NULL
-                ORDER BY faecher.fachname, faecher.tag, faecher.startzeit
-            """, (current_user.id,)) or []
-            return render_template("schedule.html", available_faecher=available_faecher, error="Du hast bereits ein Fach zu dieser Zeit!")
+        # Check for time conflicts - student can't enroll in overlapping classes
+        if conflict_index.student_conflicts(current_user.id, fach_id):
+            # Student already has a class at this time: offer the sections of this subject that fit
+            return render_template(
+                "schedule.html",
+                catalog=catalog_page(current_user.id),
+                suggestions=suggest_sections(current_user.id, like_fach_id=fach_id),
+                error="Du hast bereits ein Fach zu dieser Zeit!"
+            )
 
         # Stundenplan-Eintrag speichern
         db_write(
             "INSERT INTO stundenplan (user_id, fach_id) VALUES (%s,%s)",
             (current_user.id, fach_id)
         )
+        after_commit(partial(conflict_index.enrolled, current_user.id, fach_id))
+        analytics.enrollment_changed(fach_id, 1)
+        schedule_changed(current_user.id)
 
         return redirect(url_for("week_view"))
 
-    # Get available faecher (not already in user's stundenplan)
-    available_faecher = db_read("""
-        SELECT 
-            faecher.id,
-            faecher.fachname,
-            lehrer.name AS lehrer,
-            raum.raumnummer AS raum,
-            faecher.tag,
-            faecher.startzeit,
-            faecher.endzeit
-        FROM faecher
-        JOIN lehrer ON faecher.lehrer_id = lehrer.id
-        JOIN raum ON faecher.raum_id = raum.id
-        LEFT JOIN stundenplan ON faecher.id = stundenplan.fach_id AND stundenplan.user_id = %s
-        WHERE stundenplan.id IS NULL
-        ORDER BY faecher.fachname, faecher.tag, faecher.startzeit
-    """, (current_user.id,)) or []
+    # First page of available faecher, the template loads more via /api/faecher
+    return render_template("schedule.html", catalog=catalog_page(current_user.id))
 
-    return render_template("schedule.html", available_faecher=available_faecher)
+
+# -----------------------------
+# FÄCHER-KATALOG (JSON, seitenweise)
+# -----------------------------
+@app.route("/api/faecher")
+@login_required
+def api_faecher():
+    tag = request.args.get("tag") or None
+    if tag and tag not in WOCHENTAGE:
+        return {"error": "Unbekannter Wochentag"}, 400
+    try:
+        return catalog_page(
+            current_user.id,
+            tag=tag,
+            q=(request.args.get("q") or "").strip() or None,
+            lehrer_id=request.args.get("lehrer_id", type=int),
+            free_only=request.args.get("free_only") == "1",
+            ignore_fach_id=request.args.get("ignore", type=int),
+            cursor=request.args.get("cursor") or None,
+            limit=request.args.get("limit", CATALOG_PAGE_SIZE, type=int),
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+
+# -----------------------------
+# FREIE ZEITEN / ALTERNATIVEN (JSON)
+# -----------------------------
+@app.route("/api/free_slots")
+@login_required
+def api_free_slots():
+    return {"free": free_slots(current_user.id, ignore=request.args.get("ignore", type=int))}
+
+
+@app.route("/api/suggestions")
+@login_required
+def api_suggestions():
+    fachname = (request.args.get("fachname") or "").strip() or None
+    like_fach_id = request.args.get("fach_id", type=int)
+    if not fachname and not like_fach_id:
+        return {"error": "fachname oder fach_id fehlt"}, 400
+    return {"items": suggest_sections(
+        current_user.id,
+        fachname=fachname,
+        like_fach_id=like_fach_id,
+        ignore=request.args.get("ignore", type=int),
+        limit=min(request.args.get("limit", 5, type=int), 50),
+    )}
 
 
 # -----------------------------
@@ -279,12 +329,15 @@ def add_schedule():
 def delete_schedule(stundenplan_id):
     # Ensure the entry belongs to the current user
     entry = db_read(
-        "SELECT id FROM stundenplan WHERE id=%s AND user_id=%s",
+        "SELECT id, fach_id FROM stundenplan WHERE id=%s AND user_id=%s",
         (stundenplan_id, current_user.id),
         single=True
     )
     if entry:
         db_write("DELETE FROM stundenplan WHERE id=%s", (stundenplan_id,))
+        after_commit(partial(conflict_index.unenrolled, current_user.id, entry["fach_id"]))
+        analytics.enrollment_changed(entry["fach_id"], -1)
+        schedule_changed(current_user.id)
     
     return redirect(url_for("week_view"))
 
@@ -304,14 +357,32 @@ def edit_schedule(stundenplan_id):
     if not entry:
         return redirect(url_for("week_view"))
 
+    error = None
+    suggestions = None
     if request.method == "POST":
-        new_fach_id = request.form["fach"]
-        db_write("UPDATE stundenplan SET fach_id=%s WHERE id=%s", (new_fach_id, stundenplan_id))
-        return redirect(url_for("week_view"))
+        new_fach_id = request.form.get("fach", type=int)
+        if new_fach_id is None or not is_scheduled(new_fach_id):
+            return "Ungültiges Fach", 400
+        if new_fach_id == entry["fach_id"]:
+            return redirect(url_for("week_view"))
+        # UNIQUE (user_id, fach_id): the UPDATE would fail on a second entry
+        if db_read("SELECT id FROM stundenplan WHERE user_id=%s AND fach_id=%s",
+                   (current_user.id, new_fach_id), single=True):
+            error = "Dieses Fach ist bereits in deinem Stundenplan!"
+        elif conflict_index.student_conflicts(current_user.id, new_fach_id, ignore=entry["fach_id"]):
+            error = "Du hast bereits ein Fach zu dieser Zeit!"
+            suggestions = suggest_sections(current_user.id, like_fach_id=new_fach_id, ignore=entry["fach_id"])
+        else:
+            db_write("UPDATE stundenplan SET fach_id=%s WHERE id=%s", (new_fach_id, stundenplan_id))
+            after_commit(partial(conflict_index.unenrolled, current_user.id, entry["fach_id"]))
+            after_commit(partial(conflict_index.enrolled, current_user.id, new_fach_id))
+            analytics.enrollment_changed(entry["fach_id"], -1)
+            analytics.enrollment_changed(new_fach_id, 1)
+            schedule_changed(current_user.id)
+            return redirect(url_for("week_view"))
 
-    faecher = db_read("""
+    current_fach = db_read("""
         SELECT 
-            faecher.id,
             faecher.fachname,
             lehrer.name AS lehrer,
             raum.raumnummer AS raum,
@@ -321,10 +392,20 @@ def edit_schedule(stundenplan_id):
         FROM faecher
         JOIN lehrer ON faecher.lehrer_id = lehrer.id
         JOIN raum ON faecher.raum_id = raum.id
-        ORDER BY faecher.fachname
-    """) or []
+        WHERE faecher.id = %s
+    """, (entry["fach_id"],), single=True)
+    if current_fach:
+        current_fach["startzeit"] = str(current_fach["startzeit"])[:5]
+        current_fach["endzeit"] = str(current_fach["endzeit"])[:5]
 
-    return render_template("edit_schedule.html", faecher=faecher, current_fach_id=entry["fach_id"])
+    return render_template(
+        "edit_schedule.html",
+        catalog=catalog_page(current_user.id, ignore_fach_id=entry["fach_id"]),
+        current_fach=current_fach,
+        current_fach_id=entry["fach_id"],
+        suggestions=suggestions,
+        error=error
+    )
 
 
 # -----------------------------
@@ -333,40 +414,46 @@ def edit_schedule(stundenplan_id):
 @app.route("/week")
 @login_required
 def week_view():
-    eintraege = db_read("""
-        SELECT 
-            stundenplan.id AS stundenplan_id,
-            faecher.tag,
-            faecher.startzeit,
-            faecher.endzeit,
-            faecher.fachname,
-            lehrer.name AS lehrer,
-            raum.raumnummer AS raum
-        FROM stundenplan
-        JOIN faecher ON stundenplan.fach_id = faecher.id
-        JOIN lehrer ON faecher.lehrer_id = lehrer.id
-        JOIN raum ON faecher.raum_id = raum.id
-        WHERE stundenplan.user_id=%s
-        ORDER BY FIELD(faecher.tag, 'Montag','Dienstag','Mittwoch','Donnerstag','Freitag'), faecher.startzeit
-    """, (current_user.id,))
-
-    # Struktur für Template
-    wochentage = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]
-    stundenplan = {tag: [] for tag in wochentage}
-
-    for e in eintraege:
-        stundenplan[e["tag"]].append({
-            "stundenplan_id": e["stundenplan_id"],
-            "fachname": e["fachname"],
-            "lehrer": e["lehrer"],
-            "raum": e["raum"],
-
-            # FIX: timedelta → String (HH:MM)
-            "startzeit": str(e["startzeit"])[:5],
-            "endzeit": str(e["endzeit"])[:5]
-        })
-
-    return render_template("student_week.html", stundenplan=stundenplan)
+    # Rendered page is cached per user + schedule version (ETag/304)
+    def render():
+        eintraege = db_read("""
+            SELECT 
+                stundenplan.id AS stundenplan_id,
+                faecher.tag,
+                faecher.startzeit,
+                faecher.endzeit,
+                faecher.fachname,
+                lehrer.name AS lehrer,
+                raum.raumnummer AS raum
+            FROM stundenplan
+            JOIN faecher ON stundenplan.fach_id = faecher.id
+            JOIN lehrer ON faecher.lehrer_id = lehrer.id
+            JOIN raum ON faecher.raum_id = raum.id
+            WHERE stundenplan.user_id=%s
+            ORDER BY FIELD(faecher.tag, 'Montag','Dienstag','Mittwoch','Donnerstag','Freitag'), faecher.startzeit
+        """, (current_user.id,))
+
+        # Struktur für Template
+        wochentage = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]
+        stundenplan = {tag: [] for tag in wochentage}
+
+        for e in eintraege:
+            if e["tag"] not in stundenplan:
+                continue  # noch ohne Slot (Solver konnte es nicht platzieren)
+            stundenplan[e["tag"]].append({
+                "stundenplan_id": e["stundenplan_id"],
+                "fachname": e["fachname"],
+                "lehrer": e["lehrer"],
+                "raum": e["raum"],
+
+                # FIX: timedelta → String (HH:MM)
+                "startzeit": str(e["startzeit"])[:5],
+                "endzeit": str(e["endzeit"])[:5]
+            })
+
+        return render_template("student_week.html", stundenplan=stundenplan, calendar_url=_calendar_url())
+
+    return cached_page("week", current_user.id, render)
 
 
 # -----------------------------
@@ -378,44 +465,73 @@ def teacher_week():
     if current_user.role != 'teacher':
         return redirect(url_for("week_view"))
 
-    # Get lehrer_id for current user
-    lehrer = db_read("SELECT id FROM lehrer WHERE user_id=%s", (current_user.id,), single=True)
-    if not lehrer:
-        # No lehrer entry, show empty
-        stundenplan = {tag: [] for tag in ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]}
-        return render_template("teacher_week.html", stundenplan=stundenplan)
+    def render():
+        # Get lehrer_id for current user
+        lehrer_id = lehrer_id_for(current_user.id)
+        if lehrer_id is None:
+            # No lehrer entry, show empty
+            stundenplan = {tag: [] for tag in ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]}
+            return render_template("teacher_week.html", stundenplan=stundenplan)
+
+        subjects = db_read("""
+            SELECT 
+                faecher.id AS fach_id,
+                faecher.fachname,
+                lehrer.name AS lehrer,
+                raum.raumnummer AS raum,
+                faecher.tag,
+                faecher.startzeit,
+                faecher.endzeit
+            FROM faecher
+            JOIN lehrer ON faecher.lehrer_id = lehrer.id
+            JOIN raum ON faecher.raum_id = raum.id
+            WHERE faecher.lehrer_id = %s
+            ORDER BY FIELD(faecher.tag, 'Montag','Dienstag','Mittwoch','Donnerstag','Freitag'), faecher.startzeit
+        """, (lehrer_id,)) or []
+
+        # Struktur für Template
+        wochentage = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]
+        stundenplan = {tag: [] for tag in wochentage}
+
+        for s in subjects:
+            if s["tag"] not in stundenplan:
+                continue  # noch ohne Slot (Solver konnte es nicht platzieren)
+            stundenplan[s["tag"]].append({
+                "fach_id": s["fach_id"],
+                "fachname": s["fachname"],
+                "lehrer": s["lehrer"],
+                "raum": s["raum"],
+                "startzeit": str(s["startzeit"])[:5],
+                "endzeit": str(s["endzeit"])[:5]
+            })
+
+        return render_template("teacher_week.html", stundenplan=stundenplan, calendar_url=_calendar_url())
+
+    return cached_page("teacher_week", current_user.id, render)
+
+
+# -----------------------------
+# KALENDER-ABO (iCalendar)
+# -----------------------------
+def _calendar_url():
+    return url_for("calendar_feed", token=calendar_token(current_user.id, current_user.role), _external=True)
 
-    subjects = db_read("""
-        SELECT 
-            faecher.id AS fach_id,
-            faecher.fachname,
-            lehrer.name AS lehrer,
-            raum.raumnummer AS raum,
-            faecher.tag,
-            faecher.startzeit,
-            faecher.endzeit
-        FROM faecher
-        JOIN lehrer ON faecher.lehrer_id = lehrer.id
-        JOIN raum ON faecher.raum_id = raum.id
-        WHERE faecher.lehrer_id = %s
-        ORDER BY FIELD(faecher.tag, 'Montag','Dienstag','Mittwoch','Donnerstag','Freitag'), faecher.startzeit
-    """, (lehrer["id"],)) or []
 
-    # Struktur für Template
-    wochentage = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]
-    stundenplan = {tag: [] for tag in wochentage}
+@app.route("/calendar/<token>.ics")
+def calendar_feed(token):
+    # No login: calendar apps can't, the signed token identifies the user.
+    # Unchanged polls get 304 or the cached body after one version lookup.
+    owner = read_token(token)
+    if owner is None:
+        return "Unbekannter Kalender", 404
+    user_id, role = owner
 
-    for s in subjects:
-        stundenplan[s["tag"]].append({
-            "fach_id": s["fach_id"],
-            "fachname": s["fachname"],
-            "lehrer": s["lehrer"],
-            "raum": s["raum"],
-            "startzeit": str(s["startzeit"])[:5],
-            "endzeit": str(s["endzeit"])[:5]
-        })
+    def render():
+        return render_calendar(user_id, role, schedule_versions.get(user_id)[1])
 
-    return render_template("teacher_week.html", stundenplan=stundenplan)
+    response = cached_page("ics", user_id, render, mimetype="text/calendar")
+    response.headers["Content-Disposition"] = 'inline; filename="stundenplan.ics"'
+    return response
 
 
 # -----------------------------
@@ -428,21 +544,24 @@ def delete_lesson(fach_id):
         return redirect(url_for("week_view"))
     
     # Get lehrer_id for current user
-    lehrer = db_read("SELECT id FROM lehrer WHERE user_id=%s", (current_user.id,), single=True)
-    if not lehrer:
+    lehrer_id = lehrer_id_for(current_user.id)
+    if lehrer_id is None:
         return redirect(url_for("teacher_week"))
     
     # Ensure the lesson belongs to the current teacher
     fach = db_read(
-        "SELECT id FROM faecher WHERE id=%s AND lehrer_id=%s",
-        (fach_id, lehrer["id"]),
+        "SELECT id, raum_id, tag, startzeit, endzeit FROM faecher WHERE id=%s AND lehrer_id=%s",
+        (fach_id, lehrer_id),
         single=True
     )
     if fach:
+        lesson_changed(fach_id, current_user.id)
+        analytics.lesson_removed(fach_id, lehrer_id, fach["raum_id"], fach["tag"], fach["startzeit"], fach["endzeit"])
         # Delete related stundenplan entries first
         db_write("DELETE FROM stundenplan WHERE fach_id=%s", (fach_id,))
         # Delete the fach
         db_write("DELETE FROM faecher WHERE id=%s", (fach_id,))
+        after_commit(partial(conflict_index.lesson_deleted, fach_id))
     
     return redirect(url_for("teacher_week"))
 
@@ -457,19 +576,29 @@ def edit_lesson(fach_id):
         return redirect(url_for("week_view"))
     
     # Get lehrer_id for current user
-    lehrer = db_read("SELECT id FROM lehrer WHERE user_id=%s", (current_user.id,), single=True)
-    if not lehrer:
+    lehrer_id = lehrer_id_for(current_user.id)
+    if lehrer_id is None:
         return redirect(url_for("teacher_week"))
     
-    # Ensure the lesson belongs to the current teacher
-    fach = db_read(
-        "SELECT * FROM faecher WHERE id=%s AND lehrer_id=%s",
-        (fach_id, lehrer["id"]),
-        single=True
-    )
+    # Ensure the lesson belongs to the current teacher (Raumnummer gleich mit)
+    fach = db_read("""
+        SELECT faecher.*, raum.raumnummer
+        FROM faecher
+        LEFT JOIN raum ON faecher.raum_id = raum.id
+        WHERE faecher.id=%s AND faecher.lehrer_id=%s
+    """, (fach_id, lehrer_id), single=True)
     if not fach:
         return redirect(url_for("teacher_week"))
     
+    # Convert tag back to number for form
+    tag_to_number = {
+        "Montag": "1",
+        "Dienstag": "2",
+        "Mittwoch": "3",
+        "Donnerstag": "4",
+        "Freitag": "5"
+    }
+    
     if request.method == "POST":
         subject = request.form["subject"]
         room_number = request.form.get("room", "unbekannt")
@@ -486,61 +615,48 @@ def edit_lesson(fach_id):
         }
         tag = tage[weekday]
         
-        # Check for time conflicts - teacher can't have multiple classes at the same time
-        conflict = db_read("""
-            SELECT id FROM faecher 
-            WHERE lehrer_id=%s AND tag=%s AND startzeit=%s AND endzeit=%s AND id != %s
-        """, (lehrer["id"], tag, start, end, fach_id), single=True)
+        # Raum finden (cached)
+        raum_id = raum_id_for(room_number)
         
-        if conflict:
-            # Teacher already has a class at this time
-            raum = db_read("SELECT raumnummer FROM raum WHERE id=%s", (fach["raum_id"],), single=True)
+        # Check for time conflicts - teacher can't have overlapping classes, room can't be double-booked
+        error = None
+        if conflict_index.teacher_conflicts(lehrer_id, tag, start, end, ignore=fach_id):
+            error = "Du hast bereits ein Fach zu dieser Zeit!"
+        elif raum_id is not None and conflict_index.room_conflicts(raum_id, tag, start, end, ignore=fach_id):
+            error = "Der Raum ist zu dieser Zeit bereits belegt!"
+        
+        if error:
             fach_data = {
                 "fachname": fach["fachname"],
-                "raumnummer": raum["raumnummer"] if raum else "unbekannt",
+                "raumnummer": fach["raumnummer"] or "unbekannt",
                 "weekday": tag_to_number.get(fach["tag"], "1"),
                 "startzeit": str(fach["startzeit"])[:5],
                 "endzeit": str(fach["endzeit"])[:5]
             }
-            return render_template("edit_lesson.html", fach=fach_data, error="Du hast bereits ein Fach zu dieser Zeit!")
+            return render_template("edit_lesson.html", fach=fach_data, error=error)
         
-        # Raum speichern oder finden
-        raum = db_read(
-            "SELECT id FROM raum WHERE raumnummer=%s",
-            (room_number,),
-            single=True
-        )
-        if not raum:
-            db_write("INSERT INTO raum (raumnummer) VALUES (%s)", (room_number,))
-            raum = db_read(
-                "SELECT id FROM raum WHERE raumnummer=%s",
-                (room_number,),
-                single=True
-            )
+        # Raum speichern
+        if raum_id is None:
+            raum_id = get_or_create_raum(room_number)
         
         # Update the fach
         db_write(
             "UPDATE faecher SET fachname=%s, raum_id=%s, tag=%s, startzeit=%s, endzeit=%s WHERE id=%s",
-            (subject, raum["id"], tag, start, end, fach_id)
+            (subject, raum_id, tag, start, end, fach_id)
         )
+        after_commit(partial(conflict_index.lesson_saved, fach_id, lehrer_id, raum_id, tag, start, end))
+        analytics.lesson_moved(
+            fach_id,
+            (lehrer_id, fach["raum_id"], fach["tag"], fach["startzeit"], fach["endzeit"]),
+            (lehrer_id, raum_id, tag, start, end)
+        )
+        lesson_changed(fach_id, current_user.id)
         
         return redirect(url_for("teacher_week"))
     
-    # Convert tag back to number for form
-    tag_to_number = {
-        "Montag": "1",
-        "Dienstag": "2",
-        "Mittwoch": "3",
-        "Donnerstag": "4",
-        "Freitag": "5"
-    }
-    
-    # Get raum info
-    raum = db_read("SELECT raumnummer FROM raum WHERE id=%s", (fach["raum_id"],), single=True)
-    
     fach_data = {
         "fachname": fach["fachname"],
-        "raumnummer": raum["raumnummer"] if raum else "unbekannt",
+        "raumnummer": fach["raumnummer"] or "unbekannt",
         "weekday": tag_to_number.get(fach["tag"], "1"),
         "startzeit": str(fach["startzeit"])[:5],
         "endzeit": str(fach["endzeit"])[:5]
@@ -558,47 +674,26 @@ def pluspunkte():
     if current_user.role != 'student':
         return redirect(url_for("teacher_week"))
     
-    # Get all unique subjects from the student's schedule
-    subjects = db_read("""
-        SELECT DISTINCT faecher.fachname
-        FROM stundenplan
-        JOIN faecher ON stundenplan.fach_id = faecher.id
-        WHERE stundenplan.user_id = %s
-        ORDER BY faecher.fachname
-    """, (current_user.id,)) or []
-    
-    # Load saved data
-    saved_data = {}
+    # Subjects, weights and exams in two queries
     try:
-        for subject in subjects:
-            fachname = subject['fachname']
-            
-            # Get Fach-Gewichtung
-            gewichtung = db_read(
-                "SELECT gewichtung FROM fach_gewichtungen WHERE user_id=%s AND fachname=%s",
-                (current_user.id, fachname),
-                single=True
-            )
-            
-            # Get all Prüfungen for this subject
-            pruefungen = db_read(
-                "SELECT id, note, gewichtung FROM pruefungen WHERE user_id=%s AND fachname=%s ORDER BY id",
-                (current_user.id, fachname)
-            ) or []
-            
-            saved_data[fachname] = {
-                'fach_gewichtung': float(gewichtung['gewichtung']) if gewichtung else 1.0,
-                'pruefungen': [{'note': float(p['note']), 'gewichtung': float(p['gewichtung'])} for p in pruefungen]
-            }
+        subjects, saved_data = load_pluspunkte(current_user.id)
     except Exception as e:
         logging.error(f"Error loading pluspunkte data: {e}")
-        for subject in subjects:
-            saved_data[subject['fachname']] = {
-                'fach_gewichtung': 1.0,
-                'pruefungen': []
-            }
+        subjects = db_read("""
+            SELECT DISTINCT faecher.fachname
+            FROM stundenplan
+            JOIN faecher ON stundenplan.fach_id = faecher.id
+            WHERE stundenplan.user_id = %s
+            ORDER BY faecher.fachname
+        """, (current_user.id,)) or []
+        saved_data = {
+            subject['fachname']: {'fach_gewichtung': 1.0, 'pruefungen': []}
+            for subject in subjects
+        }
+
+    total = compute_pluspunkte(saved_data)
     
-    return render_template("pluspunkte.html", subjects=subjects, saved_data=saved_data)
+    return render_template("pluspunkte.html", subjects=subjects, saved_data=saved_data, total=total)
 
 
 # -----------------------------
@@ -614,37 +709,9 @@ def save_pluspunkte():
         import json
         data = json.loads(request.data)
         
-        fachname = data.get('fachname')
-        fach_gewichtung = data.get('fach_gewichtung', 1.0)
-        pruefungen = data.get('pruefungen', [])
-        
-        # Save or update Fach-Gewichtung
-        existing = db_read(
-            "SELECT id FROM fach_gewichtungen WHERE user_id=%s AND fachname=%s",
-            (current_user.id, fachname),
-            single=True
-        )
-        
-        if existing:
-            db_write(
-                "UPDATE fach_gewichtungen SET gewichtung=%s WHERE id=%s",
-                (fach_gewichtung, existing['id'])
-            )
-        else:
-            db_write(
-                "INSERT INTO fach_gewichtungen (user_id, fachname, gewichtung) VALUES (%s, %s, %s)",
-                (current_user.id, fachname, fach_gewichtung)
-            )
-        
-        # Delete old Prüfungen for this subject
-        db_write("DELETE FROM pruefungen WHERE user_id=%s AND fachname=%s", (current_user.id, fachname))
-        
-        # Insert new Prüfungen
-        for pruefung in pruefungen:
-            db_write(
-                "INSERT INTO pruefungen (user_id, fachname, note, gewichtung) VALUES (%s, %s, %s, %s)",
-                (current_user.id, fachname, pruefung['note'], pruefung['gewichtung'])
-            )
+        result = save_subjects(current_user.id, [data])[0]
+        if not result['success']:
+            return {'success': False, 'error': result['error']}, 400
         
         return {'success': True}
     except Exception as e:
@@ -652,6 +719,211 @@ def save_pluspunkte():
         return {'success': False, 'error': str(e)}, 500
 
 
+@app.route("/pluspunkte/save_all", methods=["POST"])
+@login_required
+def save_all_pluspunkte():
+    if current_user.role != 'student':
+        return {'success': False, 'error': 'Unauthorized'}, 403
+    
+    data = request.get_json(silent=True) or {}
+    subjects = data.get('subjects')
+    if not isinstance(subjects, list):
+        return {'success': False, 'error': 'subjects fehlt'}, 400
+    
+    try:
+        results = save_subjects(current_user.id, subjects)
+    except Exception as e:
+        logging.error(f"Error saving pluspunkte: {e}")
+        return {'success': False, 'error': str(e)}, 500
+    
+    return {'success': all(r['success'] for r in results), 'results': results}
+
+
+# -----------------------------
+# PLUSPUNKTE PROGNOSE (JSON)
+# -----------------------------
+def _number_list(name, cast=float):
+    raw = request.args.get(name) or ""
+    return [cast(v) for v in raw.split(",") if v.strip()]
+
+
+@app.route("/api/pluspunkte/projection")
+@login_required
+def api_pluspunkte_projection():
+    if current_user.role != 'student':
+        return {'success': False, 'error': 'Unauthorized'}, 403
+    
+    try:
+        goal = request.args.get("goal", 0.0, type=float)
+        next_weight = request.args.get("weight", 1.0, type=float)
+        spread = request.args.get("spread", 0.5, type=float)
+        targets = _number_list("targets") or DEFAULT_TARGETS
+        weights = _number_list("weights")
+        exam_counts = _number_list("exam_counts", int)
+        if not 0.1 <= next_weight <= 99.9 or not 0.05 <= spread <= 3 or any(not 0.1 <= w <= 99.9 for w in weights):
+            raise ValueError("Gewichtung oder Streuung ausserhalb des gültigen Bereichs")
+        # Ranges also reject nan / inf ("goal=nan" parses as a float)
+        if not -100 <= goal <= 100 or any(not 1 <= t <= 6 for t in targets):
+            raise ValueError("Ziel oder Zielnoten ausserhalb des gültigen Bereichs")
+        if len(targets) > 21 or len(weights) > 10 or len(exam_counts) > MAX_EXAMS:
+            raise ValueError("Zu viele Werte")
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}, 400
+
+    _, saved_data = load_pluspunkte(current_user.id)
+    return project(
+        saved_data,
+        goal=goal,
+        next_weight=next_weight,
+        exams=request.args.get("exams", 1, type=int),
+        spread=spread,
+        targets=targets,
+        weights=weights,
+        exam_counts=exam_counts,
+        include_ungraded=request.args.get("include_ungraded") == "1",
+    )
+
+
+# -----------------------------
+# ADMIN: STUNDENPLAN GENERIEREN
+# -----------------------------
+@app.route("/admin/timetable/solve", methods=["POST"])
+@login_required
+def admin_solve_timetable():
+    if current_user.role != 'admin':
+        return {'success': False, 'error': 'Unauthorized'}, 403
+    
+    data = request.get_json(silent=True) or request.form
+    try:
+        budget = float(data.get('budget', 10))
+    except (TypeError, ValueError):
+        return {'success': False, 'error': 'Ungültiges Zeitbudget'}, 400
+    if not 0 < budget < float('inf'):
+        return {'success': False, 'error': 'Ungültiges Zeitbudget'}, 400
+    budget = min(budget, 30.0)
+    dry_run = str(data.get('dry_run', '')).lower() in ('1', 'true', 'on')
+    force = str(data.get('force', '')).lower() in ('1', 'true', 'on')
+    
+    try:
+        result = solve_school(budget, apply=not dry_run, force=force)
+    except Exception as e:
+        logging.error(f"Error solving timetable: {e}")
+        return {'success': False, 'error': str(e)}, 500
+    
+    body = {
+        'success': not result['unplaced'],
+        'applied': result['applied'],
+        'placed': len(result['assignments']),
+        'unplaced': result['unplaced'],
+        'seconds': result['seconds']
+    }
+    if not dry_run and not result['applied']:
+        # Nichts geschrieben: ungeplante Fächer würden ihren alten Slot behalten
+        body['error'] = 'Nicht alle Fächer platzierbar (force=1 übernimmt trotzdem)'
+        return body, 409
+    return body
+
+
+# -----------------------------
+# AUSLASTUNG RÄUME / LEHRER (Admin, JSON)
+# -----------------------------
+@app.route("/admin/analytics")
+@login_required
+def admin_analytics():
+    if current_user.role != 'admin':
+        return {'success': False, 'error': 'Unauthorized'}, 403
+    return analytics.report(limit=min(request.args.get("limit", 5, type=int), 100))
+
+
+@app.route("/admin/analytics/<art>/<int:ref_id>")
+@login_required
+def admin_analytics_grid(art, ref_id):
+    if current_user.role != 'admin':
+        return {'success': False, 'error': 'Unauthorized'}, 403
+    if art not in analytics.ARTEN:
+        return {'success': False, 'error': 'Unbekannter Typ'}, 404
+    return {"art": art, "id": ref_id, "grid": analytics.grid(art, ref_id)}
+
+
+# -----------------------------
+# NOTENSTATISTIK (Summentabellen, nächtlicher Batch-Job)
+# -----------------------------
+@app.route("/teacher/noten")
+@login_required
+def teacher_noten():
+    if current_user.role != 'teacher':
+        return redirect(url_for("index"))
+
+    lehrer_id = lehrer_id_for(current_user.id)
+    fachnamen = grade_stats.teacher_subjects(lehrer_id) if lehrer_id is not None else []
+    return render_template(
+        "teacher_noten.html",
+        statistik=grade_stats.subject_stats(fachnamen),
+        min_schueler=grade_stats.GRADE_STATS_MIN_STUDENTS,
+    )
+
+
+@app.route("/admin/noten")
+@login_required
+def admin_noten():
+    if current_user.role != 'admin':
+        return {'success': False, 'error': 'Unauthorized'}, 403
+    return {"faecher": grade_stats.subject_stats()}
+
+
+# -----------------------------
+# IMPORT / EXPORT (CSV, JSON)
+# -----------------------------
+EXPORT_MIMETYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def _export_response(kind, fmt, filename, user_id=None, role=None):
+    if fmt not in EXPORT_MIMETYPES:
+        return {'success': False, 'error': 'Unbekanntes Format'}, 400
+    rows = export_rows(kind, user_id=user_id, role=role)
+    response = Response(stream_with_context(render_rows(rows, kind, fmt)), mimetype=EXPORT_MIMETYPES[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+@app.route("/export/schedule")
+@login_required
+def export_schedule():
+    fmt = request.args.get("format", "csv")
+    return _export_response("lessons", fmt, "stundenplan", user_id=current_user.id, role=current_user.role)
+
+
+@app.route("/admin/export/<kind>")
+@login_required
+def admin_export(kind):
+    if current_user.role != 'admin':
+        return {'success': False, 'error': 'Unauthorized'}, 403
+    if kind not in IMPORT_KINDS:
+        return {'success': False, 'error': 'Unbekannter Typ'}, 404
+    return _export_response(kind, request.args.get("format", "csv"), kind)
+
+
+@app.route("/admin/import/<kind>", methods=["POST"])
+@login_required
+def admin_import(kind):
+    if current_user.role != 'admin':
+        return {'success': False, 'error': 'Unauthorized'}, 403
+    if kind not in IMPORT_KINDS:
+        return {'success': False, 'error': 'Unbekannter Typ'}, 404
+    upload = request.files.get("file")
+    if not upload:
+        return {'success': False, 'error': 'Keine Datei'}, 400
+    fmt = request.form.get("format") or guess_format(upload.filename)
+    dry_run = str(request.form.get('dry_run', '')).lower() in ('1', 'true', 'on')
+
+    try:
+        result = import_rows(kind, read_rows(io.TextIOWrapper(upload.stream, encoding="utf-8-sig"), fmt), dry_run)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return {'success': False, 'error': f'Datei konnte nicht gelesen werden: {e}'}, 400
+
+    return {'success': not result['skipped'], **result}
+
+
 # -----------------------------
 # TO-DO LISTE
 # -----------------------------
@@ -661,40 +933,28 @@ def todos():
     from datetime import date
     
     try:
-        # Get all todos for current user, sorted by: uncompleted first, then by due date
-        all_todos = db_read("""
-            SELECT id, title, completed, due_date, created_at
-            FROM todos
-            WHERE user_id = %s
-            ORDER BY completed ASC, due_date ASC, created_at DESC
-        """, (current_user.id,)) or []
+        # First page, sorted by: uncompleted first, then by due date (more via /api/todos)
+        page = todo_list.list_todos(current_user.id)
+        total = todo_list.count_todos(current_user.id)
     except Exception as e:
         logging.error(f"Error loading todos: {e}")
-        all_todos = []
+        page, total = {"items": [], "next_cursor": None}, 0
     
     today = date.today()
     
-    return render_template("todos.html", todos=all_todos, today=today)
+    return render_template("todos.html", todos=page["items"], next_cursor=page["next_cursor"],
+                           total=total, today=today)
 
 
+# Formular-Fallback ohne JavaScript (todos.html nutzt sonst /api/todos)
 @app.route("/todos/add", methods=["POST"])
 @login_required
 def add_todo():
-    title = request.form.get("title", "").strip()
-    due_date = request.form.get("due_date", None)
-    
-    if not title:
-        return redirect(url_for("todos"))
-    
-    # Convert empty string to None for SQL
-    if due_date == "":
-        due_date = None
-    
     try:
-        db_write(
-            "INSERT INTO todos (user_id, title, due_date) VALUES (%s, %s, %s)",
-            (current_user.id, title, due_date)
-        )
+        title, due_date = todo_list.parse_todo(request.form.get("title"), request.form.get("due_date"))
+        todo_list.add_todo(current_user.id, title, due_date)
+    except ValueError:
+        pass
     except Exception as e:
         logging.error(f"Error adding todo: {e}")
     
@@ -705,19 +965,7 @@ def add_todo():
 @login_required
 def toggle_todo(todo_id):
     try:
-        # Verify todo belongs to current user
-        todo = db_read(
-            "SELECT id, completed FROM todos WHERE id=%s AND user_id=%s",
-            (todo_id, current_user.id),
-            single=True
-        )
-        
-        if todo:
-            new_status = not todo["completed"]
-            db_write(
-                "UPDATE todos SET completed=%s WHERE id=%s",
-                (new_status, todo_id)
-            )
+        todo_list.toggle_todo(current_user.id, todo_id)
     except Exception as e:
         logging.error(f"Error toggling todo: {e}")
     
@@ -728,17 +976,57 @@ def toggle_todo(todo_id):
 @login_required
 def delete_todo(todo_id):
     try:
-        # Verify todo belongs to current user
-        db_write(
-            "DELETE FROM todos WHERE id=%s AND user_id=%s",
-            (todo_id, current_user.id)
-        )
+        todo_list.delete_todo(current_user.id, todo_id)
     except Exception as e:
         logging.error(f"Error deleting todo: {e}")
     
     return redirect(url_for("todos"))
 
 
+# -----------------------------
+# TO-DO API (JSON)
+# -----------------------------
+@app.route("/api/todos", methods=["GET"])
+@login_required
+def api_todos():
+    try:
+        return todo_list.list_todos(
+            current_user.id,
+            cursor=request.args.get("cursor") or None,
+            limit=request.args.get("limit", todo_list.TODO_PAGE_SIZE, type=int),
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+
+@app.route("/api/todos", methods=["POST"])
+@login_required
+def api_add_todo():
+    data = request.get_json(silent=True) or request.form
+    try:
+        title, due_date = todo_list.parse_todo(data.get("title"), data.get("due_date"))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return {"item": todo_list.add_todo(current_user.id, title, due_date)}, 201
+
+
+@app.route("/api/todos/<int:todo_id>/toggle", methods=["POST"])
+@login_required
+def api_toggle_todo(todo_id):
+    item = todo_list.toggle_todo(current_user.id, todo_id)
+    if item is None:
+        return {"error": "Aufgabe nicht gefunden"}, 404
+    return {"item": item}
+
+
+@app.route("/api/todos/<int:todo_id>", methods=["DELETE"])
+@login_required
+def api_delete_todo(todo_id):
+    if not todo_list.delete_todo(current_user.id, todo_id):
+        return {"error": "Aufgabe nicht gefunden"}, 404
+    return {"success": True, "id": todo_id}
+
+
 # -----------------------------
 # START APP
 # -----------------------------
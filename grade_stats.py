@@ -0,0 +1,288 @@
+"""Grade statistics across all students, computed as a batch job.
+
+`pruefungen` is streamed in chunks (server-side cursor, ordered by student
+and subject), every chunk is reduced with NumPy to Fachnoten and
+Pluspunkte per (student, subject), and the running per-subject totals end
+up in the summary tables `noten_statistik` and `noten_verteilung`. The
+teacher dashboard only reads those tables; run the job at night:
+
+    flask --app flask_app grade-stats rebuild
+"""
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import click
+import numpy as np
+from flask.cli import with_appcontext
+
+from db import db_read, db_write, db_many, db_stream, transaction
+from pluspunkte_engine import GRADES, GRADE_STEP, points
+
+logger = logging.getLogger(__name__)
+
+GRADE_STATS_CHUNK_SIZE = int(os.getenv("GRADE_STATS_CHUNK_SIZE", "5000"))
+# Subjects with fewer students are shown without numbers (no conclusions on single students)
+GRADE_STATS_MIN_STUDENTS = int(os.getenv("GRADE_STATS_MIN_STUDENTS", "3"))
+# fachname of the row for the whole school (Pluspunkte = total per student)
+ALLE = ""
+
+_STREAM_SQL = """
+    SELECT pruefungen.user_id, pruefungen.fachname, pruefungen.note, pruefungen.gewichtung,
+           fach_gewichtungen.gewichtung AS fach_gewichtung
+    FROM pruefungen
+    LEFT JOIN fach_gewichtungen
+        ON fach_gewichtungen.user_id = pruefungen.user_id
+        AND fach_gewichtungen.fachname = pruefungen.fachname
+    ORDER BY pruefungen.user_id, pruefungen.fachname
+"""
+
+
+def _column(rows, i, default):
+    """Column i as floats; NULL and 0 become `default` (like fachnote())."""
+    values = np.array([row[i] for row in rows], dtype=float)
+    return np.where(np.isnan(values) | (values == 0), default, values)
+
+
+class _Subject:
+    def __init__(self):
+        self.schueler = 0
+        self.pruefungen = 0
+        self.anzahl_noten = 0
+        self.note_sum = 0.0
+        self.note_sq = 0.0
+        self.min_note = 6.0
+        self.max_note = 1.0
+        self.ungenuegend = 0
+        self.pluspunkte_sum = 0.0
+        self.noten = np.zeros(len(GRADES), dtype=np.int64)
+        self.pluspunkte = Counter()
+
+    def add_noten(self, fachnoten, exams):
+        self.anzahl_noten += len(fachnoten)
+        self.pruefungen += int(exams.sum())
+        self.note_sum += float(fachnoten.sum())
+        self.note_sq += float((fachnoten * fachnoten).sum())
+        self.min_note = min(self.min_note, float(fachnoten.min()))
+        self.max_note = max(self.max_note, float(fachnoten.max()))
+        # Fachnote on the 0.25 grid of the calculator
+        bins = np.clip(np.rint((fachnoten - 1.0) / GRADE_STEP).astype(int), 0, len(GRADES) - 1)
+        self.noten += np.bincount(bins, minlength=len(GRADES))
+
+    def add_pluspunkte(self, pluspunkte):
+        self.schueler += len(pluspunkte)
+        self.pluspunkte_sum += float(pluspunkte.sum())
+        values, counts = np.unique(pluspunkte, return_counts=True)
+        self.pluspunkte.update(dict(zip(values.tolist(), counts.tolist())))
+
+    def row(self, fachname):
+        n = self.anzahl_noten
+        mean = self.note_sum / n
+        return {
+            "fachname": fachname,
+            "schueler": self.schueler,
+            "pruefungen": self.pruefungen,
+            "durchschnitt": round(mean, 2),
+            "streuung": round(max(self.note_sq / n - mean * mean, 0.0) ** 0.5, 2),
+            "min_note": round(self.min_note, 2),
+            "max_note": round(self.max_note, 2),
+            "ungenuegend": self.ungenuegend,
+            "pluspunkte_schnitt": round(self.pluspunkte_sum / self.schueler, 2),
+        }
+
+
+class Collector:
+    """Running totals over chunks of (user_id, fachname, note, gewichtung, fach_gewichtung)
+    rows ordered by user_id and fachname."""
+
+    def __init__(self):
+        self.faecher = defaultdict(_Subject)
+        self.alle = _Subject()
+        self.rows = 0
+        self._carry = []
+        self._open_user = None
+        self._open_total = 0.0
+
+    def feed(self, chunk):
+        self.rows += len(chunk)
+        rows = self._carry + list(chunk) if self._carry else list(chunk)
+        # The last (student, subject) may continue in the next chunk
+        key = rows[-1][:2]
+        cut = len(rows)
+        while cut and rows[cut - 1][:2] == key:
+            cut -= 1
+        self._carry = rows[cut:]
+        if cut:
+            self._reduce(rows[:cut])
+
+    def finish(self):
+        if self._carry:
+            self._reduce(self._carry)
+            self._carry = []
+        if self._open_user is not None:
+            self._add_totals(np.array([self._open_total]))
+            self._open_user = None
+
+    def _reduce(self, rows):
+        users = np.array([row[0] for row in rows], dtype=np.int64)
+        names = np.array([row[1] for row in rows], dtype=object)
+        noten = _column(rows, 2, 4.0)
+        weights = _column(rows, 3, 1.0)
+
+        # One group per (student, subject)
+        start = np.flatnonzero(np.r_[True, (users[1:] != users[:-1]) | (names[1:] != names[:-1])])
+        exams = np.diff(np.r_[start, len(rows)])
+        fachnoten = np.add.reduceat(noten * weights, start) / np.add.reduceat(weights, start)
+        pluspunkte = points(fachnoten, _column([rows[i] for i in start], 4, 1.0))
+        g_users, g_names = users[start], names[start]
+
+        for name in np.unique(g_names):
+            mask = g_names == name
+            subject = self.faecher[name]
+            subject.add_noten(fachnoten[mask], exams[mask])
+            subject.add_pluspunkte(pluspunkte[mask])
+            subject.ungenuegend += int((fachnoten[mask] < 4.0).sum())
+        self.alle.add_noten(fachnoten, exams)
+
+        # Pluspunkte total per student; the last one may continue in the next chunk
+        u_start = np.flatnonzero(np.r_[True, g_users[1:] != g_users[:-1]])
+        totals = np.add.reduceat(pluspunkte, u_start)
+        if self._open_user is not None and g_users[0] == self._open_user:
+            totals[0] += self._open_total
+        elif self._open_user is not None:
+            self._add_totals(np.array([self._open_total]))
+        self._open_user, self._open_total = int(g_users[u_start[-1]]), float(totals[-1])
+        if len(totals) > 1:
+            self._add_totals(totals[:-1])
+
+    def _add_totals(self, totals):
+        self.alle.add_pluspunkte(totals)
+        self.alle.ungenuegend += int((totals < 0).sum())
+
+    def summary(self):
+        """(noten_statistik rows, noten_verteilung rows)"""
+        stats, verteilung = [], []
+        subjects = sorted(self.faecher.items())
+        if self.alle.schueler:
+            subjects.append((ALLE, self.alle))
+        for name, subject in subjects:
+            stats.append(subject.row(name))
+            verteilung += [(name, "note", float(GRADES[i]), int(subject.noten[i]))
+                           for i in np.flatnonzero(subject.noten)]
+            verteilung += [(name, "pluspunkte", float(v), n) for v, n in sorted(subject.pluspunkte.items())]
+        return stats, verteilung
+
+
+# -----------------------------
+# Batch-Job
+# -----------------------------
+def rebuild(chunk_size=GRADE_STATS_CHUNK_SIZE):
+    """Recompute noten_statistik / noten_verteilung from all exams."""
+    started = time.perf_counter()
+    collector = Collector()
+    for chunk in db_stream(_STREAM_SQL, size=chunk_size):
+        collector.feed(chunk)
+    collector.finish()
+    stats, verteilung = collector.summary()
+
+    berechnet_am = datetime.now().replace(microsecond=0)
+    with transaction():
+        db_write("DELETE FROM noten_statistik")
+        db_write("DELETE FROM noten_verteilung")
+        db_many("""
+            INSERT INTO noten_statistik (fachname, schueler, pruefungen, durchschnitt, streuung,
+                                         min_note, max_note, ungenuegend, pluspunkte_schnitt, berechnet_am)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, [(s["fachname"], s["schueler"], s["pruefungen"], s["durchschnitt"], s["streuung"],
+               s["min_note"], s["max_note"], s["ungenuegend"], s["pluspunkte_schnitt"], berechnet_am)
+              for s in stats])
+        db_many("INSERT INTO noten_verteilung (fachname, art, wert, anzahl) VALUES (%s, %s, %s, %s)",
+                verteilung)
+
+    seconds = round(time.perf_counter() - started, 3)
+    logger.info("Grade statistics rebuilt: %d exams, %d subjects in %ss", collector.rows, len(stats), seconds)
+    return {"pruefungen": collector.rows, "faecher": len(stats), "seconds": seconds}
+
+
+# -----------------------------
+# Abfragen (lesen nur die Summentabellen)
+# -----------------------------
+def _in(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def subject_stats(fachnamen=None):
+    """Statistics per subject (+ ALLE), each with its distributions.
+
+    Subjects with fewer than GRADE_STATS_MIN_STUDENTS students only carry
+    the student count.
+    """
+    if fachnamen is None:
+        rows = db_read("SELECT * FROM noten_statistik ORDER BY fachname") or []
+    else:
+        names = sorted({*fachnamen, ALLE})
+        rows = db_read(f"SELECT * FROM noten_statistik WHERE fachname IN ({_in(names)}) ORDER BY fachname",
+                       names) or []
+    shown = [r["fachname"] for r in rows if r["schueler"] >= GRADE_STATS_MIN_STUDENTS]
+    verteilung = defaultdict(lambda: {"note": [], "pluspunkte": []})
+    if shown:
+        for r in db_read(f"""
+            SELECT fachname, art, wert, anzahl FROM noten_verteilung
+            WHERE fachname IN ({_in(shown)})
+            ORDER BY fachname, art, wert
+        """, shown) or []:
+            verteilung[r["fachname"]][r["art"]].append({"wert": float(r["wert"]), "anzahl": r["anzahl"]})
+
+    result = []
+    for r in rows:
+        item = {"fachname": r["fachname"], "schueler": r["schueler"], "berechnet_am": r["berechnet_am"]}
+        if r["schueler"] >= GRADE_STATS_MIN_STUDENTS:
+            item.update({
+                "pruefungen": r["pruefungen"],
+                "durchschnitt": float(r["durchschnitt"]),
+                "streuung": float(r["streuung"]),
+                "min_note": float(r["min_note"]),
+                "max_note": float(r["max_note"]),
+                "ungenuegend": r["ungenuegend"],
+                "pluspunkte_schnitt": float(r["pluspunkte_schnitt"]),
+                "verteilung": verteilung[r["fachname"]],
+            })
+        result.append(item)
+    return result
+
+
+def teacher_subjects(lehrer_id):
+    rows = db_read("SELECT DISTINCT fachname FROM faecher WHERE lehrer_id=%s", (lehrer_id,)) or []
+    return [r["fachname"] for r in rows]
+
+
+# -----------------------------
+# CLI: flask --app flask_app grade-stats rebuild|report
+# -----------------------------
+@click.group("grade-stats")
+def grade_stats_command():
+    """Grade statistics across all students."""
+
+
+@grade_stats_command.command("rebuild")
+@click.option("--chunk-size", default=GRADE_STATS_CHUNK_SIZE, show_default=True, help="Exams per chunk.")
+@with_appcontext
+def rebuild_command(chunk_size):
+    """Recompute the summary tables (run outside school hours)."""
+    result = rebuild(chunk_size)
+    click.echo(f"{result['pruefungen']} exams, {result['faecher']} subjects in {result['seconds']}s")
+
+
+@grade_stats_command.command("report")
+@with_appcontext
+def report_command():
+    """Print the stored statistics per subject."""
+    for s in subject_stats():
+        name = s["fachname"] or "Alle (Pluspunkte total)"
+        if "durchschnitt" not in s:
+            click.echo(f"  {name:<25} {s['schueler']:>5} Schüler (zu wenige für eine Auswertung)")
+            continue
+        click.echo(f"  {name:<25} {s['schueler']:>5} Schüler  Ø {s['durchschnitt']:.2f} ± {s['streuung']:.2f}  "
+                   f"{s['ungenuegend']:>4} ungenügend  Ø {s['pluspunkte_schnitt']:+.2f} Pluspunkte")
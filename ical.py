@@ -0,0 +1,178 @@
+import base64
+import hashlib
+import hmac
+import os
+from datetime import date, timedelta, timezone
+from flask import current_app
+from db import db_read
+from conflicts import to_minutes
+from refdata import lehrer_id_for
+
+WOCHENTAGE = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]
+BYDAY = ["MO", "TU", "WE", "TH", "FR"]
+
+# Secret for the feed tokens (default: app.secret_key). Changing it
+# invalidates every subscribed calendar URL.
+CALENDAR_SECRET = os.getenv("CALENDAR_SECRET")
+CALENDAR_TZ = os.getenv("CALENDAR_TZ", "Europe/Berlin")
+# Optional school-year bounds (YYYY-MM-DD): first week and last day of the series
+CALENDAR_TERM_START = os.getenv("CALENDAR_TERM_START")
+CALENDAR_TERM_END = os.getenv("CALENDAR_TERM_END")
+
+# Mitteleuropäische Zeit mit Sommerzeit (gilt für Europe/Berlin, Zurich, Vienna, ...)
+VTIMEZONE = [
+    "BEGIN:VTIMEZONE",
+    f"TZID:{CALENDAR_TZ}",
+    "BEGIN:DAYLIGHT",
+    "TZOFFSETFROM:+0100",
+    "TZOFFSETTO:+0200",
+    "TZNAME:CEST",
+    "DTSTART:19700329T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+    "END:DAYLIGHT",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:+0200",
+    "TZOFFSETTO:+0100",
+    "TZNAME:CET",
+    "DTSTART:19701025T030000",
+    "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+]
+
+
+# -----------------------------
+# Token (Abo-URL ohne Login)
+# -----------------------------
+def _signature(payload):
+    secret = (CALENDAR_SECRET or current_app.secret_key).encode()
+    digest = hmac.new(secret, f"ical:{payload}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:18]).decode()
+
+
+def calendar_token(user_id, role):
+    """Token for the user's feed URL: user, role and an HMAC over both."""
+    payload = f"{user_id}.{'t' if role == 'teacher' else 's'}"
+    return f"{payload}.{_signature(payload)}"
+
+
+def read_token(token):
+    """(user_id, role) for a valid token, None otherwise. No DB access."""
+    try:
+        user_id, kind, signature = token.split(".")
+        user_id = int(user_id)
+    except ValueError:
+        return None
+    if kind not in ("s", "t") or not hmac.compare_digest(signature, _signature(f"{user_id}.{kind}")):
+        return None
+    return user_id, "teacher" if kind == "t" else "student"
+
+
+# -----------------------------
+# iCalendar-Text (RFC 5545)
+# -----------------------------
+def _escape(text):
+    return (str(text or "").replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def _fold(line):
+    # Content lines are limited to 75 octets, continuation lines start with a space
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line
+    parts, chunk = [], b""
+    for char in line:
+        encoded = char.encode()
+        if len(chunk) + len(encoded) > (75 if not parts else 74):
+            parts.append(chunk.decode())
+            chunk = b""
+        chunk += encoded
+    parts.append(chunk.decode())
+    return "\r\n ".join(parts)
+
+
+def _first_monday(modified):
+    # Without a term start the series begins in the week of the last change,
+    # not "this week": the body must not depend on the day it is rendered
+    if CALENDAR_TERM_START:
+        start = date.fromisoformat(CALENDAR_TERM_START)
+    else:
+        start = modified.astimezone(timezone.utc).date()
+    return start - timedelta(days=start.weekday())
+
+
+def _local(day, minutes):
+    return f"{day:%Y%m%d}T{minutes // 60:02d}{minutes % 60:02d}00"
+
+
+def _lessons(user_id, role):
+    if role == "teacher":
+        lehrer_id = lehrer_id_for(user_id)
+        if lehrer_id is None:
+            return []
+        where, param = "faecher.lehrer_id = %s", lehrer_id
+    else:
+        where, param = "faecher.id IN (SELECT fach_id FROM stundenplan WHERE user_id = %s)", user_id
+
+    return db_read(f"""
+        SELECT
+            faecher.id,
+            faecher.fachname,
+            lehrer.name AS lehrer,
+            raum.raumnummer AS raum,
+            faecher.tag,
+            faecher.startzeit,
+            faecher.endzeit
+        FROM faecher
+        JOIN lehrer ON faecher.lehrer_id = lehrer.id
+        JOIN raum ON faecher.raum_id = raum.id
+        WHERE {where}
+        ORDER BY faecher.id
+    """, (param,)) or []
+
+
+def render_calendar(user_id, role, modified):
+    """The user's week as VCALENDAR with one weekly recurring event per lesson.
+
+    `modified` (schedule version timestamp) is used as DTSTAMP and, without
+    CALENDAR_TERM_START, anchors DTSTART, so the same version always
+    renders the same bytes (strong ETag).
+    """
+    monday = _first_monday(modified)
+    until = ""
+    if CALENDAR_TERM_END:
+        until = f";UNTIL={date.fromisoformat(CALENDAR_TERM_END):%Y%m%d}T235959Z"
+    stamp = modified.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    host = current_app.config.get("SERVER_NAME") or "stundenplaner"
+
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Stundenplaner//Stundenplan//DE",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        "X-WR-CALNAME:Stundenplan",
+        f"X-WR-TIMEZONE:{CALENDAR_TZ}",
+        "REFRESH-INTERVAL;VALUE=DURATION:PT1H",
+        *VTIMEZONE,
+    ]
+    for row in _lessons(user_id, role):
+        if row["tag"] not in WOCHENTAGE or row["startzeit"] is None or row["endzeit"] is None:
+            continue
+        day_index = WOCHENTAGE.index(row["tag"])
+        day = monday + timedelta(days=day_index)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:fach-{row['id']}-{user_id}@{host}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;TZID={CALENDAR_TZ}:{_local(day, to_minutes(row['startzeit']))}",
+            f"DTEND;TZID={CALENDAR_TZ}:{_local(day, to_minutes(row['endzeit']))}",
+            f"RRULE:FREQ=WEEKLY;BYDAY={BYDAY[day_index]}{until}",
+            f"SUMMARY:{_escape(row['fachname'])}",
+            f"LOCATION:{_escape('Raum ' + str(row['raum']))}",
+            f"DESCRIPTION:{_escape('Lehrer: ' + str(row['lehrer']))}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
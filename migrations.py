@@ -0,0 +1,201 @@
+import ast
+import glob
+import logging
+import os
+import re
+import sys
+
+import click
+from flask.cli import with_appcontext
+
+import db
+from db import db_read, db_write, commit
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(BASE_DIR, "db", "migrations")
+
+
+# -----------------------------
+# Migrationen (db/migrations/NNN_name.sql, in Reihenfolge)
+# -----------------------------
+def available_migrations():
+    """[(version, path)] sorted by version, e.g. ("002", ".../002_x.sql").
+
+    A file of the same name in db/migrations/<backend>/ replaces the MySQL
+    one on that backend (e.g. sqlite/002: no multi-table DELETE there).
+    """
+    found = []
+    for path in glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql")):
+        name = os.path.basename(path)
+        version = name.split("_", 1)[0]
+        if version.isdigit():
+            variant = os.path.join(MIGRATIONS_DIR, db.backend.name, name)
+            found.append((version, variant if os.path.exists(variant) else path))
+    return sorted(found)
+
+
+def split_statements(sql):
+    # Drop "-- ..." comment lines, then split on ";" at the end of a line
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [s.strip() for s in re.split(r";\s*$", "\n".join(lines), flags=re.M) if s.strip()]
+
+
+def applied_migrations():
+    db_write("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(20) PRIMARY KEY,
+            name VARCHAR(250) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Statements already run of a migration that failed part-way
+    db_write("""
+        CREATE TABLE IF NOT EXISTS schema_migration_progress (
+            version VARCHAR(20) PRIMARY KEY,
+            statements INT NOT NULL
+        )
+    """)
+    return {r["version"] for r in db_read("SELECT version FROM schema_migrations") or []}
+
+
+def _statements_done(version):
+    row = db_read("SELECT statements FROM schema_migration_progress WHERE version=%s", (version,), single=True)
+    return row["statements"] if row else 0
+
+
+def migrate():
+    """Apply all pending migrations; returns the applied file names.
+
+    DDL commits implicitly in MySQL, so a failing migration can't be rolled
+    back as a whole. Progress is therefore committed after every statement;
+    the next run resumes after the last statement that went through (fix
+    the failing statement, not the ones before it).
+    """
+    done = applied_migrations()
+    applied = []
+    for version, path in available_migrations():
+        if version in done:
+            continue
+        name = os.path.basename(path)
+        with open(path, encoding="utf-8") as f:
+            statements = split_statements(f.read())
+        skip = _statements_done(version)
+        if skip:
+            logger.info("Resuming migration %s after statement %d of %d", name, skip, len(statements))
+        else:
+            logger.info("Applying migration %s (%d statements)", name, len(statements))
+        for n, statement in enumerate(statements[skip:], skip + 1):
+            db_write(statement)
+            db_write("""
+                INSERT INTO schema_migration_progress (version, statements) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE statements = VALUES(statements)
+            """, (version, n))
+            commit()
+        db_write("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+        db_write("DELETE FROM schema_migration_progress WHERE version=%s", (version,))
+        commit()
+        applied.append(name)
+    return applied
+
+
+# -----------------------------
+# EXPLAIN-Check: keine Full Table Scans ohne passenden Index
+# -----------------------------
+# Modules whose db_read/db_write queries are checked
+QUERY_MODULES = ["flask_app.py", "auth.py", "pluspunkte_calc.py", "schedule_cache.py", "refdata.py", "analytics.py", "todo_list.py", "grade_stats.py"]
+
+# (function, table) pairs that list a whole table on purpose
+ALLOWED_FULL_SCANS = {
+    ("rebuild", "faecher"),       # analytics: recompute the summary tables
+    ("rebuild", "stundenplan"),
+    ("is_built", "faecher"),
+    ("subject_stats", "noten_statistik"),  # admin: all subjects
+}
+
+
+def collect_queries(path):
+    """[(function, line, sql, n_params)] of literal db_read/db_write/read_parallel queries."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+
+    queries = []
+
+    def visit(node, function):
+        for child in ast.iter_child_nodes(node):
+            # Nested helpers (e.g. render()) are reported as their route
+            name = function
+            if name is None and isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                name = child.name
+            if (isinstance(child, ast.Call) and isinstance(child.func, ast.Name)
+                    and child.func.id in ("db_read", "db_write") and child.args
+                    and isinstance(child.args[0], ast.Constant) and isinstance(child.args[0].value, str)):
+                sql = child.args[0].value.strip()
+                queries.append((name, child.lineno, sql, sql.count("%s")))
+            # (sql, params[, single]) tuples, e.g. for read_parallel
+            if (isinstance(child, ast.Tuple) and len(child.elts) in (2, 3)
+                    and isinstance(child.elts[0], ast.Constant) and isinstance(child.elts[0].value, str)
+                    and child.elts[0].value.lstrip().upper().startswith("SELECT")):
+                sql = child.elts[0].value.strip()
+                queries.append((name, child.lineno, sql, sql.count("%s")))
+            visit(child, name)
+
+    visit(tree, None)
+    return queries
+
+
+def check_indexes(modules=None):
+    """EXPLAIN every SELECT/UPDATE/DELETE; return the full scans found.
+
+    Every type=ALL counts, also when MySQL lists possible_keys but doesn't
+    use them (reported as `unused_keys`): run it against a database with
+    realistic row counts, on near-empty tables the optimizer prefers ALL.
+    """
+    problems = []
+    for module in modules or QUERY_MODULES:
+        for function, line, sql, n_params in collect_queries(os.path.join(BASE_DIR, module)):
+            if sql.split(None, 1)[0].upper() not in ("SELECT", "UPDATE", "DELETE"):
+                continue
+            # '1' works for both INT and VARCHAR columns without disabling indexes
+            plan = db_read("EXPLAIN " + sql, ("1",) * n_params) or []
+            for row in plan:
+                table = row.get("table") or ""
+                if (row.get("type") == "ALL" and not table.startswith("<")
+                        and (function, table) not in ALLOWED_FULL_SCANS):
+                    problems.append({"module": module, "line": line, "function": function, "table": table,
+                                     "unused_keys": row.get("possible_keys")})
+    return problems
+
+
+# -----------------------------
+# CLI: flask --app flask_app migrate / check-indexes
+# -----------------------------
+@click.command("migrate")
+@click.option("--status", is_flag=True, help="Only list applied and pending migrations.")
+@with_appcontext
+def migrate_command(status):
+    """Apply pending SQL migrations from db/migrations."""
+    if status:
+        done = applied_migrations()
+        for version, path in available_migrations():
+            click.echo(f"{'applied' if version in done else 'pending'}  {os.path.basename(path)}")
+        return
+    applied = migrate()
+    click.echo("\n".join(applied) if applied else "Nothing to migrate.")
+
+
+@click.command("check-indexes")
+@with_appcontext
+def check_indexes_command():
+    """Fail if a query of the app needs a full table scan."""
+    if db.backend.name != "mysql":
+        click.echo("check-indexes needs the MySQL backend (EXPLAIN output differs).")
+        sys.exit(2)
+    problems = check_indexes()
+    for p in problems:
+        unused = f" (not using {p['unused_keys']})" if p["unused_keys"] else ""
+        click.echo(f"{p['module']}:{p['line']} {p['function']}: full table scan on {p['table']}{unused}")
+    if problems:
+        sys.exit(1)
+    click.echo("All queries use an index.")
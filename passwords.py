@@ -0,0 +1,101 @@
+"""Password hashing policy.
+
+The method (algorithm and cost) comes from PASSWORD_HASH_METHOD in
+werkzeug notation, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+Hashes with other parameters still verify and are replaced on the next
+successful login (see auth.authenticate).
+
+Hashing runs on a small, fixed thread pool: scrypt / pbkdf2 release the
+GIL, so a login spike uses at most PASSWORD_HASH_WORKERS cores for
+hashing and the remaining request threads keep serving pages. A request
+that can't get a hashing slot within PASSWORD_HASH_TIMEOUT seconds gets
+a 503 (HashTimeout is a PoolTimeout).
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from pool import PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+
+class HashTimeout(PoolTimeout):
+    """No hashing worker became free in time."""
+
+
+_lock = threading.Lock()
+_executor = None
+_method = PASSWORD_HASH_METHOD
+_prefix = None
+
+
+def configure(method=None, workers=None):
+    """Change method and / or pool size at runtime (benchmarks, tests)."""
+    global _executor, _method, _prefix, PASSWORD_HASH_WORKERS
+    with _lock:
+        if method is not None:
+            _method, _prefix = method, None
+        if workers is not None:
+            PASSWORD_HASH_WORKERS = workers
+            old, _executor = _executor, None
+            if old is not None:
+                old.shutdown(wait=False)
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max(1, PASSWORD_HASH_WORKERS), thread_name_prefix="password-hash")
+    return _executor
+
+
+def _run(fn, *args):
+    future = _pool().submit(fn, *args)
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FutureTimeout:
+        future.cancel()
+        logger.warning("Password hashing busy for %.1fs", PASSWORD_HASH_TIMEOUT)
+        raise HashTimeout("password hashing is busy")
+
+
+def method_prefix():
+    """The configured method with all parameters, e.g. "scrypt:32768:8:1"."""
+    global _prefix
+    if _prefix is None:
+        # werkzeug fills in the defaults ("scrypt" -> "scrypt:32768:8:1")
+        _prefix = generate_password_hash("", _method).split("$", 1)[0]
+    return _prefix
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, _method)
+
+
+def hash_passwords(passwords):
+    """Hash many passwords at once (bulk import), using all workers."""
+    futures = [_pool().submit(generate_password_hash, p, _method) for p in passwords]
+    return [f.result() for f in futures]
+
+
+def needs_rehash(stored):
+    return stored.split("$", 1)[0] != method_prefix()
+
+
+def verify_password(stored, password):
+    """(password matches, stored hash should be replaced)."""
+    if not stored:
+        return False, False
+    if not _run(check_password_hash, stored, password):
+        return False, False
+    return True, needs_rehash(stored)
@@ -0,0 +1,156 @@
+import math
+from db import db_write, db_many, transaction
+from db_async import read_parallel
+
+
+# -----------------------------
+# BERECHNUNG (wie calculateSubject / calculateTotal in pluspunkte.html)
+# -----------------------------
+def fachnote(pruefungen):
+    """Weighted average of all exams, 4.0 if there are none."""
+    total_weighted = 0.0
+    total_weights = 0.0
+    for p in pruefungen:
+        note = float(p["note"] or 0) or 4.0
+        gewichtung = float(p["gewichtung"] or 0) or 1.0
+        total_weighted += note * gewichtung
+        total_weights += gewichtung
+    return total_weighted / total_weights if total_weights > 0 else 4.0
+
+
+def round_points(points):
+    # Round to nearest 0.5 (ab 0.25 aufrunden, symmetrisch für negative Werte);
+    # float noise first, so 4.374999999999999 counts as 4.375
+    points = round(points, 9)
+    if points >= 0:
+        return math.floor(points * 2 + 0.5) / 2
+    return math.ceil(points * 2 - 0.5) / 2 + 0.0  # no -0.0
+
+
+def subject_points(note, fach_gewichtung=1.0):
+    if note > 4.0:
+        base = note - 4.0
+    elif note < 4.0:
+        base = -((4.0 - note) * 2)
+    else:
+        base = 0.0
+    return round_points(base * (float(fach_gewichtung or 0) or 1.0))
+
+
+def compute_pluspunkte(saved_data):
+    """Add fachnote/pluspunkte to every subject and return the total.
+
+    Like the page, only subjects with saved exams count towards the total
+    (those are the ones that are pre-selected).
+    """
+    total = 0.0
+    for data in saved_data.values():
+        note = fachnote(data["pruefungen"])
+        data["fachnote"] = round(note, 2)
+        data["pluspunkte"] = subject_points(note, data["fach_gewichtung"])
+        if data["pruefungen"]:
+            total += data["pluspunkte"]
+    return total
+
+
+# -----------------------------
+# LADEN (2 Queries statt 1 + 2 pro Fach)
+# -----------------------------
+def load_pluspunkte(user_id):
+    """Return (subjects, saved_data) for the /pluspunkte page."""
+    # Both queries only depend on user_id -> run them at the same time
+    rows, pruefungen = read_parallel(("""
+        SELECT DISTINCT faecher.fachname, fach_gewichtungen.gewichtung
+        FROM stundenplan
+        JOIN faecher ON stundenplan.fach_id = faecher.id
+        LEFT JOIN fach_gewichtungen
+            ON fach_gewichtungen.user_id = stundenplan.user_id
+            AND fach_gewichtungen.fachname = faecher.fachname
+        WHERE stundenplan.user_id = %s
+        ORDER BY faecher.fachname
+    """, (user_id,)), (
+        "SELECT fachname, note, gewichtung FROM pruefungen WHERE user_id=%s ORDER BY id",
+        (user_id,)
+    ))
+
+    rows = rows or []
+    subjects = [{"fachname": r["fachname"]} for r in rows]
+    saved_data = {
+        r["fachname"]: {
+            "fach_gewichtung": float(r["gewichtung"]) if r["gewichtung"] is not None else 1.0,
+            "pruefungen": []
+        }
+        for r in rows
+    }
+    for p in pruefungen or []:
+        data = saved_data.get(p["fachname"])
+        if data is not None:
+            data["pruefungen"].append({"note": float(p["note"]), "gewichtung": float(p["gewichtung"])})
+
+    return subjects, saved_data
+
+
+# -----------------------------
+# SPEICHERN (alle Fächer in einer Transaktion)
+# -----------------------------
+def _number(value, low, high):
+    value = float(value)
+    if not low <= value <= high:
+        raise ValueError(f"{value} liegt nicht zwischen {low} und {high}")
+    return value
+
+
+def _validate_subject(subject):
+    fachname = (subject.get("fachname") or "").strip()
+    if not fachname or len(fachname) > 100:
+        raise ValueError("Ungültiger Fachname")
+    gewichtung = _number(subject.get("fach_gewichtung", 1.0), 0.1, 99.9)
+    pruefungen = [
+        (_number(p["note"], 1.0, 6.0), _number(p.get("gewichtung", 1.0), 0.1, 99.9))
+        for p in subject.get("pruefungen", [])
+    ]
+    return fachname, gewichtung, pruefungen
+
+
+def save_subjects(user_id, subjects):
+    """Save weights and exams of several subjects at once.
+
+    Invalid subjects are skipped and reported; the valid ones are written
+    in one transaction: weights are upserted via unique_user_fach, the
+    exams of those subjects are replaced by one multi-row INSERT.
+    Returns one result dict per input subject.
+    """
+    results = []
+    valid = {}
+    for subject in subjects:
+        try:
+            fachname, gewichtung, pruefungen = _validate_subject(subject)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            fachname = subject.get("fachname") if isinstance(subject, dict) else None
+            results.append({"fachname": fachname, "success": False, "error": str(e)})
+            continue
+        valid[fachname] = (gewichtung, pruefungen)
+        results.append({"fachname": fachname, "success": True, "pruefungen": len(pruefungen)})
+
+    if not valid:
+        return results
+
+    # Sorted, so concurrent saves lock the weight rows in the same order
+    names = sorted(valid)
+    with transaction():
+        # Locks the (user, fach) rows first - concurrent autosaves queue up here
+        db_many(
+            "INSERT INTO fach_gewichtungen (user_id, fachname, gewichtung) VALUES (%s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE gewichtung = VALUES(gewichtung)",
+            [(user_id, name, valid[name][0]) for name in names]
+        )
+        db_write(
+            "DELETE FROM pruefungen WHERE user_id=%s AND fachname IN ({})".format(", ".join(["%s"] * len(names))),
+            (user_id, *names)
+        )
+        db_many(
+            "INSERT INTO pruefungen (user_id, fachname, note, gewichtung) VALUES (%s, %s, %s, %s)",
+            [(user_id, name, note, gewichtung) for name in names for note, gewichtung in valid[name][1]]
+        )
+
+    return results
@@ -0,0 +1,258 @@
+"""Pluspunkte projections: what grades are needed and what is likely.
+
+Works on the `saved_data` dict of `load_pluspunkte` and evaluates all
+subjects, target grades, exam weights and numbers of remaining exams at
+once with NumPy (arrays of shape subjects x targets x weights x exams).
+
+For the outlook each remaining exam grade is modelled as a discretised
+normal distribution around the current Fachnote. The distribution of the
+total Pluspunkte is the convolution of the per-subject distributions
+(done with FFTs, Pluspunkte are multiples of 0.5 so they map onto an
+integer grid).
+"""
+import time
+
+import numpy as np
+
+GRADE_STEP = 0.25
+GRADES = np.round(np.arange(1.0, 6.0 + GRADE_STEP / 2, GRADE_STEP), 2)
+TABLE_GRADES = np.round(np.arange(1.0, 6.0 + 0.25, 0.5), 1)
+DEFAULT_TARGETS = (4.0, 4.5, 5.0, 5.5, 6.0)
+MAX_EXAMS = 5
+FOCUS_SHIFT = 0.5
+
+
+# -----------------------------
+# Berechnung als Arrays (wie subject_points / round_points)
+# -----------------------------
+def points(notes, fach_gewichtung):
+    """Vectorised subject_points: Fachnoten -> Pluspunkte in 0.5 steps."""
+    notes = np.asarray(notes, dtype=float)
+    base = np.where(notes > 4.0, notes - 4.0, np.where(notes < 4.0, -(4.0 - notes) * 2, 0.0))
+    x = np.round(base * fach_gewichtung, 9)  # float noise, like round_points
+    return np.where(x >= 0, np.floor(x * 2 + 0.5) / 2, np.ceil(x * 2 - 0.5) / 2) + 0.0
+
+
+class Subjects:
+    """The student's subjects as parallel arrays."""
+
+    def __init__(self, saved_data, include_ungraded=False):
+        names = [name for name, data in saved_data.items() if include_ungraded or data["pruefungen"]]
+        self.names = names
+        self.fach_gewichtung = np.array(
+            [float(saved_data[n]["fach_gewichtung"] or 0) or 1.0 for n in names], dtype=float)
+        sums, weights = [], []
+        for n in names:
+            exams = saved_data[n]["pruefungen"]
+            w = np.array([float(p["gewichtung"] or 0) or 1.0 for p in exams], dtype=float)
+            g = np.array([float(p["note"] or 0) or 4.0 for p in exams], dtype=float)
+            sums.append(float((g * w).sum()))
+            weights.append(float(w.sum()))
+        self.weighted_sum = np.array(sums, dtype=float)
+        self.total_weight = np.array(weights, dtype=float)
+        self.fachnote = np.where(self.total_weight > 0,
+                                 self.weighted_sum / np.where(self.total_weight > 0, self.total_weight, 1),
+                                 4.0)
+        self.pluspunkte = points(self.fachnote, self.fach_gewichtung)
+
+    def __len__(self):
+        return len(self.names)
+
+    def after(self, mean_grade, exams, weight):
+        """Fachnote after `exams` more exams of `weight` averaging `mean_grade`.
+
+        `mean_grade` broadcasts against the subject axis (shape (S, ...)).
+        """
+        extra = exams * weight
+        s = (slice(None),) + (None,) * (np.ndim(mean_grade) - 1)
+        return (self.weighted_sum[s] + extra * mean_grade) / (self.total_weight[s] + extra)
+
+
+# -----------------------------
+# Benötigte Noten (alle Kombinationen auf einmal)
+# -----------------------------
+def needed_grades(subjects, targets=DEFAULT_TARGETS, weights=(1.0,), exams=(1,)):
+    """Average grade needed in the remaining exams, shape (S, T, W, K).
+
+    Values < 1 mean the target is reached anyway, > 6 that it can't be
+    reached any more.
+    """
+    t = np.asarray(targets, dtype=float)[None, :, None, None]
+    w = np.asarray(weights, dtype=float)[None, None, :, None]
+    k = np.asarray(exams, dtype=float)[None, None, None, :]
+    wsum = subjects.weighted_sum[:, None, None, None]
+    wtot = subjects.total_weight[:, None, None, None]
+    return (t * (wtot + k * w) - wsum) / (k * w)
+
+
+def _needed_rows(needed, targets, weights, exams):
+    rows = []
+    for ti, target in enumerate(targets):
+        for wi, weight in enumerate(weights):
+            for ki, k in enumerate(exams):
+                value = float(needed[ti, wi, ki])
+                if value <= 1.0:
+                    status, note = "erreicht", 1.0
+                elif value > 6.0:
+                    status, note = "unerreichbar", None
+                else:
+                    status, note = "ok", round(value, 2)
+                rows.append({"ziel": float(target), "gewichtung": float(weight), "pruefungen": int(k),
+                             "note": note, "status": status})
+    return rows
+
+
+# -----------------------------
+# Verteilungen
+# -----------------------------
+def grade_pmf(means, spread):
+    """Discretised normal over GRADES per subject, shape (S, G)."""
+    means = np.clip(np.asarray(means, dtype=float), 1.0, 6.0)
+    z = (GRADES[None, :] - means[:, None]) / max(spread, 1e-6)
+    pmf = np.exp(-0.5 * z * z)
+    return pmf / pmf.sum(axis=1, keepdims=True)
+
+
+def _power_pmf(pmf, k):
+    """Distribution of the sum of k independent draws (grid index sums), per row."""
+    n = k * (pmf.shape[1] - 1) + 1
+    out = np.fft.irfft(np.fft.rfft(pmf, n, axis=1) ** k, n, axis=1)
+    out = np.clip(out, 0, None)
+    return out / out.sum(axis=1, keepdims=True)
+
+
+def _point_pmfs(pts, probs):
+    """Per-subject Pluspunkte distribution on the 0.5 grid: (lowest index, pmf (S, R))."""
+    idx = np.rint(pts * 2).astype(int)
+    low = idx.min(axis=1)
+    width = int((idx.max(axis=1) - low).max()) + 1
+    pm = np.zeros((idx.shape[0], width))
+    rows = np.repeat(np.arange(idx.shape[0]), idx.shape[1])
+    np.add.at(pm, (rows, (idx - low[:, None]).ravel()), probs.ravel())
+    return low, pm
+
+
+def _sum_pmf(low, pm):
+    """Distribution of the total over the given subjects: (lowest index, pmf)."""
+    if len(pm) == 0:
+        return 0, np.array([1.0])
+    n = len(pm) * (pm.shape[1] - 1) + 1
+    total = np.fft.irfft(np.prod(np.fft.rfft(pm, n, axis=1), axis=0), n)
+    total = np.clip(total, 0, None)
+    return int(low.sum()), total / total.sum()
+
+
+def _at_least(low, pmf, threshold):
+    """P(total >= threshold) for threshold(s) in Pluspunkte."""
+    survival = np.concatenate([np.cumsum(pmf[::-1])[::-1], [0.0]])
+    i = np.clip(np.ceil(np.asarray(threshold) * 2 - 1e-9).astype(int) - low, 0, len(pmf))
+    return survival[i]
+
+
+def _quantile(low, pmf, q):
+    return (low + int(np.searchsorted(np.cumsum(pmf), q - 1e-12))) / 2
+
+
+# -----------------------------
+# Projektion
+# -----------------------------
+def project(saved_data, goal=0.0, next_weight=1.0, exams=1, spread=0.5,
+            targets=DEFAULT_TARGETS, weights=None, exam_counts=None, include_ungraded=False, focus=3):
+    """Needed grades, outlook, sensitivity tables and focus subjects.
+
+    - goal: total Pluspunkte to reach (probabilities refer to it)
+    - next_weight / exams: weight and number of the remaining exams per subject
+    - spread: standard deviation of an exam grade around the current Fachnote
+    - weights / exam_counts: extra weights and exam numbers for the needed-grade table
+    """
+    started = time.perf_counter()
+    exams = int(min(max(exams, 1), MAX_EXAMS))
+    subjects = Subjects(saved_data, include_ungraded)
+    weights = sorted({float(next_weight), *(weights or ())})
+    exam_counts = sorted({exams, *(int(min(max(k, 1), MAX_EXAMS)) for k in (exam_counts or ()))})
+    total_now = float(subjects.pluspunkte.sum())
+
+    result = {
+        "pluspunkte": total_now,
+        "ziel": float(goal),
+        "parameter": {"gewichtung": float(next_weight), "pruefungen": exams, "streuung": float(spread)},
+        "faecher": [],
+        "prognose": None,
+        "sensitivitaet": {"noten": TABLE_GRADES.tolist(), "faecher": {}},
+        "fokus": [],
+    }
+    if not len(subjects):
+        result["prognose"] = {"erwartet": 0.0, "p_ziel": float(goal <= 0), "perzentile": {}, "verteilung": []}
+        result["kombinationen"] = 0
+        result["ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    needed = needed_grades(subjects, targets, weights, exam_counts)
+
+    # Remaining exams: distribution of their average grade -> Pluspunkte per subject
+    mean_grades = 1.0 + np.arange(exams * (len(GRADES) - 1) + 1) * GRADE_STEP / exams
+    after = points(subjects.after(np.broadcast_to(mean_grades, (len(subjects), len(mean_grades))),
+                                  exams, next_weight), subjects.fach_gewichtung[:, None])
+    probs = _power_pmf(grade_pmf(subjects.fachnote, spread), exams)
+    low, pm = _point_pmfs(after, probs)
+    total_low, total_pmf = _sum_pmf(low, pm)
+    expected = (after * probs).sum(axis=1)
+
+    # Shifted by FOCUS_SHIFT: what better preparation in one subject would bring
+    probs_up = _power_pmf(grade_pmf(subjects.fachnote + FOCUS_SHIFT, spread), exams)
+    low_up, pm_up = _point_pmfs(after, probs_up)
+    expected_up = (after * probs_up).sum(axis=1)
+
+    table_points = points(subjects.after(np.broadcast_to(TABLE_GRADES, (len(subjects), len(TABLE_GRADES))),
+                                         exams, next_weight), subjects.fach_gewichtung[:, None])
+    p_goal = float(_at_least(total_low, total_pmf, goal))
+    everyone = np.arange(len(subjects))
+
+    focus_rows = []
+    for s, name in enumerate(subjects.names):
+        others = everyone != s
+        others_low, others_pmf = _sum_pmf(low[others], pm[others])
+        # P(goal) if the remaining exams of this subject average each table grade
+        p_table = _at_least(others_low, others_pmf, goal - table_points[s])
+        up_low, up_pmf = _sum_pmf(np.array([others_low, low_up[s]]),
+                                  _stack(others_pmf, pm_up[s]))
+        focus_rows.append({
+            "fachname": name,
+            "p_ziel_gewinn": round(float(_at_least(up_low, up_pmf, goal)) - p_goal, 4) + 0.0,
+            "pluspunkte_gewinn": round(float(expected_up[s] - expected[s]), 3) + 0.0,
+        })
+        result["sensitivitaet"]["faecher"][name] = {
+            "pluspunkte": (total_now - subjects.pluspunkte[s] + table_points[s]).tolist(),
+            "p_ziel": np.round(p_table, 4).tolist(),
+        }
+        result["faecher"].append({
+            "fachname": name,
+            "fachnote": round(float(subjects.fachnote[s]), 2),
+            "pluspunkte": float(subjects.pluspunkte[s]),
+            "erwartet": round(float(expected[s]), 3),
+            "benoetigt": _needed_rows(needed[s], targets, weights, exam_counts),
+        })
+
+    focus_rows.sort(key=lambda r: (-r["p_ziel_gewinn"], -r["pluspunkte_gewinn"], r["fachname"]))
+    result["fokus"] = focus_rows[:focus]
+
+    values = (total_low + np.arange(len(total_pmf))) / 2
+    keep = total_pmf > 1e-4
+    result["prognose"] = {
+        "erwartet": round(float((values * total_pmf).sum()), 3),
+        "p_ziel": round(p_goal, 4),
+        "perzentile": {str(q): _quantile(total_low, total_pmf, q / 100) for q in (10, 50, 90)},
+        "verteilung": [{"pluspunkte": float(v), "p": round(float(p), 4)} for v, p in zip(values[keep], total_pmf[keep])],
+    }
+    # Evaluated combinations: needed-grade grid + outcomes per subject and exam
+    result["kombinationen"] = int(needed.size + after.size * 2 + table_points.size * len(subjects))
+    result["ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def _stack(a, b):
+    """Two pmfs of different length as rows of one zero-padded array."""
+    out = np.zeros((2, max(len(a), len(b))))
+    out[0, :len(a)] = a
+    out[1, :len(b)] = b
+    return out
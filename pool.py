@@ -0,0 +1,208 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the wait-time histogram buckets
+WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+class PooledConnection:
+    """Connection proxy; close() hands the connection back to the pool."""
+
+    def __init__(self, pool, conn, overflow):
+        self._pool = pool
+        self._conn = conn
+        self._overflow = overflow
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool._release(conn, self._overflow)
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise RuntimeError("connection already returned to the pool")
+        return getattr(self._conn, name)
+
+
+class ConnectionPool:
+    """Thread-safe pool that waits for a free connection instead of failing.
+
+    - keeps at least `min_size` and at most `max_size` connections open
+    - up to `overflow` extra connections are opened when all are busy and
+      closed again on release (for short peaks, e.g. a class logging in)
+    - otherwise get_connection() blocks up to `timeout` seconds, then
+      raises PoolTimeout
+    - connections idle for more than `recycle` seconds are health-checked
+      (`is_alive(conn)`) and reopened when the server dropped them
+    """
+
+    def __init__(self, connect, min_size=1, max_size=2, overflow=0, timeout=10.0, recycle=30.0, is_alive=None):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError("need 1 <= max_size and min_size <= max_size")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.overflow = overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self._is_alive = is_alive or _default_is_alive
+
+        self._cond = threading.Condition()
+        self._idle = deque()       # (conn, last_used)
+        self._size = 0             # open pool connections (idle + in use)
+        self._overflow_in_use = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._stats = {"checkouts": 0, "timeouts": 0, "reconnects": 0, "overflow_opened": 0}
+        self._wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self._wait_sum = 0.0
+
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    # -----------------------------
+    # Checkout / Release
+    # -----------------------------
+    def get_connection(self, block=True):
+        """Check out a connection; with block=False return None instead of waiting."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        conn, last_used, overflow = None, None, False
+
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    if self._overflow_in_use < self.overflow:
+                        self._overflow_in_use += 1
+                        self._stats["overflow_opened"] += 1
+                        overflow = True
+                        break
+                    if not block:
+                        return None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"no free DB connection after {self.timeout:g}s "
+                            f"({self._in_use} in use, {self._waiting - 1} more waiting)"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+        # Connect / health-check outside the lock, it may hit the network
+        try:
+            if conn is None:
+                conn = self._connect()
+            elif time.monotonic() - last_used > self.recycle and not self._is_alive(conn):
+                logger.info("Reconnecting stale DB connection")
+                _close_quietly(conn)
+                conn = self._connect()
+                with self._cond:
+                    self._stats["reconnects"] += 1
+        except Exception:
+            self._discard(overflow)
+            raise
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._in_use += 1
+            self._stats["checkouts"] += 1
+            self._wait_sum += waited
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self._wait_buckets[i] += 1
+                    break
+            else:
+                self._wait_buckets[-1] += 1
+        return PooledConnection(self, conn, overflow)
+
+    def _discard(self, overflow):
+        # A slot was reserved but no usable connection came out of it
+        with self._cond:
+            if overflow:
+                self._overflow_in_use -= 1
+            else:
+                self._size -= 1
+            self._cond.notify()
+
+    def _release(self, conn, overflow):
+        broken = False
+        try:
+            # Never hand an open transaction to the next request
+            if getattr(conn, "in_transaction", True):
+                conn.rollback()
+        except Exception:
+            broken = True
+
+        if overflow or broken:
+            _close_quietly(conn)
+        with self._cond:
+            self._in_use -= 1
+            if overflow:
+                self._overflow_in_use -= 1
+            elif broken:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close(self):
+        """Close all idle connections (in-use ones close on release)."""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for conn, _ in idle:
+            _close_quietly(conn)
+
+    # -----------------------------
+    # Statistik
+    # -----------------------------
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "overflow": self.overflow,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "overflow_in_use": self._overflow_in_use,
+                "waiting": self._waiting,
+                **self._stats,
+                "wait_seconds_sum": round(self._wait_sum, 6),
+                "wait_buckets": dict(zip(WAIT_BUCKETS + ("+Inf",), self._wait_buckets)),
+            }
+
+
+def _default_is_alive(conn):
+    is_connected = getattr(conn, "is_connected", None)
+    if is_connected is None:
+        return True
+    try:
+        return is_connected()
+    except Exception:
+        return False
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
@@ -0,0 +1,247 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from flask import Response, g, has_app_context, has_request_context, request
+from flask_login import current_user
+
+import db
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged with their route (ms, 0 = off)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Requests whose DB time exceeds this get their slowest statements logged
+SLOW_REQUEST_DB_MS = float(os.getenv("SLOW_REQUEST_DB_MS", "500"))
+# How many statements per request are kept for the slow-request log
+PROFILE_SLOWEST = int(os.getenv("PROFILE_SLOWEST", "3"))
+# /metrics: "Authorization: Bearer <token>" or an admin; without a token also localhost
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+QUERY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+# Route of the request a worker thread runs queries for (see for_route)
+_worker = threading.local()
+
+
+def _route():
+    if has_request_context():
+        return request.endpoint or "unknown"
+    return getattr(_worker, "route", None) or "cli"
+
+
+def for_route(fn):
+    """Wrap fn for a worker thread: its queries count for the calling route."""
+    route = _route()
+
+    def run(*args, **kwargs):
+        _worker.route = route
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _worker.route = None
+    return run
+
+
+def _statement(sql):
+    # One line, bounded length - for logs only
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return sql if len(sql) <= 200 else sql[:197] + "..."
+
+
+# -----------------------------
+# Prozessweite Zähler (/metrics)
+# -----------------------------
+class Metrics:
+    """Counters of this process only.
+
+    Every worker process has its own; a scrape of /metrics returns the
+    counters of whichever worker answered it, not a total.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)          # (route, method, status) -> count
+        self.request_seconds = defaultdict(float)  # route -> sum
+        self.queries = defaultdict(int)            # route -> count
+        self.db_seconds = defaultdict(float)       # route -> sum
+        self.pool_wait_seconds = defaultdict(float)
+        self.slow_queries = defaultdict(int)
+        self.query_buckets = [0] * (len(QUERY_BUCKETS) + 1)
+        self.query_count = 0
+        self.query_sum = 0.0
+
+    def query(self, route, seconds):
+        with self._lock:
+            self.queries[route] += 1
+            self.db_seconds[route] += seconds
+            self.query_count += 1
+            self.query_sum += seconds
+            for i, bound in enumerate(QUERY_BUCKETS):
+                if seconds <= bound:
+                    self.query_buckets[i] += 1
+                    break
+            else:
+                self.query_buckets[-1] += 1
+            if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+                self.slow_queries[route] += 1
+
+    def pool_wait(self, route, seconds):
+        with self._lock:
+            self.pool_wait_seconds[route] += seconds
+
+    def request(self, route, method, status, seconds):
+        with self._lock:
+            self.requests[(route, method, status)] += 1
+            self.request_seconds[route] += seconds
+
+    def render(self):
+        """Prometheus text exposition format."""
+        from auth import user_cache_stats
+        from schedule_cache import pages
+        from refdata import refdata_stats
+
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        with self._lock:
+            family("stundenplaner_requests_total", "counter", "HTTP requests.",
+                   [((("route", r), ("method", m), ("status", s)), n)
+                    for (r, m, s), n in sorted(self.requests.items())])
+            family("stundenplaner_request_seconds_total", "counter", "Time spent handling requests.",
+                   [((("route", r),), round(v, 6)) for r, v in sorted(self.request_seconds.items())])
+            family("stundenplaner_db_queries_total", "counter", "SQL statements executed.",
+                   [((("route", r),), n) for r, n in sorted(self.queries.items())])
+            family("stundenplaner_db_seconds_total", "counter", "Time spent in SQL statements.",
+                   [((("route", r),), round(v, 6)) for r, v in sorted(self.db_seconds.items())])
+            family("stundenplaner_db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection.",
+                   [((("route", r),), round(v, 6)) for r, v in sorted(self.pool_wait_seconds.items())])
+            family("stundenplaner_db_slow_queries_total", "counter",
+                   f"Statements slower than {SLOW_QUERY_MS:g} ms.",
+                   [((("route", r),), n) for r, n in sorted(self.slow_queries.items())])
+
+            lines.append("# HELP stundenplaner_db_query_duration_seconds SQL statement duration.")
+            lines.append("# TYPE stundenplaner_db_query_duration_seconds histogram")
+            cumulative = 0
+            for bound, n in zip(QUERY_BUCKETS + ("+Inf",), self.query_buckets):
+                cumulative += n
+                lines.append(f'stundenplaner_db_query_duration_seconds_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"stundenplaner_db_query_duration_seconds_sum {round(self.query_sum, 6)}")
+            lines.append(f"stundenplaner_db_query_duration_seconds_count {self.query_count}")
+
+        pool = db.pool_stats()
+        if pool is not None:
+            for key in ("size", "in_use", "idle", "waiting", "overflow_in_use"):
+                family(f"stundenplaner_db_pool_{key}", "gauge", f"Connection pool: {key.replace('_', ' ')}.",
+                       [((), pool[key])])
+            for key in ("checkouts", "timeouts", "reconnects", "overflow_opened"):
+                family(f"stundenplaner_db_pool_{key}_total", "counter", f"Connection pool: {key.replace('_', ' ')}.",
+                       [((), pool[key])])
+            lines.append("# HELP stundenplaner_db_pool_checkout_seconds Wait for a pool connection.")
+            lines.append("# TYPE stundenplaner_db_pool_checkout_seconds histogram")
+            cumulative = 0
+            for bound, n in pool["wait_buckets"].items():
+                cumulative += n
+                lines.append(f'stundenplaner_db_pool_checkout_seconds_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"stundenplaner_db_pool_checkout_seconds_sum {pool['wait_seconds_sum']}")
+            lines.append(f"stundenplaner_db_pool_checkout_seconds_count {pool['checkouts']}")
+
+        caches = {"users": user_cache_stats(), "schedule_pages": pages.stats(), **refdata_stats()}
+        for key in ("hits", "misses", "evictions"):
+            family(f"stundenplaner_cache_{key}_total", "counter", f"Cache {key}.",
+                   [((("cache", name),), stats[key]) for name, stats in caches.items()])
+        family("stundenplaner_cache_entries", "gauge", "Cached entries.",
+               [((("cache", name),), stats["size"]) for name, stats in caches.items()])
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+# -----------------------------
+# Hooks aus db.py
+# -----------------------------
+def _on_query(sql, seconds):
+    route = _route()
+    metrics.query(route, seconds)
+    if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms) in %s: %s", seconds * 1000, route, _statement(sql))
+
+    if has_app_context() and "profile" in g:
+        profile = g.profile
+        profile["queries"] += 1
+        profile["db"] += seconds
+        slowest = profile["slowest"]
+        slowest.append((seconds, sql))
+        if len(slowest) > PROFILE_SLOWEST:
+            slowest.sort(key=lambda item: item[0], reverse=True)
+            del slowest[PROFILE_SLOWEST:]
+
+
+def _on_connect(waited):
+    metrics.pool_wait(_route(), waited)
+    if has_app_context() and "profile" in g:
+        g.profile["pool_wait"] += waited
+
+
+# -----------------------------
+# Pro Request: Server-Timing + Slow-Request-Log
+# -----------------------------
+def _before_request():
+    g.profile = {"start": time.perf_counter(), "queries": 0, "db": 0.0, "pool_wait": 0.0, "slowest": []}
+
+
+def _after_request(response):
+    profile = g.get("profile")
+    if profile is None:
+        return response
+    total = time.perf_counter() - profile["start"]
+    route = _route()
+
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={profile["db"] * 1000:.2f};desc="{profile["queries"]} queries", '
+        f'pool;dur={profile["pool_wait"] * 1000:.2f}, '
+        f'app;dur={total * 1000:.2f}'
+    )
+    metrics.request(route, request.method, response.status_code, total)
+
+    if SLOW_REQUEST_DB_MS and profile["db"] * 1000 >= SLOW_REQUEST_DB_MS:
+        slowest = sorted(profile["slowest"], key=lambda item: item[0], reverse=True)
+        logger.warning(
+            "Slow request %s %s: %d queries, %.1f ms DB, %.1f ms pool wait; slowest: %s",
+            request.method, route, profile["queries"], profile["db"] * 1000, profile["pool_wait"] * 1000,
+            " | ".join(f"{s * 1000:.1f} ms {_statement(sql)}" for s, sql in slowest),
+        )
+    return response
+
+
+def _metrics_allowed():
+    if METRICS_TOKEN and request.headers.get("Authorization") == f"Bearer {METRICS_TOKEN}":
+        return True
+    if current_user.is_authenticated and current_user.role == "admin":
+        return True
+    return not METRICS_TOKEN and request.remote_addr in ("127.0.0.1", "::1")
+
+
+def metrics_view():
+    if not _metrics_allowed():
+        return Response("Forbidden\n", 403, mimetype="text/plain")
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    db.query_hooks.append(_on_query)
+    db.connect_hooks.append(_on_connect)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
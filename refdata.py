@@ -0,0 +1,70 @@
+import os
+from cache import TTLCache
+from db import db_read, db_write
+
+# Räume und Lehrer ändern sich fast nie; per process, bounded by the TTL
+REFDATA_CACHE_SIZE = int(os.getenv("REFDATA_CACHE_SIZE", "2048"))
+REFDATA_CACHE_TTL = float(os.getenv("REFDATA_CACHE_TTL", "600"))
+
+raum_ids = TTLCache(REFDATA_CACHE_SIZE, REFDATA_CACHE_TTL)     # raumnummer -> raum.id
+lehrer_ids = TTLCache(REFDATA_CACHE_SIZE, REFDATA_CACHE_TTL)   # users.id -> lehrer.id
+
+
+# -----------------------------
+# Lehrer
+# -----------------------------
+def lehrer_id_for(user_id):
+    """lehrer.id of a teacher account, None if it has no lehrer row."""
+    lehrer_id = lehrer_ids.get(user_id)
+    if lehrer_id is None:
+        row = db_read("SELECT id FROM lehrer WHERE user_id=%s", (user_id,), single=True)
+        if not row:
+            return None
+        lehrer_id = row["id"]
+        lehrer_ids.put(user_id, lehrer_id)
+    return lehrer_id
+
+
+# -----------------------------
+# Räume
+# -----------------------------
+def raum_id_for(raumnummer):
+    """raum.id for a room number, None if the room doesn't exist yet."""
+    raum_id = raum_ids.get(raumnummer)
+    if raum_id is None:
+        row = db_read("SELECT id FROM raum WHERE raumnummer=%s", (raumnummer,), single=True)
+        if not row:
+            return None
+        raum_id = row["id"]
+        raum_ids.put(raumnummer, raum_id)
+    return raum_id
+
+
+def get_or_create_raum(raumnummer):
+    """raum.id for a room number, inserting the room if needed.
+
+    One round trip thanks to unique_raumnummer: on a duplicate
+    LAST_INSERT_ID(id) makes lastrowid the existing id, so two requests
+    creating the same room at once both get the same row (SQLite: the
+    translation adds RETURNING id, see db_sqlite).
+    """
+    raum_id = raum_ids.get(raumnummer)
+    if raum_id is not None:
+        return raum_id
+    # Not cached yet: the insert is only committed with the request, the
+    # next raum_id_for() picks it up once it is visible
+    return db_write(
+        "INSERT INTO raum (raumnummer) VALUES (%s) ON DUPLICATE KEY UPDATE id=LAST_INSERT_ID(id)",
+        (raumnummer,),
+        return_id=True
+    )
+
+
+def invalidate():
+    """Forget all cached ids (e.g. after rooms were merged or deleted)."""
+    raum_ids.invalidate()
+    lehrer_ids.invalidate()
+
+
+def refdata_stats():
+    return {"raum": raum_ids.stats(), "lehrer": lehrer_ids.stats()}
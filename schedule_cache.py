@@ -0,0 +1,113 @@
+import os
+from datetime import datetime, timezone
+from flask import make_response, request
+from cache import TTLCache
+from db import db_read, db_many
+
+# Versions live in the schedule_version table (migration 006): every
+# worker sees the same ETag, and a version stays valid until the schedule
+# changes, however rarely a client polls. Rendered pages are cached per
+# process, keyed by version, for SCHEDULE_CACHE_TTL seconds.
+SCHEDULE_CACHE_TTL = float(os.getenv("SCHEDULE_CACHE_TTL", "300"))
+SCHEDULE_CACHE_SIZE = int(os.getenv("SCHEDULE_CACHE_SIZE", "1024"))
+
+ALLE = 0   # schedule_version row bumped by school-wide changes
+_NEVER = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_BUMP = """
+    INSERT INTO schedule_version (user_id, version, geaendert_am) VALUES (%s, 1, %s)
+    ON DUPLICATE KEY UPDATE version = version + 1, geaendert_am = VALUES(geaendert_am)
+"""
+
+
+class ScheduleVersions:
+    """Per-user schedule version counter (bumped on every schedule change)."""
+
+    def get(self, user_id):
+        """Return (version, last_modified) of the user's schedule."""
+        rows = db_read(
+            "SELECT user_id, version, geaendert_am FROM schedule_version WHERE user_id IN (%s, %s)",
+            (ALLE, user_id)
+        ) or []
+        found = {r["user_id"]: r for r in rows}
+        school, own = found.get(ALLE), found.get(user_id)
+        version = f"{school['version'] if school else 0}.{own['version'] if own else 0}"
+        modified = max((r["geaendert_am"].replace(tzinfo=timezone.utc) for r in rows), default=_NEVER)
+        return version, modified
+
+    def bump(self, *user_ids):
+        """New versions, written with (and committed by) the current transaction."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        db_many(_BUMP, [(user_id, now) for user_id in sorted(set(user_ids))])
+
+    def bump_all(self):
+        self.bump(ALLE)
+
+
+versions = ScheduleVersions()
+pages = TTLCache(SCHEDULE_CACHE_SIZE, SCHEDULE_CACHE_TTL)
+
+
+# -----------------------------
+# Invalidierung
+# -----------------------------
+def schedule_changed(*user_ids):
+    versions.bump(*user_ids)
+
+
+def lesson_changed(fach_id, teacher_user_id=None):
+    """Bump the teacher and every student enrolled in faecher row `fach_id`.
+
+    Without `teacher_user_id` the teacher is taken from the row (e.g. an
+    admin added the lesson for someone else).
+    """
+    rows = db_read("SELECT user_id FROM stundenplan WHERE fach_id=%s", (fach_id,)) or []
+    user_ids = [r["user_id"] for r in rows]
+    if teacher_user_id is None:
+        row = db_read(
+            "SELECT lehrer.user_id FROM faecher JOIN lehrer ON lehrer.id = faecher.lehrer_id WHERE faecher.id=%s",
+            (fach_id,), single=True
+        )
+        teacher_user_id = row["user_id"] if row else None
+    if teacher_user_id is not None:
+        user_ids.append(teacher_user_id)
+    versions.bump(*user_ids)
+
+
+def all_changed():
+    versions.bump_all()
+    pages.invalidate()
+
+
+# -----------------------------
+# Seiten mit ETag / 304
+# -----------------------------
+def _not_modified(etag):
+    # ETag only: Last-Modified has whole seconds, two changes within one
+    # second would look unchanged to If-Modified-Since.
+    # Weak comparison: compressed responses carry W/"..." (assets.compress)
+    return bool(request.if_none_match) and request.if_none_match.contains_weak(etag)
+
+
+def cached_page(kind, user_id, render, mimetype=None):
+    """Serve a per-user page from the cache, answering 304 when unchanged.
+
+    `render` is only called on a cache miss and returns the body.
+    """
+    version, _ = versions.get(user_id)
+    etag = f"{kind}-{user_id}-{version}"
+
+    if _not_modified(etag):
+        response = make_response("", 304)
+    else:
+        html = pages.get((kind, user_id, version))
+        if html is None:
+            html = render()
+            pages.put((kind, user_id, version), html)
+        response = make_response(html)
+        if mimetype:
+            response.mimetype = mimetype
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
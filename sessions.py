@@ -0,0 +1,320 @@
+"""Optional server-side sessions with a cached user context.
+
+With SESSION_STORE unset the app keeps Flask's signed cookie sessions and
+loads the user from the DB (or the per-process user cache) on every
+request. With SESSION_STORE set the cookie only carries a random session
+id; the session itself lives in the store:
+
+- "memory": per process, a local stand-in for Redis (one worker, tests)
+- "filesystem": one file per key in SESSION_DIR, shared by all workers
+- "redis": SESSION_REDIS_URL, needs the `redis` package
+
+The session also caches the user context (username, role, lehrer_id), so
+an authenticated page view needs no identity query. Account changes bump
+a per-user generation in the store (see account_changed), which makes
+every session of that user reload its context once. Logout deletes the
+session.
+"""
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from urllib.parse import quote
+
+import click
+from flask import session
+from flask.sessions import SessionInterface, SessionMixin
+from flask_login import user_logged_in, user_logged_out
+from werkzeug.datastructures import CallbackDict
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SESSION_STORE = os.getenv("SESSION_STORE", "").lower()
+SESSION_DIR = os.getenv("SESSION_DIR", os.path.join(BASE_DIR, "instance", "sessions"))
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+# Seconds a session (and its cached context) lives without being used
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(14 * 24 * 3600)))
+# FileStore: about one write in this many also removes expired files (0 = only via CLI)
+SESSION_CLEANUP_EVERY = int(os.getenv("SESSION_CLEANUP_EVERY", "1000"))
+
+
+# -----------------------------
+# Stores (JSON values with a time-to-live)
+# -----------------------------
+class MemoryStore:
+    name = "memory"
+
+    def __init__(self):
+        self._data = {}   # key -> (expires, json)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._data[key]
+                return None
+            return json.loads(entry[1])
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl=SESSION_TTL):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, json.dumps(value))
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+
+class FileStore:
+    """One JSON file per key; writes go through a temp file + rename."""
+
+    name = "filesystem"
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, quote(key, safe=""))
+
+    def get(self, key):
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                expires, value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if expires < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl=SESSION_TTL):
+        path = self._file(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump([time.time() + ttl, value], f)
+        os.replace(tmp, path)
+        if SESSION_CLEANUP_EVERY and random.randrange(SESSION_CLEANUP_EVERY) == 0:
+            removed = self.cleanup()
+            logger.info("Removed %d expired session files", removed)
+
+    def delete(self, key):
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_prefix(self, prefix):
+        prefix = quote(prefix, safe="")
+        for name in os.listdir(self.path):
+            if name.startswith(prefix) and not name.endswith(".tmp"):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    pass
+
+    def cleanup(self):
+        """Remove expired files; returns how many."""
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.path):
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    expires = json.load(f)[0]
+                if expires < now:
+                    os.remove(path)
+                    removed += 1
+            except (OSError, ValueError, IndexError):
+                pass
+        return removed
+
+
+class RedisStore:
+    name = "redis"
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def get_many(self, keys):
+        return [json.loads(v) if v is not None else None for v in self.client.mget(keys)]
+
+    def set(self, key, value, ttl=SESSION_TTL):
+        self.client.set(key, json.dumps(value), ex=int(ttl))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def delete_prefix(self, prefix):
+        for key in self.client.scan_iter(match=prefix + "*"):
+            self.client.delete(key)
+
+
+def create_store(name=None):
+    name = SESSION_STORE if name is None else name
+    if not name:
+        return None
+    if name == "memory":
+        return MemoryStore()
+    if name == "filesystem":
+        return FileStore(SESSION_DIR)
+    if name == "redis":
+        return RedisStore(SESSION_REDIS_URL)
+    raise ValueError(f"Unknown SESSION_STORE: {name}")
+
+
+store = None
+
+
+# -----------------------------
+# Flask SessionInterface
+# -----------------------------
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.regenerate = False
+
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, session_store):
+        self.store = session_store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.get("session:" + sid)
+            if data is not None:
+                return ServerSession(data, sid)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            # Logout (or never logged in): drop the stored session and the cookie
+            if not session.new:
+                self.store.delete("session:" + session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if session.regenerate:
+            # New id after login (no session fixation)
+            if not session.new:
+                self.store.delete("session:" + session.sid)
+            session.sid, session.new, session.regenerate = secrets.token_urlsafe(32), True, False
+        if session.modified or session.new:
+            self.store.set("session:" + session.sid, dict(session), SESSION_TTL)
+        elif not self.should_set_cookie(app, session):
+            return
+        response.set_cookie(
+            name, session.sid, max_age=SESSION_TTL, domain=domain, path=path,
+            secure=self.get_cookie_secure(app), httponly=self.get_cookie_httponly(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+# -----------------------------
+# Gecachter User-Kontext
+# -----------------------------
+def _generations(user_id):
+    return store.get_many([f"account:{user_id}", "account:*"])
+
+
+def account_changed(user_id=None):
+    """The user's (or with None every user's) row changed: reload the contexts."""
+    if store is not None:
+        store.set(f"account:{'*' if user_id is None else user_id}", secrets.token_hex(8), SESSION_TTL)
+
+
+def remember_user(user, lehrer_id=None):
+    """Cache the user's context in the current session."""
+    if store is None:
+        return
+    session["ctx"] = {
+        "id": user.id,
+        "username": user.username,
+        "role": user.role,
+        # Only a found lehrer row is cached, a missing one may be imported later
+        "lehrer_id": lehrer_id,
+        "gen": _generations(user.id),
+    }
+
+
+def cached_user(user_id):
+    """The cached context of `user_id` if it is still current, else None."""
+    if store is None:
+        return None
+    ctx = session.get("ctx")
+    if not ctx or ctx.get("id") != user_id:
+        return None
+    if ctx.get("gen") != _generations(user_id):
+        session.pop("ctx", None)
+        return None
+    return ctx
+
+
+def _logged_in(app, user):
+    session.regenerate = True
+
+
+def _logged_out(app, user):
+    # Empty session -> deleted from the store, cookie removed
+    session.pop("ctx", None)
+
+
+def init_app(app):
+    global store
+    store = create_store()
+    if store is None:
+        return
+    app.session_interface = ServerSessionInterface(store)
+    user_logged_in.connect(_logged_in, app)
+    user_logged_out.connect(_logged_out, app)
+    logger.info("Server-side sessions: %s", store.name)
+
+
+@click.group("sessions")
+def sessions_command():
+    """Server-side session store (SESSION_STORE)."""
+
+
+@sessions_command.command("cleanup")
+def cleanup_command():
+    """Remove expired sessions (filesystem store; Redis expires them itself)."""
+    session_store = create_store()
+    if not hasattr(session_store, "cleanup"):
+        click.echo(f"Nothing to clean up for SESSION_STORE={SESSION_STORE or '(cookie)'}.")
+        return
+    click.echo(f"Removed {session_store.cleanup()} expired sessions.")
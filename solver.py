@@ -0,0 +1,322 @@
+"""Automatic timetable solver.
+
+Assigns every faecher row a weekday, timeblock and room so that no
+teacher, room or student is booked twice at the same time:
+
+1. Greedy construction with constraint propagation: the lesson with the
+   fewest remaining feasible slots is placed first (MRV); feasible slots
+   are kept as bitmasks per teacher/student and per full slot.
+2. Lessons that could not be placed are repaired by a min-conflicts
+   local search with a tabu list until the time budget is used up.
+"""
+import heapq
+import logging
+import random
+import time
+from collections import defaultdict
+
+import click
+from flask.cli import with_appcontext
+
+logger = logging.getLogger(__name__)
+
+WOCHENTAGE = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]
+
+# Same blocks as in lesson.html / edit_lesson.html
+TIMEBLOCKS = [
+    ("08:45", "09:25"),
+    ("09:35", "10:20"),
+    ("10:35", "11:20"),
+    ("11:30", "12:15"),
+    ("13:20", "14:05"),
+    ("14:15", "15:00"),
+]
+
+SLOTS = [(tag, block) for tag in WOCHENTAGE for block in TIMEBLOCKS]
+SLOT_INDEX = {(tag, start): i for i, (tag, (start, _)) in enumerate(SLOTS)}
+ALL_SLOTS = (1 << len(SLOTS)) - 1
+
+
+def _hhmm(value):
+    # TIME column (timedelta, e.g. 8:45:00) or "08:45" -> "08:45"
+    if value is None:
+        return None
+    hours, minutes = str(value).split(":")[:2]
+    return f"{int(hours):02d}:{int(minutes):02d}"
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Solver:
+    """Search state for one problem instance.
+
+    lessons:     [{"id", "lehrer_id", "raum_id", "tag", "startzeit"}]
+                 (raum_id/tag/startzeit = current placement, kept if possible)
+    rooms:       [raum_id]
+    students_of: {fach_id: {user_id}}
+    """
+
+    def __init__(self, lessons, rooms, students_of, seed=0):
+        self.lessons = lessons
+        self.rooms = list(rooms)
+        self.random = random.Random(seed)
+        self.current = [
+            SLOT_INDEX.get((lesson.get("tag"), _hhmm(lesson.get("startzeit"))))
+            for lesson in lessons
+        ]
+
+        # Resources that can only be in one place per slot
+        self.resources = []
+        for lesson in lessons:
+            res = [("s", user_id) for user_id in students_of.get(lesson["id"], ())]
+            if lesson.get("lehrer_id") is not None:
+                res.append(("t", lesson["lehrer_id"]))
+            self.resources.append(res)
+
+        users = defaultdict(list)
+        for i, res in enumerate(self.resources):
+            for r in res:
+                users[r].append(i)
+        self.neighbors = [set() for _ in lessons]
+        for members in users.values():
+            for i in members:
+                self.neighbors[i].update(members)
+        for i, nb in enumerate(self.neighbors):
+            nb.discard(i)
+
+        self.busy = defaultdict(int)              # resource -> slot bitmask
+        self.at_slot = defaultdict(dict)          # resource -> {slot: lesson}
+        self.room_at = [dict() for _ in SLOTS]    # slot -> {raum_id: lesson}
+        self.full = 0                             # slots without a free room
+        self.assigned = {}                        # lesson -> (slot, raum_id)
+
+    # -----------------------------
+    # Zustand
+    # -----------------------------
+    def feasible(self, i):
+        mask = ALL_SLOTS & ~self.full
+        for r in self.resources[i]:
+            mask &= ~self.busy[r]
+        return mask
+
+    def assign(self, i, slot, raum_id):
+        self.assigned[i] = (slot, raum_id)
+        bit = 1 << slot
+        for r in self.resources[i]:
+            self.busy[r] |= bit
+            self.at_slot[r][slot] = i
+        self.room_at[slot][raum_id] = i
+        if len(self.room_at[slot]) >= len(self.rooms):
+            self.full |= bit
+
+    def unassign(self, i):
+        slot, raum_id = self.assigned.pop(i)
+        bit = 1 << slot
+        for r in self.resources[i]:
+            self.busy[r] &= ~bit
+            del self.at_slot[r][slot]
+        del self.room_at[slot][raum_id]
+        self.full &= ~bit
+
+    def pick_room(self, i, slot):
+        taken = self.room_at[slot]
+        preferred = self.lessons[i].get("raum_id")
+        if preferred in self.rooms and preferred not in taken:
+            return preferred
+        for raum_id in self.rooms:
+            if raum_id not in taken:
+                return raum_id
+        return None
+
+    def pick_slot(self, i, mask):
+        current = self.current[i]
+        if current is not None and mask >> current & 1:
+            return current
+        # Least used slots first, keeps rooms available for later lessons
+        best, best_load = [], None
+        for slot in _bits(mask):
+            load = len(self.room_at[slot])
+            if best_load is None or load < best_load:
+                best, best_load = [slot], load
+            elif load == best_load:
+                best.append(slot)
+        return self.random.choice(best)
+
+    # -----------------------------
+    # 1. Greedy + Propagation
+    # -----------------------------
+    def construct(self):
+        heap = [(bin(self.feasible(i)).count("1"), -len(self.neighbors[i]), i) for i in range(len(self.lessons))]
+        heapq.heapify(heap)
+        unplaced = []
+        while heap:
+            count, degree, i = heapq.heappop(heap)
+            mask = self.feasible(i)
+            current = bin(mask).count("1")
+            if current < count:
+                # Domain shrank since it was queued
+                heapq.heappush(heap, (current, degree, i))
+                continue
+            if not mask:
+                unplaced.append(i)
+                continue
+            slot = self.pick_slot(i, mask)
+            self.assign(i, slot, self.pick_room(i, slot))
+        return unplaced
+
+    # -----------------------------
+    # 2. Min-conflicts local search
+    # -----------------------------
+    def repair(self, unplaced, deadline, tabu_tenure=10):
+        best = (len(unplaced), dict(self.assigned))
+        queue = list(unplaced)
+        tabu = {}
+        step = 0
+        while queue and time.monotonic() < deadline:
+            step += 1
+            i = queue.pop(self.random.randrange(len(queue)))
+
+            candidates = []
+            for slot in range(len(SLOTS)):
+                if tabu.get((i, slot), 0) > step:
+                    continue
+                clashes = {self.at_slot[r][slot] for r in self.resources[i] if slot in self.at_slot[r]}
+                if len(self.room_at[slot]) >= len(self.rooms) and not clashes:
+                    # No free room: evict a random lesson in that slot
+                    clashes = {self.random.choice(list(self.room_at[slot].values()))}
+                candidates.append((len(clashes), self.random.random(), slot, clashes))
+            if not candidates:
+                queue.append(i)
+                continue
+
+            _, _, slot, clashes = min(candidates, key=lambda c: c[:2])
+            for j in clashes:
+                tabu[(j, self.assigned[j][0])] = step + tabu_tenure
+                self.unassign(j)
+                queue.append(j)
+            self.assign(i, slot, self.pick_room(i, slot))
+
+            if len(queue) < best[0]:
+                best = (len(queue), dict(self.assigned))
+
+        # Restore the best state seen
+        if best[0] < len(queue):
+            for i in list(self.assigned):
+                self.unassign(i)
+            for i, (slot, raum_id) in best[1].items():
+                self.assign(i, slot, raum_id)
+        return [i for i in range(len(self.lessons)) if i not in self.assigned], step
+
+    def solve(self, time_budget=10.0):
+        started = time.monotonic()
+        if not self.rooms:
+            return self._result(list(range(len(self.lessons))), 0, started)
+        unplaced = self.construct()
+        steps = 0
+        if unplaced:
+            unplaced, steps = self.repair(unplaced, started + time_budget)
+        return self._result(unplaced, steps, started)
+
+    def _result(self, unplaced, steps, started):
+        assignments = {}
+        for i, (slot, raum_id) in self.assigned.items():
+            tag, (start, end) = SLOTS[slot]
+            assignments[self.lessons[i]["id"]] = {
+                "tag": tag, "startzeit": start, "endzeit": end, "raum_id": raum_id
+            }
+        return {
+            "assignments": assignments,
+            "unplaced": [self.lessons[i]["id"] for i in unplaced],
+            "repair_steps": steps,
+            "seconds": round(time.monotonic() - started, 3),
+        }
+
+
+class IncompleteSolution(Exception):
+    """The solver left lessons unplaced (ids in .args[0])."""
+
+
+def solve(lessons, rooms, students_of, time_budget=10.0, seed=0):
+    return Solver(lessons, rooms, students_of, seed=seed).solve(time_budget)
+
+
+# -----------------------------
+# DB
+# -----------------------------
+# Imported lazily, so the solver itself runs without a database (benchmarks)
+def load_problem():
+    from db import db_read
+
+    lessons = db_read("SELECT id, lehrer_id, raum_id, tag, startzeit FROM faecher ORDER BY id") or []
+    rooms = [r["id"] for r in db_read("SELECT id FROM raum ORDER BY id") or []]
+    students_of = defaultdict(set)
+    for e in db_read("SELECT user_id, fach_id FROM stundenplan") or []:
+        students_of[e["fach_id"]].add(e["user_id"])
+    return lessons, rooms, students_of
+
+
+def apply_solution(result, force=False):
+    """Write all assignments in one transaction.
+
+    Unplaced lessons would keep their old, possibly clashing slot, so an
+    incomplete result is only written with `force`; their tag and times
+    are then cleared in the same transaction (they show up as unscheduled).
+    """
+    from db import db_many, transaction
+    from conflicts import index as conflict_index
+    from schedule_cache import all_changed
+    from analytics import rebuild
+
+    if result["unplaced"] and not force:
+        raise IncompleteSolution(result["unplaced"])
+    rows = [
+        (a["tag"], a["startzeit"], a["endzeit"], a["raum_id"], fach_id)
+        for fach_id, a in result["assignments"].items()
+    ]
+    with transaction():
+        db_many("UPDATE faecher SET tag=%s, startzeit=%s, endzeit=%s, raum_id=%s WHERE id=%s", rows)
+        if result["unplaced"]:
+            db_many("UPDATE faecher SET tag=NULL, startzeit=NULL, endzeit=NULL WHERE id=%s",
+                    [(fach_id,) for fach_id in result["unplaced"]])
+        all_changed()
+    conflict_index.invalidate()
+    rebuild()
+    logger.info("Timetable applied: %d lessons, %d unplaced", len(rows), len(result["unplaced"]))
+    return len(rows)
+
+
+def solve_school(time_budget=10.0, apply=True, force=False):
+    """Solve and (if complete or forced) apply; result["applied"] says which."""
+    lessons, rooms, students_of = load_problem()
+    result = solve(lessons, rooms, students_of, time_budget)
+    result["applied"] = False
+    if apply and (force or not result["unplaced"]):
+        apply_solution(result, force=force)
+        result["applied"] = True
+    return result
+
+
+# -----------------------------
+# CLI: flask --app flask_app solve-timetable
+# -----------------------------
+@click.command("solve-timetable")
+@click.option("--budget", default=10.0, show_default=True, help="Time budget in seconds.")
+@click.option("--dry-run", is_flag=True, help="Only report, do not write faecher.")
+@click.option("--force", is_flag=True, help="Write even if lessons stay unplaced (their slots are cleared).")
+@with_appcontext
+def solve_command(budget, dry_run, force):
+    """Assign weekday/timeblock/room to every lesson without clashes."""
+    result = solve_school(budget, apply=not dry_run, force=force)
+    click.echo(
+        f"{len(result['assignments'])} placed, {len(result['unplaced'])} unplaced "
+        f"in {result['seconds']}s ({result['repair_steps']} repair steps)"
+    )
+    if result["unplaced"]:
+        click.echo("Unplaced faecher ids: " + ", ".join(map(str, result["unplaced"])))
+        if not dry_run and not result["applied"]:
+            raise click.ClickException("Nothing written: not every lesson could be placed (use --force).")
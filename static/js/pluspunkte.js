@@ -0,0 +1,465 @@
+const checkboxes = document.querySelectorAll('.subject-checkbox');
+const selectedSubjectsDiv = document.getElementById('selectedSubjects');
+const totalPointsDisplay = document.getElementById('totalPoints');
+// Gespeicherte Noten kommen als JSON-Block aus pluspunkte.html
+const savedData = JSON.parse(document.getElementById('pluspunkteData').textContent);
+let saveTimeout = null;
+
+checkboxes.forEach(checkbox => {
+  checkbox.addEventListener('change', updateSelectedSubjects);
+});
+
+// Auto-load saved subjects on page load
+window.addEventListener('DOMContentLoaded', () => {
+  checkboxes.forEach(checkbox => {
+    const subjectName = checkbox.value;
+    if (savedData[subjectName] && savedData[subjectName].pruefungen.length > 0) {
+      checkbox.checked = true;
+    }
+  });
+  updateSelectedSubjects();
+});
+
+function updateSelectedSubjects() {
+  selectedSubjectsDiv.innerHTML = '';
+
+  checkboxes.forEach(checkbox => {
+    if (checkbox.checked) {
+      const subjectName = checkbox.value;
+      const subjectDiv = createSubjectRow(subjectName);
+      selectedSubjectsDiv.appendChild(subjectDiv);
+    }
+  });
+
+  calculateTotal();
+}
+
+function createSubjectRow(subjectName) {
+  const div = document.createElement('div');
+  div.className = 'subject-item';
+  div.dataset.subject = subjectName;
+
+  // Load saved data for this subject
+  const subjectData = savedData[subjectName] || { fach_gewichtung: 1.0, pruefungen: [] };
+  const hasSavedData = subjectData.pruefungen.length > 0;
+
+  div.innerHTML = `
+    <div class="subject-header">
+      <div class="subject-name">${subjectName}</div>
+      <button class="add-exam-btn" onclick="addExam(this)">+ Prüfung hinzufügen</button>
+    </div>
+    <div class="subject-weight-row">
+      <span>Fach-Gewichtung:</span>
+      <input type="number" class="subject-weight-input" placeholder="z.B. 1" step="0.5" min="0.5" value="${subjectData.fach_gewichtung}" style="width: 100px; padding: 5px; border: 1px solid var(--input-border); background: var(--input-bg); color: var(--text-primary); border-radius: 4px;">
+    </div>
+    <div class="exams-container">
+      ${hasSavedData ? '' : `
+      <div class="exam-row">
+        <div class="exam-label">Prüfung 1</div>
+        <div>
+          <label>Note</label>
+          <input type="number" class="grade-input" placeholder="z.B. 4.5" step="0.5" min="1" max="6" value="4.0">
+        </div>
+        <div>
+          <label>Prüfungs-Gewichtung</label>
+          <input type="number" class="exam-weight-input" placeholder="z.B. 1" step="0.5" min="0.5" value="1">
+        </div>
+      </div>
+      `}
+    </div>
+    <div class="fachnote-display">
+      Fachnote: <span class="fachnote-value">${(subjectData.fachnote ?? 4.0).toFixed(2)}</span> → 
+      Pluspunkte: <span class="subject-points">${(subjectData.pluspunkte ?? 0).toFixed(1)}</span>
+    </div>
+
+    <!-- Was brauche ich noch? Calculator -->
+    <div class="goal-calculator" style="margin-top: 15px; padding: 15px; background: rgba(52, 152, 219, 0.1); border-radius: 4px; border-left: 3px solid #3498db;">
+      <div style="font-weight: 600; margin-bottom: 10px; color: var(--text-primary);">📊 Was brauche ich noch?</div>
+      <div style="display: flex; gap: 10px; align-items: flex-end; flex-wrap: wrap;">
+        <div style="flex: 1; min-width: 150px;">
+          <label style="font-size: 12px; color: var(--text-secondary);">Ziel-Fachnote:</label>
+          <input type="number" class="goal-note-input" placeholder="z.B. 5.0" step="0.5" min="1" max="6" style="width: 100%; padding: 8px; border: 1px solid var(--input-border); background: var(--input-bg); color: var(--text-primary); border-radius: 4px;">
+        </div>
+        <div style="flex: 1; min-width: 150px;">
+          <label style="font-size: 12px; color: var(--text-secondary);">Gewichtung nächste Prüfung:</label>
+          <input type="number" class="next-exam-weight-input" value="1" step="0.5" min="0.5" style="width: 100%; padding: 8px; border: 1px solid var(--input-border); background: var(--input-bg); color: var(--text-primary); border-radius: 4px;">
+        </div>
+        <button onclick="calculateNeededGrade(this)" style="padding: 8px 16px; background: #3498db; color: white; border: none; border-radius: 4px; cursor: pointer; font-weight: 500;">Berechnen</button>
+      </div>
+      <div class="goal-result" style="margin-top: 10px; padding: 10px; background: var(--bg-secondary); border-radius: 4px; display: none;">
+        <!-- Result will be shown here -->
+      </div>
+    </div>
+  `;
+
+  // Load saved exams if they exist
+  if (hasSavedData) {
+    const examsContainer = div.querySelector('.exams-container');
+    subjectData.pruefungen.forEach((pruefung, index) => {
+      const examRow = document.createElement('div');
+      examRow.className = 'exam-row';
+      examRow.innerHTML = `
+        <div class="exam-label">Prüfung ${index + 1}</div>
+        <div>
+          <label>Note</label>
+          <input type="number" class="grade-input" placeholder="z.B. 4.5" step="0.5" min="1" max="6" value="${pruefung.note}">
+        </div>
+        <div>
+          <label>Prüfungs-Gewichtung</label>
+          <input type="number" class="exam-weight-input" placeholder="z.B. 1" step="0.5" min="0.5" value="${pruefung.gewichtung}">
+        </div>
+        ${index > 0 ? '<button class="remove-exam-btn" onclick="removeExam(this)">✕</button>' : ''}
+      `;
+      examsContainer.appendChild(examRow);
+    });
+  }
+
+  const inputs = div.querySelectorAll('.grade-input, .exam-weight-input, .subject-weight-input');
+  inputs.forEach(input => {
+    input.addEventListener('input', () => {
+      calculateSubject(div);
+      autoSaveSubject(div);
+    });
+  });
+
+  calculateSubject(div);
+  return div;
+}
+
+function addExam(button) {
+  const subjectItem = button.closest('.subject-item');
+  const examsContainer = subjectItem.querySelector('.exams-container');
+  const examCount = examsContainer.querySelectorAll('.exam-row').length;
+
+  const examRow = document.createElement('div');
+  examRow.className = 'exam-row';
+  examRow.innerHTML = `
+    <div class="exam-label">Prüfung ${examCount + 1}</div>
+    <div>
+      <label>Note</label>
+      <input type="number" class="grade-input" placeholder="z.B. 4.5" step="0.5" min="1" max="6" value="4.0">
+    </div>
+    <div>
+      <label>Prüfungs-Gewichtung</label>
+      <input type="number" class="exam-weight-input" placeholder="z.B. 1" step="0.5" min="0.5" value="1">
+    </div>
+    <button class="remove-exam-btn" onclick="removeExam(this)">✕</button>
+  `;
+
+  examsContainer.appendChild(examRow);
+
+  const inputs = examRow.querySelectorAll('.grade-input, .exam-weight-input');
+  inputs.forEach(input => {
+    input.addEventListener('input', () => {
+      calculateSubject(subjectItem);
+      autoSaveSubject(subjectItem);
+    });
+  });
+
+  calculateSubject(subjectItem);
+}
+
+function removeExam(button) {
+  const examRow = button.closest('.exam-row');
+  const subjectItem = button.closest('.subject-item');
+  examRow.remove();
+
+  const examsContainer = subjectItem.querySelector('.exams-container');
+  const examRows = examsContainer.querySelectorAll('.exam-row');
+  examRows.forEach((row, index) => {
+    row.querySelector('.exam-label').textContent = `Prüfung ${index + 1}`;
+  });
+
+  calculateSubject(subjectItem);
+  autoSaveSubject(subjectItem);
+}
+
+function calculateSubject(subjectDiv) {
+  const examRows = subjectDiv.querySelectorAll('.exam-row');
+  const subjectWeightInput = subjectDiv.querySelector('.subject-weight-input');
+  const fachnoteValue = subjectDiv.querySelector('.fachnote-value');
+  const subjectPointsDisplay = subjectDiv.querySelector('.subject-points');
+
+  // Step 1: Calculate weighted average of all exams to get Fachnote
+  let totalWeightedGrades = 0;
+  let totalExamWeights = 0;
+
+  examRows.forEach(examRow => {
+    const gradeInput = examRow.querySelector('.grade-input');
+    const examWeightInput = examRow.querySelector('.exam-weight-input');
+
+    const grade = parseFloat(gradeInput.value) || 4.0;
+    const examWeight = parseFloat(examWeightInput.value) || 1.0;
+
+    totalWeightedGrades += grade * examWeight;
+    totalExamWeights += examWeight;
+  });
+
+  const fachnote = totalExamWeights > 0 ? totalWeightedGrades / totalExamWeights : 4.0;
+  fachnoteValue.textContent = fachnote.toFixed(2);
+
+  // Step 2: Calculate points based on Fachnote
+  let basePoints = 0;
+  if (fachnote > 4.0) {
+    basePoints = (fachnote - 4.0);
+  } else if (fachnote < 4.0) {
+    const difference = 4.0 - fachnote;
+    basePoints = -(difference * 2);
+  }
+
+  // Step 3: Multiply by subject weight
+  const subjectWeight = parseFloat(subjectWeightInput.value) || 1.0;
+  // Float noise first (like round_points on the server), so -7.749999999999999 counts as -7.75
+  const calculatedPoints = Math.round(basePoints * subjectWeight * 1e9) / 1e9;
+
+  // Step 4: Round to nearest 0.5 (ab 0.25 aufrunden)
+  let finalPoints;
+  if (calculatedPoints >= 0) {
+    finalPoints = Math.floor(calculatedPoints * 2 + 0.5) / 2;
+  } else {
+    finalPoints = Math.ceil(calculatedPoints * 2 - 0.5) / 2;
+  }
+
+  subjectPointsDisplay.textContent = finalPoints.toFixed(1);
+
+  // Color coding for the points display
+  if (finalPoints > 0) {
+    subjectPointsDisplay.style.color = '#155724';
+  } else if (finalPoints < 0) {
+    subjectPointsDisplay.style.color = '#721c24';
+  } else {
+    subjectPointsDisplay.style.color = '#000';
+  }
+
+  calculateTotal();
+}
+
+function calculateTotal() {
+  const allSubjects = document.querySelectorAll('.subject-item');
+  let total = 0;
+
+  allSubjects.forEach(subject => {
+    const subjectPointsText = subject.querySelector('.subject-points').textContent;
+    total += parseFloat(subjectPointsText) || 0;
+  });
+
+  totalPointsDisplay.textContent = total.toFixed(1);
+
+  // Color gradient: green for positive, red for negative
+  const totalSection = totalPointsDisplay.parentElement;
+  let backgroundColor;
+  if (total > 0) {
+    const intensity = Math.min(total / 10, 1);
+    backgroundColor = `rgb(${Math.round(200 - 140*intensity)}, ${Math.round(230 + 25*intensity)}, ${Math.round(200 - 140*intensity)})`;
+  } else if (total < 0) {
+    const intensity = Math.min(Math.abs(total) / 10, 1);
+    backgroundColor = `rgb(${Math.round(230 + 25*intensity)}, ${Math.round(200 - 140*intensity)}, ${Math.round(200 - 140*intensity)})`;
+  } else {
+    backgroundColor = '#f8f9fa';
+  }
+  totalSection.style.backgroundColor = backgroundColor;
+}
+
+const dirtySubjects = new Set();
+
+function autoSaveSubject(subjectDiv) {
+  dirtySubjects.add(subjectDiv.dataset.subject);
+
+  // Clear existing timeout
+  if (saveTimeout) {
+    clearTimeout(saveTimeout);
+  }
+
+  // Wait 1 second after last change, then save all changed subjects at once
+  saveTimeout = setTimeout(async () => {
+    const subjects = [];
+
+    dirtySubjects.forEach(subjectName => {
+      const subjectDiv = selectedSubjectsDiv.querySelector(`.subject-item[data-subject="${CSS.escape(subjectName)}"]`);
+      if (!subjectDiv) {
+        return;
+      }
+
+      const fachGewichtung = parseFloat(subjectDiv.querySelector('.subject-weight-input').value) || 1.0;
+      const examRows = subjectDiv.querySelectorAll('.exam-row');
+      const pruefungen = [];
+
+      examRows.forEach(examRow => {
+        const note = parseFloat(examRow.querySelector('.grade-input').value);
+        const gewichtung = parseFloat(examRow.querySelector('.exam-weight-input').value);
+
+        if (note && gewichtung) {
+          pruefungen.push({ note, gewichtung });
+        }
+      });
+
+      subjects.push({
+        fachname: subjectName,
+        fach_gewichtung: fachGewichtung,
+        pruefungen: pruefungen
+      });
+    });
+    dirtySubjects.clear();
+
+    if (subjects.length === 0) {
+      return;
+    }
+
+    try {
+      const response = await fetch('/pluspunkte/save_all', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ subjects: subjects })
+      });
+
+      const result = await response.json();
+
+      (result.results || []).forEach(r => {
+        if (r.success) {
+          console.log('Auto-saved:', r.fachname);
+        } else {
+          console.error('Auto-save error:', r.fachname, r.error);
+        }
+      });
+    } catch (error) {
+      console.error('Auto-save error:', error);
+    }
+  }, 1000);
+}
+
+function calculateNeededGrade(button) {
+  const subjectDiv = button.closest('.subject-item');
+  const goalNoteInput = subjectDiv.querySelector('.goal-note-input');
+  const nextExamWeightInput = subjectDiv.querySelector('.next-exam-weight-input');
+  const goalResult = subjectDiv.querySelector('.goal-result');
+
+  const goalNote = parseFloat(goalNoteInput.value);
+  const nextExamWeight = parseFloat(nextExamWeightInput.value);
+
+  if (isNaN(goalNote) || goalNote < 1 || goalNote > 6) {
+    alert('Bitte gib eine gültige Ziel-Fachnote zwischen 1.0 und 6.0 ein.');
+    return;
+  }
+
+  if (isNaN(nextExamWeight) || nextExamWeight <= 0) {
+    alert('Bitte gib eine gültige Gewichtung ein.');
+    return;
+  }
+
+  // Get current exams
+  const examRows = subjectDiv.querySelectorAll('.exam-row');
+  let currentWeightedSum = 0;
+  let currentTotalWeight = 0;
+
+  examRows.forEach(examRow => {
+    const grade = parseFloat(examRow.querySelector('.grade-input').value) || 4.0;
+    const weight = parseFloat(examRow.querySelector('.exam-weight-input').value) || 1.0;
+
+    currentWeightedSum += grade * weight;
+    currentTotalWeight += weight;
+  });
+
+  // Calculate needed grade
+  // Formula: goalNote = (currentWeightedSum + neededGrade * nextExamWeight) / (currentTotalWeight + nextExamWeight)
+  // Solve for neededGrade: neededGrade = (goalNote * (currentTotalWeight + nextExamWeight) - currentWeightedSum) / nextExamWeight
+
+  const neededGrade = (goalNote * (currentTotalWeight + nextExamWeight) - currentWeightedSum) / nextExamWeight;
+
+  // Display result
+  goalResult.style.display = 'block';
+
+  let resultHTML = '';
+  let resultClass = '';
+
+  if (neededGrade < 1.0) {
+    resultClass = 'success';
+    resultHTML = `<strong style="color: #155724;">🎉 Ziel bereits erreicht!</strong><br>
+      Du hast aktuell eine Fachnote von <strong>${(currentWeightedSum / currentTotalWeight).toFixed(2)}</strong>. 
+      Du kannst sogar eine schlechtere Note bekommen und erreichst trotzdem dein Ziel von <strong>${goalNote.toFixed(1)}</strong>!`;
+  } else if (neededGrade > 6.0) {
+    resultClass = 'error';
+    const maxPossible = (currentWeightedSum + 6.0 * nextExamWeight) / (currentTotalWeight + nextExamWeight);
+    resultHTML = `<strong style="color: #721c24;">⚠️ Ziel nicht mehr erreichbar</strong><br>
+      Selbst mit einer Note von <strong>6.0</strong> in der nächsten Prüfung erreichst du nur eine Fachnote von <strong>${maxPossible.toFixed(2)}</strong>.`;
+  } else if (neededGrade >= 5.5) {
+    resultClass = 'warning';
+    resultHTML = `<strong style="color: #856404;">📚 Sehr anspruchsvoll</strong><br>
+      Du brauchst mindestens eine <strong>${neededGrade.toFixed(2)}</strong> in der nächsten Prüfung 
+      (Gewichtung: ${nextExamWeight}) um eine Fachnote von <strong>${goalNote.toFixed(1)}</strong> zu erreichen.`;
+  } else {
+    resultClass = 'success';
+    resultHTML = `<strong style="color: #155724;">✅ Erreichbar</strong><br>
+      Du brauchst mindestens eine <strong>${neededGrade.toFixed(2)}</strong> in der nächsten Prüfung 
+      (Gewichtung: ${nextExamWeight}) um eine Fachnote von <strong>${goalNote.toFixed(1)}</strong> zu erreichen.`;
+  }
+
+  goalResult.innerHTML = resultHTML;
+}
+
+// Prognose vom Server (/api/pluspunkte/projection, gespeicherte Noten)
+document.getElementById('projectionButton').addEventListener('click', async () => {
+  const result = document.getElementById('projectionResult');
+  const params = new URLSearchParams({
+    goal: document.getElementById('projectionGoal').value || '0',
+    exams: document.getElementById('projectionExams').value || '1',
+    weight: document.getElementById('projectionWeight').value || '1'
+  });
+
+  result.style.display = 'block';
+  result.textContent = 'Berechne...';
+  try {
+    const response = await fetch('/api/pluspunkte/projection?' + params.toString());
+    const data = await response.json();
+    if (!response.ok) throw new Error(data.error || 'Prognose fehlgeschlagen');
+    renderProjection(result, data);
+  } catch (error) {
+    result.textContent = error.message;
+  }
+});
+
+function element(tag, text, style) {
+  const el = document.createElement(tag);
+  if (text !== undefined) el.textContent = text;
+  if (style) el.style.cssText = style;
+  return el;
+}
+
+function renderProjection(container, data) {
+  // Built with textContent, never innerHTML (subject names come from users)
+  container.replaceChildren();
+  const p = data.prognose;
+  container.append(
+    element('div', `Erwartet: ${p.erwartet.toFixed(1)} Pluspunkte ` +
+      `(80 % zwischen ${p.perzentile['10'] ?? '-'} und ${p.perzentile['90'] ?? '-'})`),
+    element('div', `Wahrscheinlichkeit für mindestens ${data.ziel.toFixed(1)}: ${(p.p_ziel * 100).toFixed(0)} %`, 'font-weight: 600;')
+  );
+
+  if (data.fokus.length) {
+    container.append(element('div', 'Am meisten bringt es, dich hier zu verbessern:', 'margin-top: 10px;'));
+    const list = element('ul');
+    data.fokus.forEach(f => list.append(element('li',
+      `${f.fachname}: +${(f.p_ziel_gewinn * 100).toFixed(0)} % Chance, +${f.pluspunkte_gewinn.toFixed(2)} Pluspunkte erwartet`)));
+    container.append(list);
+  }
+
+  // Chance auf das Ziel je nach Durchschnitt der nächsten Prüfungen in einem Fach
+  const table = element('table', undefined, 'width: 100%; border-collapse: collapse; font-size: 13px; margin-top: 10px;');
+  const head = element('tr');
+  head.append(element('th', 'Fach / Note', 'text-align: left;'));
+  data.sensitivitaet.noten.forEach(note => head.append(element('th', note.toFixed(1))));
+  table.append(head);
+  Object.entries(data.sensitivitaet.faecher).forEach(([fachname, row]) => {
+    const tr = element('tr');
+    tr.append(element('td', fachname));
+    row.p_ziel.forEach((chance, i) => {
+      const td = element('td', `${Math.round(chance * 100)}%`, 'text-align: center;');
+      td.title = `${row.pluspunkte[i].toFixed(1)} Pluspunkte`;
+      td.style.backgroundColor = `rgba(${chance < 0.5 ? '220, 53, 69' : '92, 184, 92'}, ${Math.abs(chance - 0.5) * 0.6})`;
+      tr.append(td);
+    });
+    table.append(tr);
+  });
+  container.append(table);
+}
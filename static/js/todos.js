@@ -0,0 +1,163 @@
+// Änderungen über /api/todos, die Liste wird nur an der betroffenen Stelle angepasst
+(function () {
+  const list = document.getElementById('todoList');
+  const count = document.getElementById('todoCount');
+  const noTodos = document.getElementById('noTodos');
+  const loadMore = document.getElementById('loadMoreTodos');
+  const errorBox = document.getElementById('todoError');
+  const addForm = document.getElementById('addTodoForm');
+  const today = list.dataset.today;
+  let nextCursor = list.dataset.nextCursor || null;
+
+  function showError(message) {
+    errorBox.textContent = message || '';
+    errorBox.style.display = message ? 'block' : 'none';
+  }
+
+  function updateCount(delta) {
+    count.textContent = Math.max(0, parseInt(count.textContent, 10) + delta);
+    noTodos.style.display = list.children.length ? 'none' : 'block';
+  }
+
+  // Same order as the server: open first, undated first, then due date, then id
+  function sortKey(el) {
+    return [Number(el.dataset.completed), el.dataset.due, Number(el.dataset.id)];
+  }
+
+  function before(a, b) {
+    for (let i = 0; i < a.length; i++) {
+      if (a[i] < b[i]) return true;
+      if (a[i] > b[i]) return false;
+    }
+    return false;
+  }
+
+  function insertSorted(el) {
+    const key = sortKey(el);
+    for (const other of list.children) {
+      if (before(key, sortKey(other))) {
+        list.insertBefore(el, other);
+        return;
+      }
+    }
+    // Behind the loaded part: only append if there is nothing left to load
+    if (!nextCursor) list.appendChild(el);
+  }
+
+  function todoItem(todo) {
+    // Built with textContent, never innerHTML (titles come from users)
+    const item = document.createElement('div');
+    item.className = 'todo-item' + (todo.completed ? ' completed' : '');
+    item.dataset.id = todo.id;
+    item.dataset.completed = todo.completed ? 1 : 0;
+    item.dataset.due = todo.due_date || '';
+
+    const checkbox = document.createElement('input');
+    checkbox.type = 'checkbox';
+    checkbox.className = 'todo-checkbox';
+    checkbox.checked = todo.completed;
+
+    const content = document.createElement('div');
+    content.className = 'todo-content';
+    const title = document.createElement('div');
+    title.className = 'todo-title';
+    title.textContent = todo.title;
+    content.appendChild(title);
+    if (todo.due_date) {
+      const due = document.createElement('div');
+      due.className = 'todo-date';
+      if (!todo.completed) {
+        due.classList.add(todo.due_date < today ? 'overdue' : todo.due_date === today ? 'today' : 'upcoming');
+      }
+      due.textContent = '📅 Fällig: ' + todo.due_date;
+      content.appendChild(due);
+    }
+
+    const remove = document.createElement('button');
+    remove.type = 'button';
+    remove.className = 'delete-btn';
+    remove.textContent = '🗑️';
+
+    item.append(checkbox, content, remove);
+    return item;
+  }
+
+  async function api(method, url, body) {
+    const response = await fetch(url, {
+      method: method,
+      headers: body ? { 'Content-Type': 'application/json' } : {},
+      body: body ? JSON.stringify(body) : undefined
+    });
+    const data = await response.json().catch(() => ({}));
+    if (!response.ok) throw new Error(data.error || 'Aktion fehlgeschlagen');
+    return data;
+  }
+
+  addForm.addEventListener('submit', async event => {
+    event.preventDefault();
+    try {
+      const data = await api('POST', '/api/todos', {
+        title: addForm.elements.title.value,
+        due_date: addForm.elements.due_date.value
+      });
+      insertSorted(todoItem(data.item));
+      addForm.reset();
+      addForm.elements.title.focus();
+      showError('');
+      updateCount(1);
+    } catch (error) {
+      showError(error.message);
+    }
+  });
+
+  list.addEventListener('change', async event => {
+    if (!event.target.classList.contains('todo-checkbox')) return;
+    event.preventDefault();
+    event.stopImmediatePropagation();
+    const item = event.target.closest('.todo-item');
+    try {
+      const data = await api('POST', `/api/todos/${item.dataset.id}/toggle`);
+      item.remove();
+      insertSorted(todoItem(data.item));
+      showError('');
+    } catch (error) {
+      event.target.checked = !event.target.checked;
+      showError(error.message);
+    }
+  }, true);
+
+  list.addEventListener('click', async event => {
+    if (!event.target.classList.contains('delete-btn')) return;
+    event.preventDefault();
+    event.stopImmediatePropagation();
+    if (!confirm('Aufgabe wirklich löschen?')) return;
+    const item = event.target.closest('.todo-item');
+    try {
+      await api('DELETE', `/api/todos/${item.dataset.id}`);
+      item.remove();
+      showError('');
+      updateCount(-1);
+    } catch (error) {
+      showError(error.message);
+    }
+  }, true);
+
+  loadMore.addEventListener('click', async () => {
+    if (!nextCursor) return;
+    loadMore.disabled = true;
+    try {
+      const page = await api('GET', '/api/todos?cursor=' + encodeURIComponent(nextCursor));
+      const known = new Set([...list.children].map(el => el.dataset.id));
+      const fragment = document.createDocumentFragment();
+      page.items.filter(todo => !known.has(String(todo.id)))
+        .forEach(todo => fragment.appendChild(todoItem(todo)));
+      list.appendChild(fragment);
+      nextCursor = page.next_cursor;
+      loadMore.style.display = nextCursor ? 'inline-block' : 'none';
+    } catch (error) {
+      showError(error.message);
+    } finally {
+      loadMore.disabled = false;
+    }
+  });
+})();
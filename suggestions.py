@@ -0,0 +1,90 @@
+from db import db_read
+from catalog import catalog_item
+from conflicts import index as conflict_index, slot_mask, to_minutes, BLOCKS, DAY_INDEX
+from solver import WOCHENTAGE, TIMEBLOCKS
+
+N_BLOCKS = len(BLOCKS)
+DAY_MASK = (1 << N_BLOCKS) - 1
+
+
+# -----------------------------
+# Freie Blöcke
+# -----------------------------
+def free_slots(user_id, ignore=None):
+    """Blocks of the week in which the student has nothing yet."""
+    busy = conflict_index.occupancy(user_id, ignore)
+    free = []
+    for day, tag in enumerate(WOCHENTAGE):
+        for block, (start, end) in enumerate(TIMEBLOCKS):
+            if not busy >> (day * N_BLOCKS + block) & 1:
+                free.append({"tag": tag, "startzeit": start, "endzeit": end})
+    return free
+
+
+# -----------------------------
+# Alternative Kurse desselben Fachs
+# -----------------------------
+def _rank(row, busy, prefer_lehrer_id):
+    """(score, reasons) - higher score = nicer fit into the existing week."""
+    day = DAY_INDEX.get(row["tag"])
+    mask, _ = slot_mask(row["tag"], to_minutes(row["startzeit"]), to_minutes(row["endzeit"]))
+    score, reasons = 0, []
+
+    if prefer_lehrer_id is not None and row["lehrer_id"] == prefer_lehrer_id:
+        score += 3
+        reasons.append("gleiche Lehrkraft")
+    if day is not None and mask:
+        day_busy = busy >> (day * N_BLOCKS) & DAY_MASK
+        blocks = mask >> (day * N_BLOCKS)
+        # Directly before or after a lesson of the same day: no free period
+        if ((blocks << 1) | (blocks >> 1)) & day_busy:
+            score += 2
+            reasons.append("ohne Freistunde")
+        elif day_busy:
+            score += 1
+            reasons.append("an einem Tag mit Unterricht")
+    return score, reasons
+
+
+def suggest_sections(user_id, fachname=None, like_fach_id=None, ignore=None, limit=5):
+    """Lessons of a subject that fit the student's current week, best first.
+
+    The subject is given by name or by one of its lessons (`like_fach_id`,
+    e.g. the one that just clashed; its teacher is preferred). `ignore` is
+    an enrollment to disregard (when replacing it). One query for the
+    candidates; the fit check and ranking use the occupancy bitmaps.
+    """
+    rows = db_read("""
+        SELECT
+            faecher.id,
+            faecher.fachname,
+            faecher.lehrer_id,
+            lehrer.name AS lehrer,
+            raum.raumnummer AS raum,
+            faecher.tag,
+            faecher.startzeit,
+            faecher.endzeit
+        FROM faecher
+        JOIN lehrer ON faecher.lehrer_id = lehrer.id
+        JOIN raum ON faecher.raum_id = raum.id
+        WHERE faecher.fachname = COALESCE(%s, (SELECT f.fachname FROM faecher f WHERE f.id = %s))
+        ORDER BY faecher.id
+    """, (fachname, like_fach_id or 0)) or []
+
+    prefer_lehrer_id = None
+    if like_fach_id is not None:
+        prefer_lehrer_id = next((r["lehrer_id"] for r in rows if r["id"] == like_fach_id), None)
+
+    busy = conflict_index.occupancy(user_id, ignore)
+    ranked = []
+    for row in rows:
+        if row["id"] in (like_fach_id, ignore) or not conflict_index.fits(user_id, row["id"], ignore):
+            continue
+        score, reasons = _rank(row, busy, prefer_lehrer_id)
+        ranked.append((-score, DAY_INDEX.get(row["tag"], 99), to_minutes(row["startzeit"]), row, reasons))
+
+    ranked.sort(key=lambda item: item[:3])
+    return [
+        {**catalog_item(row), "score": -neg_score, "reasons": reasons}
+        for neg_score, _, _, row, reasons in ranked[:limit]
+    ]
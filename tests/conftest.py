@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Tests run against a throw-away SQLite database (see db_sqlite.py)
+os.environ.setdefault("DB_BACKEND", "sqlite")
+os.environ.setdefault("DB_SQLITE_PATH", ":memory:")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture
+def fresh_db():
+    """A new, empty in-memory database with schema and migrations."""
+    import db
+    from db_sqlite import SQLiteBackend
+
+    db.use_backend(SQLiteBackend(":memory:"))
+    return db
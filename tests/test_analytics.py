@@ -0,0 +1,34 @@
+import analytics
+from auth import register_user
+from flask_app import app
+
+
+def _counts(db):
+    return {r["fach_id"]: r["schueler"] for r in db.db_read("SELECT fach_id, schueler FROM fach_belegung")}
+
+
+def test_switch_before_first_build_is_counted_once(fresh_db, monkeypatch):
+    # Fresh migration: summary tables empty, this process never built them
+    monkeypatch.setattr(analytics, "_built", False)
+    with app.app_context():
+        fresh_db.db_write("INSERT INTO users (id, username, password, role) VALUES (1, 'lehrer', 'x', 'teacher')")
+        fresh_db.db_write("INSERT INTO lehrer (id, name, user_id) VALUES (1, 'Lehrer', 1)")
+        fresh_db.db_write("INSERT INTO raum (id, raumnummer) VALUES (1, 'A1')")
+        fresh_db.db_many(
+            "INSERT INTO faecher (id, fachname, lehrer_id, raum_id, tag, startzeit, endzeit) VALUES (%s, %s, 1, 1, %s, %s, %s)",
+            [(1, "Bio", "Montag", "08:00", "08:45"), (2, "Bio", "Dienstag", "08:00", "08:45")],
+        )
+        user_id = register_user("anna", "pw", "student")
+        entry_id = fresh_db.db_write("INSERT INTO stundenplan (user_id, fach_id) VALUES (%s, 1)", (user_id,),
+                                     return_id=True)
+
+    client = app.test_client()
+    client.post("/login", data={"username": "anna", "password": "pw"})
+    assert client.post(f"/schedule/edit/{entry_id}", data={"fach": 2}).status_code == 302
+
+    with app.app_context():
+        analytics.ensure_built()
+        assert _counts(fresh_db) == {1: 0, 2: 1}
+        # Deltas apply once the tables exist
+        analytics.enrollment_changed(1, 1)
+        assert _counts(fresh_db) == {1: 1, 2: 1}
@@ -0,0 +1,42 @@
+from auth import change_role, invalidate_user, register_user, user_cache, users_command
+from flask_app import app
+import db
+
+
+def test_user_cache_is_dropped_only_after_commit(fresh_db):
+    with app.test_request_context():
+        user_id = register_user("anna", "pw", "student")
+        db.commit()
+        user_cache.put(user_id, "cached")
+
+        change_role(user_id, "teacher")
+        assert user_cache.get(user_id) == "cached"
+        db.commit()
+        assert user_cache.get(user_id) is None
+
+
+def test_rollback_keeps_the_cached_user(fresh_db):
+    with app.test_request_context():
+        user_cache.put(7, "cached")
+        db.db_write("UPDATE users SET role = 'admin' WHERE id = 7")
+        invalidate_user(7)
+        db.rollback()
+        db.commit()
+        assert user_cache.get(7) == "cached"
+        user_cache.invalidate(7)
+
+
+def test_cli_changes_role_and_password(fresh_db):
+    with app.app_context():
+        register_user("ben", "old", "student")
+    runner = app.test_cli_runner()
+    result = runner.invoke(users_command, ["set-role", "ben", "admin"])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(users_command, ["set-password", "ben"], input="neu\nneu\n")
+    assert result.exit_code == 0, result.output
+    assert runner.invoke(users_command, ["set-role", "nobody", "admin"]).exit_code == 1
+
+    from auth import authenticate
+    with app.test_request_context():
+        user = authenticate("ben", "neu")
+        assert user is not None and user.role == "admin"
@@ -0,0 +1,26 @@
+from bulk import import_rows
+from flask_app import app
+
+
+def _rows(*dicts):
+    return list(enumerate(dicts, start=2))
+
+
+def test_duplicate_teacher_in_one_chunk_is_a_row_error(fresh_db):
+    with app.app_context():
+        result = import_rows("teachers", _rows(
+            {"username": "mueller", "name": "Müller", "password": "pw"},
+            {"username": "mueller", "name": "Müller 2", "password": "pw"},
+        ))
+    assert result["inserted"] == 1
+    assert result["skipped"] == 1
+    assert result["errors"][0]["line"] == 3
+    assert "doppelt" in result["errors"][0]["error"]
+    assert result["inserted"] + result["skipped"] == result["rows"]
+
+
+def test_duplicate_room_in_one_chunk_is_a_row_error(fresh_db):
+    with app.app_context():
+        result = import_rows("rooms", _rows({"raumnummer": "A1"}, {"raumnummer": "A1"}))
+    assert (result["inserted"], result["skipped"]) == (1, 1)
+    assert result["errors"][0]["line"] == 3
@@ -0,0 +1,47 @@
+from auth import register_user
+from catalog import catalog_page
+from flask_app import app
+
+
+def _seed(db):
+    db.db_write("INSERT INTO users (id, username, password, role) VALUES (1, 'lehrer', 'x', 'teacher')")
+    db.db_write("INSERT INTO lehrer (id, name, user_id) VALUES (1, 'Lehrer', 1)")
+    db.db_write("INSERT INTO raum (id, raumnummer) VALUES (1, 'A1')")
+    db.db_many(
+        "INSERT INTO faecher (id, fachname, lehrer_id, raum_id, tag, startzeit, endzeit) VALUES (%s, %s, 1, 1, %s, %s, %s)",
+        [(1, "Bio", "Montag", "08:00", "08:45"), (2, "Chemie", None, None, None)],
+    )
+
+
+def test_unplaced_lessons_are_not_offered_or_enrollable(fresh_db):
+    with app.app_context():
+        _seed(fresh_db)
+        user_id = register_user("anna", "pw", "student")
+        assert [item["id"] for item in catalog_page(user_id)["items"]] == [1]
+
+    client = app.test_client()
+    client.post("/login", data={"username": "anna", "password": "pw"})
+    assert client.post("/schedule/add", data={"fach_id": 2}).status_code == 400
+    assert client.post("/schedule/add", data={"fach_id": 99}).status_code == 400
+    assert client.post("/schedule/add", data={"fach_id": 1}).status_code == 302
+    with app.app_context():
+        assert fresh_db.db_read("SELECT fach_id FROM stundenplan WHERE user_id=%s", (user_id,)) == [{"fach_id": 1}]
+
+
+def test_switching_to_a_lesson_already_in_the_plan_shows_an_error(fresh_db):
+    with app.app_context():
+        _seed(fresh_db)
+        fresh_db.db_write("INSERT INTO faecher (id, fachname, lehrer_id, raum_id, tag, startzeit, endzeit) "
+                          "VALUES (3, 'Physik', 1, 1, 'Dienstag', '08:00', '08:45')")
+        user_id = register_user("ben", "pw", "student")
+        entry_id = fresh_db.db_write("INSERT INTO stundenplan (user_id, fach_id) VALUES (%s, 1)", (user_id,),
+                                     return_id=True)
+        fresh_db.db_write("INSERT INTO stundenplan (user_id, fach_id) VALUES (%s, 3)", (user_id,))
+
+    client = app.test_client()
+    client.post("/login", data={"username": "ben", "password": "pw"})
+    response = client.post(f"/schedule/edit/{entry_id}", data={"fach": 3})
+    assert response.status_code == 200
+    assert "bereits in deinem Stundenplan" in response.get_data(as_text=True)
+    with app.app_context():
+        assert fresh_db.db_read("SELECT fach_id FROM stundenplan WHERE id=%s", (entry_id,), single=True)["fach_id"] == 1
@@ -0,0 +1,91 @@
+import random
+
+from conflicts import IntervalIndex, _overlapping
+
+
+def _seed(db, lessons, enrolled=()):
+    """lessons: (fach_id, tag, start, end), all of one teacher in one room."""
+    db.db_write("INSERT INTO users (id, username, password, role) VALUES (1, 'lehrer', 'x', 'teacher')")
+    db.db_write("INSERT INTO users (id, username, password, role) VALUES (2, 'schueler', 'x', 'student')")
+    db.db_write("INSERT INTO lehrer (id, name, user_id) VALUES (1, 'Lehrer', 1)")
+    db.db_write("INSERT INTO raum (id, raumnummer) VALUES (1, 'A1')")
+    db.db_many(
+        "INSERT INTO faecher (id, fachname, lehrer_id, raum_id, tag, startzeit, endzeit) VALUES (%s, 'Fach', 1, 1, %s, %s, %s)",
+        lessons,
+    )
+    db.db_many("INSERT INTO stundenplan (user_id, fach_id) VALUES (2, %s)", [(f,) for f in enrolled])
+
+
+def test_overlapping_seed_rows(fresh_db):
+    # A double lesson with two short lessons inside it (rows that predate the check)
+    _seed(fresh_db, [
+        (1, "Montag", "08:00", "12:00"),
+        (2, "Montag", "09:00", "09:45"),
+        (3, "Montag", "10:00", "10:45"),
+    ], enrolled=[1, 3])
+    index = IntervalIndex(ttl=3600)
+    index.load()
+
+    assert index.teacher_conflicts(1, "Montag", "11:00", "11:30") == [1]
+    assert index.room_conflicts(1, "Montag", "11:00", "11:30") == [1]
+    assert sorted(index.teacher_conflicts(1, "Montag", "09:30", "10:15")) == [1, 2, 3]
+    assert index.teacher_conflicts(1, "Montag", "12:00", "13:00") == []
+    assert index.student_conflicts(2, 2) == [1]
+    assert not index.fits(2, 2)
+
+
+def test_overlapping_matches_brute_force():
+    rnd = random.Random(5)
+    for _ in range(200):
+        intervals = []
+        for fach_id in range(rnd.randint(0, 12)):
+            start = rnd.randrange(480, 900, 5)
+            intervals.append((start, start + rnd.randrange(5, 240, 5), fach_id))
+        intervals.sort()
+        longest = max((end - start for start, end, _ in intervals), default=0)
+        start = rnd.randrange(450, 950, 5)
+        end = start + rnd.randrange(5, 120, 5)
+
+        expected = {f for s, e, f in intervals if s < end and start < e}
+        assert set(_overlapping(intervals, start, end, longest=longest)) == expected
+
+
+def test_lesson_created_after_load_is_checked(fresh_db):
+    _seed(fresh_db, [(1, "Montag", "08:00", "08:45")], enrolled=[1])
+    index = IntervalIndex(ttl=3600)
+    index.load()
+    # Another worker adds a clashing lesson within the TTL
+    fresh_db.db_write("INSERT INTO faecher (id, fachname, lehrer_id, raum_id, tag, startzeit, endzeit) "
+                      "VALUES (2, 'Neu', 1, 1, 'Montag', '08:30', '09:15')")
+
+    assert index.student_conflicts(2, 2) == [1]
+    assert index.student_conflicts(2, 99) == []
+
+
+def test_failed_commit_leaves_the_shared_index_alone(fresh_db, monkeypatch):
+    from auth import register_user
+    from flask_app import app
+
+    import analytics
+
+    with app.app_context():
+        _seed(fresh_db, [(1, "Montag", "08:00", "08:45")])
+        user_id = register_user("anna", "pw", "student")
+        analytics.ensure_built()
+    index = IntervalIndex(ttl=3600)
+    index.load()
+    monkeypatch.setattr("flask_app.conflict_index", index)
+    client = app.test_client()
+    client.post("/login", data={"username": "anna", "password": "pw"})
+
+    def broken_commit():
+        raise RuntimeError("commit failed")
+    monkeypatch.setattr(fresh_db, "commit", broken_commit)
+    monkeypatch.setitem(app.config, "PROPAGATE_EXCEPTIONS", False)
+    assert client.post("/schedule/add", data={"fach_id": 1}).status_code == 500
+    assert user_id not in index.students_of[1]
+
+    monkeypatch.undo()
+    monkeypatch.setattr("flask_app.conflict_index", index)
+    assert client.post("/schedule/add", data={"fach_id": 1}).status_code == 302
+    assert user_id in index.students_of[1]
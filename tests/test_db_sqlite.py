@@ -0,0 +1,15 @@
+from db_sqlite import translate
+
+
+def test_translate_last_insert_id_returns_row_id():
+    sql = translate("INSERT INTO raum (raumnummer) VALUES (%s) ON DUPLICATE KEY UPDATE id=LAST_INSERT_ID(id)")
+    assert sql == "INSERT INTO raum (raumnummer) VALUES (?) ON CONFLICT DO UPDATE SET id=id RETURNING id"
+
+
+def test_get_or_create_raum_returns_existing_id(fresh_db):
+    import refdata
+
+    first = refdata.get_or_create_raum("A1")
+    other = refdata.get_or_create_raum("B2")
+    # lastrowid still points at B2 here, the existing A1 row must be returned
+    assert refdata.get_or_create_raum("A1") == first != other
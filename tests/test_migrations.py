@@ -0,0 +1,35 @@
+import pytest
+
+import migrations
+
+
+def test_migrate_resumes_after_failed_statement(fresh_db, tmp_path, monkeypatch):
+    fresh_db.db_read("SELECT 1")  # schema + real migrations first
+    monkeypatch.setattr(migrations, "MIGRATIONS_DIR", str(tmp_path))
+    migration = tmp_path / "900_test.sql"
+    migration.write_text("CREATE TABLE t1 (id INT);\nINSERT INTO missing VALUES (1);\n")
+
+    with pytest.raises(Exception):
+        migrations.migrate()
+    assert "900" not in migrations.applied_migrations()
+
+    # Fixed file: CREATE TABLE t1 already ran and must not run again
+    migration.write_text("CREATE TABLE t1 (id INT);\nCREATE TABLE t2 (id INT);\n")
+    assert migrations.migrate() == ["900_test.sql"]
+    assert "900" in migrations.applied_migrations()
+    assert fresh_db.db_read("SELECT * FROM schema_migration_progress") == []
+
+
+@pytest.mark.parametrize("plan, flagged", [
+    ([{"table": "faecher", "type": "ref", "possible_keys": "idx_faecher_lehrer_tag_start"}], False),
+    ([{"table": "faecher", "type": "ALL", "possible_keys": None}], True),
+    # An index exists but MySQL doesn't use it: still a full scan
+    ([{"table": "faecher", "type": "ALL", "possible_keys": "idx_faecher_lehrer_tag_start"}], True),
+    ([{"table": "<derived2>", "type": "ALL", "possible_keys": None}], False),
+])
+def test_check_indexes_flags_every_full_scan(monkeypatch, plan, flagged):
+    monkeypatch.setattr(migrations, "db_read", lambda sql, params=None, single=False: plan)
+    problems = migrations.check_indexes(["refdata.py"])
+    assert bool(problems) == flagged
+    if flagged:
+        assert problems[0]["unused_keys"] == plan[0]["possible_keys"]
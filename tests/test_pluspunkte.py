@@ -0,0 +1,66 @@
+import itertools
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+import pluspunkte_engine
+from pluspunkte_calc import fachnote, subject_points
+
+JS_FILE = os.path.join(os.path.dirname(__file__), "..", "static", "js", "pluspunkte.js")
+
+# Used to give -8.0 on the server and -7.5 in the browser (float noise at -7.75)
+PINNED = ([1.0, 1.0, 2.0], [0.5, 3.0, 2.5], 1.5, -8.0)
+
+# calculateSubject from the page, run against stub DOM elements
+JS_RUNNER = """
+%s
+function calculateTotal() {}
+const input = value => ({value: String(value)});
+const cases = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+console.log(JSON.stringify(cases.map(([notes, weights, fachGewichtung]) => {
+  const shown = {style: {}};
+  const rows = notes.map((note, i) => ({
+    querySelector: sel => sel === '.grade-input' ? input(note) : input(weights[i]),
+  }));
+  const elements = {
+    '.subject-weight-input': input(fachGewichtung), '.fachnote-value': {}, '.subject-points': shown,
+  };
+  calculateSubject({querySelectorAll: () => rows, querySelector: sel => elements[sel]});
+  return parseFloat(shown.textContent);
+})));
+"""
+
+
+def _server(notes, weights, fach_gewichtung):
+    return subject_points(fachnote([{"note": n, "gewichtung": w} for n, w in zip(notes, weights)]), fach_gewichtung)
+
+
+def _browser(cases):
+    with open(JS_FILE, encoding="utf-8") as f:
+        source = re.search(r"^function calculateSubject\(.*?^}$", f.read(), re.S | re.M).group(0)
+    out = subprocess.run(["node", "-e", JS_RUNNER % source], input=json.dumps(cases),
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out)
+
+
+def test_pinned_case_on_the_server():
+    notes, weights, fach_gewichtung, expected = PINNED
+    assert _server(notes, weights, fach_gewichtung) == expected
+    note = fachnote([{"note": n, "gewichtung": w} for n, w in zip(notes, weights)])
+    assert pluspunkte_engine.points([note], fach_gewichtung)[0] == expected
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_browser_matches_server():
+    steps = [1.0, 1.5, 2.0, 3.5, 4.5, 6.0]
+    cases = [PINNED[:3]] + [
+        (list(notes), list(weights), fach_gewichtung)
+        for notes in itertools.product(steps, repeat=3)
+        for weights in ([0.5, 3.0, 2.5], [1.0, 1.5, 0.5])
+        for fach_gewichtung in (0.5, 1.0, 1.5)
+    ]
+    assert _browser(cases) == [_server(*case) for case in cases]
@@ -0,0 +1,120 @@
+import base64
+import json
+from datetime import date
+from db import db_read, db_write
+
+TODO_PAGE_SIZE = 50
+TODO_MAX_PAGE_SIZE = 200
+TITLE_MAX_LENGTH = 250
+
+# Offene zuerst, dann nach Fälligkeit (ohne Datum zuerst, wie NULL in MySQL
+# und SQLite sortiert) - Reihenfolge von idx_todos_user_completed_due (+ id)
+_ORDER = "ORDER BY completed, due_date, id"
+
+
+def todo_item(row):
+    due = row["due_date"]
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "completed": bool(row["completed"]),
+        "due_date": due.isoformat() if hasattr(due, "isoformat") else due,
+    }
+
+
+def parse_todo(title, due_date):
+    """(title, due_date or None) from user input; ValueError if invalid."""
+    title = (title or "").strip()
+    if not title:
+        raise ValueError("Titel fehlt")
+    if len(title) > TITLE_MAX_LENGTH:
+        raise ValueError(f"Titel ist länger als {TITLE_MAX_LENGTH} Zeichen")
+    due_date = (due_date or "").strip() or None
+    if due_date is not None:
+        try:
+            due_date = date.fromisoformat(due_date).isoformat()
+        except ValueError:
+            raise ValueError("Ungültiges Datum")
+    return title, due_date
+
+
+# -----------------------------
+# Cursor (Keyset über completed, due_date, id)
+# -----------------------------
+def _encode_cursor(item):
+    raw = json.dumps([int(item["completed"]), item["due_date"], item["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    try:
+        completed, due_date, todo_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if due_date is not None:
+            due_date = date.fromisoformat(due_date).isoformat()
+        return int(completed), due_date, int(todo_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def list_todos(user_id, cursor=None, limit=TODO_PAGE_SIZE):
+    """One page of the user's todos: {"items": [...], "next_cursor": str or None}."""
+    limit = max(1, min(int(limit), TODO_MAX_PAGE_SIZE))
+    where, params = "user_id = %s", [user_id]
+    if cursor:
+        completed, due_date, todo_id = _decode_cursor(cursor)
+        if due_date is None:
+            # Still in the undated block: later undated ones, then every dated one
+            after = "(due_date IS NULL AND id > %s) OR due_date IS NOT NULL"
+            after_params = [todo_id]
+        else:
+            after = "due_date > %s OR (due_date = %s AND id > %s)"
+            after_params = [due_date, due_date, todo_id]
+        where += f" AND (completed > %s OR (completed = %s AND ({after})))"
+        params += [completed, completed, *after_params]
+
+    rows = db_read(f"""
+        SELECT id, title, completed, due_date
+        FROM todos
+        WHERE {where}
+        {_ORDER}
+        LIMIT %s
+    """, (*params, limit + 1)) or []
+
+    items = [todo_item(r) for r in rows[:limit]]
+    next_cursor = _encode_cursor(items[-1]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def count_todos(user_id):
+    row = db_read("SELECT COUNT(*) AS n FROM todos WHERE user_id = %s", (user_id,), single=True)
+    return row["n"] if row else 0
+
+
+# -----------------------------
+# Änderungen (je ein Statement, Rückgabe nur die geänderte Zeile)
+# -----------------------------
+def _get(user_id, todo_id):
+    row = db_read("SELECT id, title, completed, due_date FROM todos WHERE id=%s AND user_id=%s",
+                  (todo_id, user_id), single=True)
+    return todo_item(row) if row else None
+
+
+def add_todo(user_id, title, due_date):
+    todo_id = db_write(
+        "INSERT INTO todos (user_id, title, due_date) VALUES (%s, %s, %s)",
+        (user_id, title, due_date),
+        return_id=True
+    )
+    return {"id": todo_id, "title": title, "completed": False, "due_date": due_date}
+
+
+def toggle_todo(user_id, todo_id):
+    """Flip `completed`; the new row, or None if it isn't the user's todo."""
+    changed = db_write("UPDATE todos SET completed = NOT completed WHERE id=%s AND user_id=%s",
+                       (todo_id, user_id))
+    # MySQL has no RETURNING - read the row back by primary key
+    return _get(user_id, todo_id) if changed else None
+
+
+def delete_todo(user_id, todo_id):
+    return db_write("DELETE FROM todos WHERE id=%s AND user_id=%s", (todo_id, user_id)) > 0